@@ -1,4 +1,5 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator, Tuple
+from bisect import bisect_right
 import re
 
 
@@ -78,48 +79,161 @@ class RecursiveTextSplitter:
         return text.strip()
 
 
-def _dominant_block(blocks, start, end):
-    best = None
-    best_overlap = 0
+class SpanSplitter:
+    """
+    Offset-based version of RecursiveTextSplitter.
 
-    for block in blocks:
-        overlap = max(0, min(end, block["end"]) - max(start, block["start"]))
-        if overlap > best_overlap:
-            best_overlap = overlap
-            best = block
-
-    return best
+    Works on (start, end) character offsets into the original document
+    instead of building strings, so a split is one linear scan per
+    separator level and every chunk is a single slice of the document.
+    Spans are yielded lazily and keep their true document offsets, also
+    after overlap is added.
+    """
 
+    def __init__(
+        self,
+        chunk_size: int = 1200,
+        chunk_overlap: int = 200,
+        separators: List[str] | None = None
+    ):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or [
+            "\n\n",
+            "\n",
+            ". ",
+            " ",
+            ""
+        ]
 
-def chunk_document(doc: Dict) -> List[Dict]:
-    splitter = RecursiveTextSplitter(
+    def split_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Chunk spans with overlap: each span after the first starts up to
+        chunk_overlap characters earlier, reaching into the previous
+        chunk past the separator gap between them. Spans never exceed
+        chunk_size + chunk_overlap, however wide the gap.
+        """
+        prev = None
+        for start, end in self._base_spans(text):
+            if prev is not None and self.chunk_overlap > 0:
+                lo = max(prev[0], start - self.chunk_overlap)
+                # Don't open a chunk with the tail of a whitespace gap
+                start = _strip_span(text, lo, start)[0]
+            yield start, end
+            prev = (start, end)
+
+    def _base_spans(self, text: str) -> Iterator[Tuple[int, int]]:
+        start, end = _strip_span(text, 0, len(text))
+        if start < end:
+            yield from self._split(text, start, end, 0)
+
+    def _split(self, text: str, start: int, end: int, level: int) -> Iterator[Tuple[int, int]]:
+        if end - start <= self.chunk_size:
+            yield start, end
+            return
+
+        sep = self.separators[level] if level < len(self.separators) else ""
+        if not sep:
+            # Hard split into fixed windows
+            for lo in range(start, end, self.chunk_size):
+                span = _strip_span(text, lo, min(lo + self.chunk_size, end))
+                if span[0] < span[1]:
+                    yield span
+            return
+
+        # Greedily pack separator-delimited pieces into [cur_start, cur_end)
+        cur_start = cur_end = None
+        pos = start
+
+        while pos <= end:
+            hit = text.find(sep, pos, end)
+            piece_end = hit if hit != -1 else end
+
+            if piece_end > pos:
+                if cur_start is None:
+                    cur_start, cur_end = pos, piece_end
+                elif piece_end - cur_start <= self.chunk_size:
+                    cur_end = piece_end
+                else:
+                    yield from self._emit(text, cur_start, cur_end, level)
+                    cur_start, cur_end = pos, piece_end
+
+            if hit == -1:
+                break
+            pos = hit + len(sep)
+
+        if cur_start is not None:
+            yield from self._emit(text, cur_start, cur_end, level)
+
+    def _emit(self, text: str, start: int, end: int, level: int) -> Iterator[Tuple[int, int]]:
+        start, end = _strip_span(text, start, end)
+        if start < end:
+            # Only a single oversized piece can exceed chunk_size here
+            yield from self._split(text, start, end, level + 1)
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    """
+    Narrow [start, end) past leading/trailing whitespace without copying.
+    """
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+class BlockIndex:
+    """
+    Sorted interval index over extraction blocks (disjoint, as produced
+    by ingest). dominant() finds the block covering most of a span with
+    one bisect plus a scan over the blocks inside the span.
+    """
+
+    def __init__(self, blocks: List[Dict]):
+        self.blocks = sorted(blocks, key=lambda b: b["start"])
+        self.starts = [b["start"] for b in self.blocks]
+
+    def dominant(self, start: int, end: int) -> Dict | None:
+        best = None
+        best_overlap = 0
+
+        i = max(bisect_right(self.starts, start) - 1, 0)
+        while i < len(self.blocks) and self.blocks[i]["start"] < end:
+            block = self.blocks[i]
+            overlap = min(end, block["end"]) - max(start, block["start"])
+            if overlap > best_overlap:
+                best_overlap = overlap
+                best = block
+            i += 1
+
+        return best
+
+
+def iter_chunks(doc: Dict) -> Iterator[Dict]:
+    """
+    Lazily chunk one extracted document; see chunk_document.
+    """
+    splitter = SpanSplitter(
         chunk_size=1200,
         chunk_overlap=200
     )
 
     text = doc["text"]
-    blocks = doc.get("blocks", [])
+    blocks = BlockIndex(doc.get("blocks", []))
 
-    raw_chunks = splitter.split_text(text)
-    raw_chunks = splitter.add_overlap(raw_chunks)
+    for i, (start, end) in enumerate(splitter.split_spans(text)):
+        block = blocks.dominant(start, end)
 
-    chunks = []
-    cursor = 0
-
-    for i, chunk_text in enumerate(raw_chunks):
-        start = cursor
-        end = cursor + len(chunk_text)
-        cursor = end
-
-        block = _dominant_block(blocks, start, end)
-
-        chunks.append({
+        yield {
             "chunk_id": f"{doc['doc_id']}::chunk_{i}",
             "doc_id": doc["doc_id"],
             "source_path": doc["source_path"],
-            "text": chunk_text,
+            "text": text[start:end],
             "page": block["page"] if block else None,
             "content_type": block["type"] if block else "unknown"
-        })
+        }
 
-    return chunks
+
+def chunk_document(doc: Dict) -> List[Dict]:
+    return list(iter_chunks(doc))
@@ -1,12 +1,40 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-import faiss
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import contextlib
+import hashlib
 import json
+import logging
+import os
+import threading
+import time
 from pathlib import Path
 
-from RAG.embeddings_free import embed_texts
-from RAG.reranker_cross_encoder import rerank
-from RAG.llm_flan_t5 import generate_answer
+from RAG import models
+from RAG.batch_answer import answer_batch, sources
+from RAG.batching import MicroBatcher
+from RAG.bm25 import BM25Index
+from RAG.chunk_store import ChunkStore, is_chunk_store
+from RAG.faiss_hnsw import (
+    get_ef_search, load_index, load_index_meta, sample_stored_vectors, save_index_meta,
+    tune_ef_search, tuning_queries
+)
+from RAG.metrics import (
+    ADAPTIVE_EF_RAISED, CONTENT_TYPE, EMPTY_RETRIEVALS, REQUEST_SECONDS, REQUESTS,
+    STAGE_SECONDS, counter_callback, gauge_callback, process_memory, render_metrics,
+    start_snapshot_writer
+)
+from RAG.embeddings_free import embed_texts, embedding_cache_stats, normalize_query
+from RAG.reranker_cross_encoder import rerank_batch, invalidate_score_cache, score_cache_stats
+from RAG.response_cache import SemanticResponseCache, SingleFlight, backend_from_env
+from RAG.sharded_index import SHARD_MAP_NAME, ShardedIndex, load_shard_map
+from RAG.retriever import (
+    adaptive_dense_search, dense_search, lexical_search, reciprocal_rank_fusion
+)
 
 
 # ================= CONFIG =================
@@ -14,19 +42,194 @@ from RAG.llm_flan_t5 import generate_answer
 ARTIFACTS_DIR = Path("/artifacts")
 
 INDEX_PATH = ARTIFACTS_DIR / "policy_hnsw.index"
-CHUNKS_PATH = ARTIFACTS_DIR / "chunks.json"
+CHUNK_STORE_DIR = ARTIFACTS_DIR / "chunks.store"
+CHUNKS_PATH = ARTIFACTS_DIR / "chunks.json"  # legacy fallback
+BM25_PATH = ARTIFACTS_DIR / "bm25.npz"
+# Written by build_index --shards N; served instead of INDEX_PATH when present
+SHARD_MAP_PATH = ARTIFACTS_DIR / SHARD_MAP_NAME
+
+# Sharded index: "thread" searches the shards in-process, "process" runs
+# SHARD_REPLICAS local processes per shard. Process replicas are per
+# worker (not shared by serve.py workers); thread-mode shards are.
+SHARD_MODE = os.environ.get("RAG_SHARD_MODE", "thread")
+SHARD_REPLICAS = int(os.environ.get("RAG_SHARD_REPLICAS", "1"))
+
+# Candidates fetched per retriever, and how many fused candidates go
+# through the cross-encoder
+RETRIEVE_K = int(os.environ.get("RAG_RETRIEVE_K", "10"))
+RERANK_TOP = int(os.environ.get("RAG_RERANK_TOP", "5"))
+
+# efSearch comes from the index meta (tuned at build time). Setting a
+# target here re-tunes at load when the stored tuning used other targets.
+EF_TARGET_RECALL = float(os.environ.get("RAG_EF_TARGET_RECALL") or 0) or None
+EF_TARGET_P95_MS = float(os.environ.get("RAG_EF_TARGET_P95_MS") or 0) or None
+EF_TUNE_QUERIES = int(os.environ.get("RAG_EF_TUNE_QUERIES", "200"))
+
+# Adaptive mode (default for requests that do not choose): raise efSearch
+# for a query only while its top-k boundary scores are within
+# ADAPTIVE_MIN_GAP of each other, doubling up to ADAPTIVE_MAX_EF
+ADAPTIVE_EF = os.environ.get("RAG_ADAPTIVE_EF", "0") == "1"
+ADAPTIVE_MAX_EF = int(os.environ.get("RAG_ADAPTIVE_MAX_EF", "256"))
+ADAPTIVE_MIN_GAP = float(os.environ.get("RAG_ADAPTIVE_MIN_GAP", "0.01"))
+
+# Cross-request micro-batching: a batch closes when it is full or when
+# its first request has waited BATCH_MAX_WAIT_MS.
+BATCH_MAX_SIZE = int(os.environ.get("RAG_BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("RAG_BATCH_MAX_WAIT_MS", "10"))
+
+# Bounded worker threads per inference stage. Each stage has its own
+# pool, so a saturated generate stage cannot starve embedding, search
+# or the event loop serving cheap endpoints.
+EMBED_WORKERS = int(os.environ.get("RAG_EMBED_WORKERS", "1"))
+SEARCH_WORKERS = int(os.environ.get("RAG_SEARCH_WORKERS", "2"))
+RERANK_WORKERS = int(os.environ.get("RAG_RERANK_WORKERS", "1"))
+GENERATE_WORKERS = int(os.environ.get("RAG_GENERATE_WORKERS", "1"))
+
+# Concurrent /ask/stream generations (each decodes on its own thread;
+# streams are not batched so tokens can be flushed per request)
+STREAM_WORKERS = int(os.environ.get("RAG_STREAM_WORKERS", "2"))
+
+# /ask/batch: queries per request, and batches answered at once (each
+# runs the whole pipeline on its own thread, outside the micro-batchers)
+ASK_BATCH_MAX_QUERIES = int(os.environ.get("RAG_ASK_BATCH_MAX_QUERIES", "256"))
+ASK_BATCH_WORKERS = int(os.environ.get("RAG_ASK_BATCH_WORKERS", "1"))
+GEN_BATCH_SIZE = int(os.environ.get("RAG_GEN_BATCH_SIZE", "16"))
+
+# Semantic response cache: "memory" (per worker) or "redis" (shared)
+RESPONSE_CACHE_BACKEND = os.environ.get("RAG_RESPONSE_CACHE", "memory")
+RESPONSE_CACHE_SIZE = int(os.environ.get("RAG_RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_THRESHOLD = float(os.environ.get("RAG_RESPONSE_CACHE_THRESHOLD", "0.95"))
+REDIS_URL = os.environ.get("RAG_REDIS_URL", "redis://localhost:6379/0")
+# Threads for blocking (redis) cache lookups/stores, kept off the event loop
+RESPONSE_CACHE_WORKERS = int(os.environ.get("RAG_RESPONSE_CACHE_WORKERS", "4"))
+
+# "full" answers questions; "retrieval" only returns ranked sources and
+# never imports the generation stack (transformers seq2seq, flan-t5)
+PROFILE = os.environ.get("RAG_PROFILE", "full")
+if PROFILE not in ("full", "retrieval"):
+    raise ValueError(f"RAG_PROFILE must be 'full' or 'retrieval', got {PROFILE!r}")
+
+GENERATE = PROFILE == "full"
+
+# Seconds between checks for rebuilt artifacts on disk (0 = off). A
+# rebuild is reported (/health, /stats), not loaded: artifacts and the
+# caches keyed on them are only replaced when the workers restart.
+ARTIFACT_CHECK_S = float(os.environ.get("RAG_ARTIFACT_CHECK_S", "60"))
+
+# DEBUG also logs every prompt context
+LOG_LEVEL = os.environ.get("RAG_LOG_LEVEL", "INFO").upper()
 
 # =========================================
 
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+if GENERATE:
+    from RAG.llm_flan_t5 import generate_answers, stream_answer, packing_stats
 
-app = FastAPI(title="RAG Policy Assistant")
 
 index = None
+index_meta = {}
 chunks = None
+bm25 = None
+artifacts_version = ""
+artifacts_stale = False
+
+# component → seconds, filled during startup
+startup_timings = {}
+
+# artifact → bytes on disk, filled by load_artifacts
+artifact_bytes = {}
+
+embed_batcher = MicroBatcher(
+    lambda queries: list(embed_texts(queries, use_cache=True)),
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    name="embed",
+    workers=EMBED_WORKERS
+)
+rerank_batcher = MicroBatcher(
+    rerank_batch,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    name="rerank",
+    workers=RERANK_WORKERS
+)
+generate_batcher = MicroBatcher(
+    generate_answers,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    name="generate",
+    workers=GENERATE_WORKERS
+) if GENERATE else None
+
+search_executor = ThreadPoolExecutor(
+    max_workers=SEARCH_WORKERS,
+    thread_name_prefix="search"
+)
+
+BATCHERS = tuple(
+    b for b in (embed_batcher, rerank_batcher, generate_batcher)
+    if b is not None
+)
+MODEL_NAMES = ("embed", "rerank", "llm") if GENERATE else ("embed", "rerank")
+
+response_cache = SemanticResponseCache(
+    backend_from_env(RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_SIZE, REDIS_URL),
+    threshold=RESPONSE_CACHE_THRESHOLD
+)
+single_flight = SingleFlight()
+cache_executor = ThreadPoolExecutor(
+    max_workers=RESPONSE_CACHE_WORKERS,
+    thread_name_prefix="response-cache"
+)
+
+stream_executor = ThreadPoolExecutor(
+    max_workers=STREAM_WORKERS,
+    thread_name_prefix="stream"
+)
+stream_slots = asyncio.Semaphore(STREAM_WORKERS)
+
+batch_executor = ThreadPoolExecutor(
+    max_workers=ASK_BATCH_WORKERS,
+    thread_name_prefix="ask-batch"
+)
+stream_stats = {
+    "streams": 0,
+    "completed": 0,
+    "cancelled": 0,
+    "ttft_ms_total": 0.0,
+    "total_ms_total": 0.0
+}
 
 
 class QueryReq(BaseModel):
     query: str
+    # None → server default (RAG_ADAPTIVE_EF)
+    adaptive_ef: Optional[bool] = None
+
+
+class BatchQueryReq(BaseModel):
+    queries: list[str]
+
+
+def artifact_version() -> str:
+    """
+    Cheap fingerprint of the on-disk artifacts (name, size, mtime).
+    Changes whenever the index or chunks are rebuilt.
+    """
+    if is_chunk_store(CHUNK_STORE_DIR):
+        chunk_files = [CHUNK_STORE_DIR / "meta.json", CHUNK_STORE_DIR / "text.bin"]
+    else:
+        chunk_files = [CHUNKS_PATH]
+
+    if BM25_PATH.exists():
+        chunk_files.append(BM25_PATH)
+
+    h = hashlib.sha1()
+    for path in [*_index_files(), *chunk_files]:
+        st = path.stat()
+        h.update(f"{path.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
 
 
 def load_artifacts():
@@ -34,57 +237,454 @@ def load_artifacts():
     Load FAISS index + chunk metadata from local disk.
     Runs once per container lifetime.
     """
-    global index, chunks
+    global index, index_meta, chunks, bm25, artifacts_version
 
     if index is not None and chunks is not None:
         return
 
     print("📦 Loading FAISS index and chunks from disk")
 
-    if not INDEX_PATH.exists():
+    sharded = SHARD_MAP_PATH.exists()
+    if not sharded and not INDEX_PATH.exists():
         raise RuntimeError(f"FAISS index not found at {INDEX_PATH}")
 
-    if not CHUNKS_PATH.exists():
-        raise RuntimeError(f"Chunks file not found at {CHUNKS_PATH}")
+    with _timed("index"):
+        if sharded:
+            # Scatter-gather over the shards, merged to global ids
+            index = ShardedIndex(SHARD_MAP_PATH, mode=SHARD_MODE, replicas=SHARD_REPLICAS)
+            index_meta = {}
+        else:
+            # efSearch from the index meta (tuned at build time)
+            index = load_index(str(INDEX_PATH))
+            index_meta = load_index_meta(str(INDEX_PATH))
+
+    if not sharded and (EF_TARGET_RECALL is not None or EF_TARGET_P95_MS is not None):
+        with _timed("tune_ef"):
+            tune_on_load()
+
+    with _timed("chunks"):
+        if is_chunk_store(CHUNK_STORE_DIR):
+            # Memory-mapped; chunk text is decoded lazily per FAISS id
+            chunks = ChunkStore(CHUNK_STORE_DIR)
+        elif CHUNKS_PATH.exists():
+            with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+        else:
+            raise RuntimeError(
+                f"No chunk store at {CHUNK_STORE_DIR} or chunks file at {CHUNKS_PATH}"
+            )
+
+    # Optional: without it retrieval is dense-only
+    with _timed("bm25"):
+        bm25 = BM25Index.load(BM25_PATH) if BM25_PATH.exists() else None
+
+    artifact_bytes.clear()
+    artifact_bytes["index"] = sum(path.stat().st_size for path in _index_files())
+    if is_chunk_store(CHUNK_STORE_DIR):
+        artifact_bytes["chunks"] = sum(
+            f.stat().st_size for f in CHUNK_STORE_DIR.iterdir() if f.is_file()
+        )
+    else:
+        artifact_bytes["chunks"] = CHUNKS_PATH.stat().st_size
+    if bm25 is not None:
+        artifact_bytes["bm25"] = BM25_PATH.stat().st_size
+
+    # Only reached at startup; the redis response cache outlives the
+    # process and is keyed on this version
+    version = artifact_version()
+    if version != artifacts_version:
+        invalidate_score_cache()
+        response_cache.set_version(version)
+    artifacts_version = version
+
+    print(f"✅ Artifacts loaded successfully (version {artifacts_version})")
+
+
+def check_artifacts() -> bool:
+    """
+    True when the artifacts on disk no longer match the loaded ones.
+    Serving continues on the loaded version until a restart.
+    """
+    global artifacts_stale
+
+    try:
+        on_disk = artifact_version()
+    except (OSError, ValueError):
+        # Mid-rebuild: files missing or the shard map half-written
+        return artifacts_stale
+
+    stale = on_disk != artifacts_version
+    if stale and not artifacts_stale:
+        print(
+            f"⚠️  Artifacts on disk changed ({artifacts_version} → {on_disk}); "
+            "restart the workers to serve them"
+        )
+    artifacts_stale = stale
+    return stale
+
+
+async def _watch_artifacts():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(ARTIFACT_CHECK_S)
+        await loop.run_in_executor(None, check_artifacts)
 
-    index = faiss.read_index(str(INDEX_PATH))
-    index.hnsw.efSearch = 50
 
-    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
-        chunks = json.load(f)
+def _index_files() -> list[Path]:
+    if not SHARD_MAP_PATH.exists():
+        return [INDEX_PATH]
+    shards = load_shard_map(SHARD_MAP_PATH)["shards"]
+    return [SHARD_MAP_PATH, *(ARTIFACTS_DIR / s["path"] for s in shards)]
+
+
+def tune_on_load():
+    """
+    Re-tune efSearch for the configured targets unless the stored tuning
+    already used them. Queries are perturbed stored vectors; the result
+    is written back to the index meta when the artifacts are writable.
+    """
+    stored = index_meta.get("ef_search_tuning") or {}
+    if (stored.get("target_recall"), stored.get("target_p95_ms")) == (EF_TARGET_RECALL, EF_TARGET_P95_MS):
+        return
+
+    sample = sample_stored_vectors(index, EF_TUNE_QUERIES)
+    if sample is None:
+        print("⚠️ efSearch not tuned: index cannot reconstruct vectors")
+        return
+
+    tuning = tune_ef_search(
+        index,
+        tuning_queries(sample),
+        target_recall=EF_TARGET_RECALL,
+        target_p95_ms=EF_TARGET_P95_MS
+    )
+    if tuning is None:
+        return
+
+    index_meta["ef_search"] = tuning["ef_search"]
+    index_meta["ef_search_tuning"] = tuning
+    try:
+        save_index_meta(str(INDEX_PATH), index_meta)
+    except OSError:
+        pass
+
+    print(f"{'🎯' if tuning['met'] else '⚠️'} efSearch={tuning['ef_search']} "
+          f"(recall@{tuning['k']}={tuning['recall']:.3f}, p95={tuning['p95_ms']:.2f}ms)")
+
+
+@contextlib.contextmanager
+def _timed(component: str):
+    t0 = time.perf_counter()
+    yield
+    startup_timings[component] = time.perf_counter() - t0
+
+
+def warm_up():
+    """
+    Load the models this profile needs, then push one request through
+    every stage so lazy init (thread pools, tokenizer caches) is paid
+    before serving traffic.
+    """
+    models.warm_up(MODEL_NAMES)
+    startup_timings.update({f"model:{k}": v for k, v in models.load_times().items()})
+
+    with _timed("warm_up"):
+        embed_batcher("warm up")
+        rerank_batcher(("warm up", ["warm up"]))
+        if GENERATE:
+            generate_batcher(("warm up", ["warm up"]))
 
-    print("✅ Artifacts loaded successfully")
+
+def startup_report():
+    print(f"⏱️  Startup timings (profile={PROFILE})")
+    for component, seconds in startup_timings.items():
+        print(f"   {component:<14} {seconds:>7.2f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+
+    for batcher in BATCHERS:
+        batcher.start()
+
+    t0 = time.perf_counter()
+    await loop.run_in_executor(None, load_artifacts)
+    await loop.run_in_executor(None, warm_up)
+    startup_timings["total"] = time.perf_counter() - t0
+    startup_report()
+
+    watcher = asyncio.create_task(_watch_artifacts()) if ARTIFACT_CHECK_S > 0 else None
+
+    # Pre-forked workers publish their samples for each other's /metrics
+    start_snapshot_writer()
+
+    yield
+
+    if watcher is not None:
+        watcher.cancel()
+    for batcher in BATCHERS:
+        batcher.stop()
+    search_executor.shutdown(wait=False)
+    stream_executor.shutdown(wait=False)
+    if isinstance(index, ShardedIndex):
+        index.close()
+    batch_executor.shutdown(wait=False)
+    cache_executor.shutdown(wait=False)
+
+
+app = FastAPI(title="RAG Policy Assistant", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    """
+    Liveness/readiness probe. Never touches the models.
+    """
+    return {
+        "status": "ok",
+        "profile": PROFILE,
+        "ready": index is not None and chunks is not None,
+        "artifacts_stale": artifacts_stale
+    }
+
+
+@app.get("/stats")
+async def stats():
+    """
+    Cache and batching counters for this worker.
+    """
+    return {
+        "artifacts_version": artifacts_version,
+        "artifacts_stale": artifacts_stale,
+        "profile": PROFILE,
+        "startup_s": startup_timings,
+        "embedding_cache": embedding_cache_stats(),
+        "rerank_cache": score_cache_stats(),
+        "response_cache": {
+            **response_cache.stats(),
+            "coalesced": single_flight.merged
+        },
+        "batchers": {b.name: b.stats() for b in BATCHERS},
+        "search": _search_stats(),
+        "streaming": _stream_stats(),
+        "prompt_packing": packing_stats() if GENERATE else None,
+        "memory": {"pid": os.getpid(), **process_memory()}
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text exposition. Gauges and cache counters are read from
+    existing state here, at scrape time. Under serve.py with several
+    workers, every worker's samples are merged (see RAG/metrics.py).
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+
+def _cache_counts(field: str) -> dict:
+    caches = {
+        "embedding": embedding_cache_stats(),
+        "rerank": score_cache_stats(),
+        "response": response_cache.stats()
+    }
+    return {
+        (name,): s[field]
+        for name, s in caches.items()
+        if s.get("enabled", True)
+    }
+
+
+gauge_callback(
+    "rag_artifact_bytes",
+    "Size on disk of each loaded artifact.",
+    ["artifact"],
+    lambda: {(k,): v for k, v in artifact_bytes.items()}
+)
+gauge_callback(
+    "rag_model_load_seconds",
+    "Time spent loading each model.",
+    ["model"],
+    lambda: {(k,): v for k, v in models.load_times().items()}
+)
+gauge_callback(
+    "rag_startup_seconds",
+    "Startup time per component.",
+    ["component"],
+    lambda: {(k,): v for k, v in startup_timings.items()}
+)
+counter_callback(
+    "rag_cache_hits_total",
+    "Cache hits per cache.",
+    ["cache"],
+    lambda: _cache_counts("hits")
+)
+counter_callback(
+    "rag_cache_misses_total",
+    "Cache misses per cache.",
+    ["cache"],
+    lambda: _cache_counts("misses")
+)
+counter_callback(
+    "rag_coalesced_requests_total",
+    "Requests that awaited an identical in-flight request.",
+    [],
+    lambda: {(): single_flight.merged}
+)
+
+
+def _search_stats() -> dict:
+    tuning = dict(index_meta.get("ef_search_tuning") or {})
+    tuning.pop("curve", None)
+    return {
+        "ef_search": None if index is None or isinstance(index, ShardedIndex) else get_ef_search(index),
+        "shards": index.stats() if isinstance(index, ShardedIndex) else None,
+        "tuning": tuning or None,
+        "adaptive_ef": ADAPTIVE_EF,
+        "adaptive_max_ef": ADAPTIVE_MAX_EF,
+        "adaptive_min_gap": ADAPTIVE_MIN_GAP
+    }
+
+
+def _stream_stats() -> dict:
+    completed = max(stream_stats["completed"], 1)
+    return {
+        "streams": stream_stats["streams"],
+        "completed": stream_stats["completed"],
+        "cancelled": stream_stats["cancelled"],
+        "avg_ttft_ms": stream_stats["ttft_ms_total"] / completed,
+        "avg_total_ms": stream_stats["total_ms_total"] / completed
+    }
 
 
 @app.post("/ask")
-def ask(req: QueryReq):
+async def ask(req: QueryReq):
     """
     End-to-end RAG query handler
     """
-    load_artifacts()
-
     query = req.query
+    REQUESTS.inc(endpoint="/ask")
 
-    # 1️⃣ Embed query
-    q_vec = embed_texts([query])
+    with REQUEST_SECONDS.time(endpoint="/ask"):
+        # 1️⃣ Embed query
+        with STAGE_SECONDS.time(stage="embed"):
+            q_vec = (await embed_batcher.run(query)).reshape(1, -1)
 
-    # 2️⃣ Retrieve from FAISS
-    _, indices = index.search(q_vec, k=10)
-    retrieved = [int(i) for i in indices[0] if i != -1]
+        # Answers depend on the search mode: never shared across modes
+        mode = _search_mode(req.adaptive_ef)
 
-    if not retrieved:
+        # Near-duplicate of an answered question → reuse its answer
+        cached = await _cache_lookup(q_vec[0], mode)
+        if cached is not None:
+            return {"query": query, **cached, "cached": True}
+
+        # Identical questions already in flight share one computation
+        payload = await single_flight.do(
+            (normalize_query(query), mode),
+            lambda: _answer(query, q_vec, mode)
+        )
+
+    return {"query": query, **payload}
+
+
+NO_ANSWER = "I could not find relevant information in the documents."
+TOP_CONTEXT = 3
+
+
+async def _answer(query: str, q_vec, mode: str) -> dict:
+    reranked = await _rank(query, q_vec, mode)
+
+    if not reranked:
         return {
-            "query": query,
-            "answer": "I could not find relevant information in the documents.",
+            "answer": NO_ANSWER,
             "sources": []
         }
 
+    # 4️⃣ Generate answer from top contexts
+    if GENERATE:
+        contexts = [chunks[i]["text"] for i in reranked[:TOP_CONTEXT]]
+        with STAGE_SECONDS.time(stage="generate"):
+            answer = await generate_batcher.run((query, contexts, q_vec[0]))
+    else:
+        answer = None
+
+    payload = {
+        "answer": answer,
+        "sources": _sources(reranked)
+    }
+
+    await _cache_store(q_vec[0], payload, mode)
+    return payload
+
+
+async def _cache_lookup(q_vec, mode: str) -> Optional[dict]:
+    if not response_cache.blocking:
+        return response_cache.lookup(q_vec, mode)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cache_executor, response_cache.lookup, q_vec, mode)
+
+
+async def _cache_store(q_vec, payload: dict, mode: str):
+    if not response_cache.blocking:
+        response_cache.store(q_vec, payload, mode)
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(cache_executor, response_cache.store, q_vec, payload, mode)
+
+
+def _sources(reranked: list[int]) -> list[dict]:
+    return sources(chunks, reranked, TOP_CONTEXT)
+
+
+def _search_mode(adaptive_ef: Optional[bool] = None) -> str:
+    """
+    The dense search a request gets: "adaptive" (efSearch escalation)
+    or "fixed". Part of every response-cache and coalescing key.
+    """
+    adaptive = ADAPTIVE_EF if adaptive_ef is None else adaptive_ef
+    # efSearch escalation needs one HNSW graph; shards are searched as built
+    return "adaptive" if adaptive and not isinstance(index, ShardedIndex) else "fixed"
+
+
+async def _rank(query: str, q_vec, mode: str) -> list[int]:
+    """
+    Retrieve and rerank; returns FAISS ids, best first.
+    """
+    loop = asyncio.get_running_loop()
+    adaptive = mode == "adaptive"
+
+    # 2️⃣ Retrieve from FAISS (+ BM25 in parallel, fused with RRF)
+    dense = loop.run_in_executor(
+        search_executor,
+        _measured, "dense_search",
+        _adaptive_search if adaptive else dense_search, index, q_vec, RETRIEVE_K
+    )
+
+    if bm25 is not None:
+        lexical = loop.run_in_executor(
+            search_executor,
+            _measured, "lexical_search", lexical_search, bm25, query, RETRIEVE_K
+        )
+        rankings = await asyncio.gather(dense, lexical)
+        retrieved = [idx for idx, _ in reciprocal_rank_fusion(rankings)]
+    else:
+        retrieved = await dense
+
+    if not retrieved:
+        EMPTY_RETRIEVALS.inc()
+        return []
+
     # 3️⃣ Rerank top candidates
-    TOP_RERANK = 5
+    TOP_RERANK = RERANK_TOP
     rerank_candidates = retrieved[:TOP_RERANK]
     candidate_texts = [chunks[i]["text"] for i in rerank_candidates]
+    candidate_ids = [chunks[i]["chunk_id"] for i in rerank_candidates]
 
-    rerank_scores = rerank(query, candidate_texts)
+    with STAGE_SECONDS.time(stage="rerank"):
+        rerank_scores = await rerank_batcher.run(
+            (query, candidate_texts, candidate_ids)
+        )
 
     reranked_top = [
         idx for _, idx in sorted(
@@ -93,23 +693,179 @@ def ask(req: QueryReq):
         )
     ]
 
-    reranked = reranked_top + retrieved[TOP_RERANK:]
+    return reranked_top + retrieved[TOP_RERANK:]
 
-    # 4️⃣ Generate answer from top contexts
-    TOP_CONTEXT = 3
-    contexts = [chunks[i]["text"] for i in reranked[:TOP_CONTEXT]]
 
-    answer = generate_answer(query, contexts)
+def _adaptive_search(index, q_vec, k: int) -> list[int]:
+    ids, raised_to = adaptive_dense_search(index, q_vec, k, ADAPTIVE_MAX_EF, ADAPTIVE_MIN_GAP)
+    if raised_to is not None:
+        ADAPTIVE_EF_RAISED.inc()
+    return ids
 
-    return {
-        "query": query,
-        "answer": answer,
-        "sources": [
-            {
-                "rank": r + 1,
-                "doc_id": chunks[idx]["doc_id"],
-                "preview": chunks[idx]["text"][:200]
-            }
-            for r, idx in enumerate(reranked[:TOP_CONTEXT])
-        ]
-    }
+
+def _measured(stage: str, fn, *args):
+    """
+    fn(*args), timed into the stage histogram (for executor calls).
+    """
+    with STAGE_SECONDS.time(stage=stage):
+        return fn(*args)
+
+
+@app.post("/ask/batch")
+async def ask_batch(req: BatchQueryReq):
+    """
+    Answer many queries in one request: one embedding call, one
+    multi-query search, one rerank pass and length-grouped generation
+    (RAG.batch_answer). Answers are in query order.
+    """
+    queries = req.queries
+    if len(queries) > ASK_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {ASK_BATCH_MAX_QUERIES} queries per batch, got {len(queries)}"
+        )
+
+    REQUESTS.inc(len(queries), endpoint="/ask/batch")
+    loop = asyncio.get_running_loop()
+
+    with REQUEST_SECONDS.time(endpoint="/ask/batch"):
+        results = await loop.run_in_executor(batch_executor, _answer_batch, queries)
+
+    return {"results": results}
+
+
+def _answer_batch(queries: list[str]) -> list[dict]:
+    if not queries:
+        return []
+
+    # 1️⃣ Embed all queries in one call
+    with STAGE_SECONDS.time(stage="batch_embed"):
+        q_vecs = embed_texts(queries, use_cache=True)
+
+    # Near-duplicates of answered questions are served from the cache
+    # (batches always search at the index's own efSearch)
+    results = [None] * len(queries)
+    for i, q_vec in enumerate(q_vecs):
+        cached = response_cache.lookup(q_vec, "fixed")
+        if cached is not None:
+            results[i] = {"query": queries[i], **cached, "cached": True}
+
+    todo = [i for i, r in enumerate(results) if r is None]
+    if todo:
+        # 2️⃣ 3️⃣ 4️⃣ Retrieve, rerank and generate the rest together
+        timings = {}
+        answered = answer_batch(
+            [queries[i] for i in todo],
+            index,
+            chunks,
+            bm25,
+            retrieve_k=RETRIEVE_K,
+            rerank_top=RERANK_TOP,
+            top_context=TOP_CONTEXT,
+            generate=GENERATE,
+            gen_batch_size=GEN_BATCH_SIZE,
+            q_vecs=q_vecs[todo],
+            timings=timings
+        )
+        for stage, seconds in timings.items():
+            STAGE_SECONDS.observe(seconds, stage=f"batch_{stage}")
+
+        for i, result in zip(todo, answered):
+            if not result["sources"]:
+                EMPTY_RETRIEVALS.inc()
+                results[i] = {"query": queries[i], "answer": NO_ANSWER, "sources": []}
+                continue
+            payload = {"answer": result["answer"], "sources": result["sources"]}
+            response_cache.store(q_vecs[i], payload, "fixed")
+            results[i] = {"query": queries[i], **payload}
+
+    return results
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/ask/stream")
+async def ask_stream(req: QueryReq):
+    """
+    Server-sent events: `sources` as soon as reranking is done, then one
+    `token` event per decoded piece, then `done` with timings.
+    Disconnecting stops decoding.
+    """
+    return StreamingResponse(
+        _stream_events(req.query, req.adaptive_ef),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _stream_events(query: str, adaptive_ef: Optional[bool] = None):
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    stream_stats["streams"] += 1
+    REQUESTS.inc(endpoint="/ask/stream")
+
+    # 1️⃣ Embed query
+    with STAGE_SECONDS.time(stage="embed"):
+        q_vec = (await embed_batcher.run(query)).reshape(1, -1)
+
+    mode = _search_mode(adaptive_ef)
+    cached = await _cache_lookup(q_vec[0], mode)
+    if cached is not None:
+        yield _sse("sources", cached["sources"])
+        if cached["answer"] is not None:
+            yield _sse("token", cached["answer"])
+        yield _sse("done", {"cached": True})
+        return
+
+    # 2️⃣ 3️⃣ Retrieve + rerank
+    reranked = await _rank(query, q_vec, mode)
+    sources = _sources(reranked)
+    yield _sse("sources", sources)
+
+    if not reranked or not GENERATE:
+        if GENERATE:
+            yield _sse("token", NO_ANSWER)
+        yield _sse("done", {"cached": False})
+        return
+
+    # 4️⃣ Stream the answer
+    contexts = [chunks[i]["text"] for i in reranked[:TOP_CONTEXT]]
+    stop = threading.Event()
+    pieces = []
+    ttft_ms = None
+
+    async with stream_slots:
+        t_gen = time.perf_counter()
+        tokens = stream_answer(query, contexts, stop_event=stop, q_vec=q_vec[0])
+        try:
+            while True:
+                piece = await loop.run_in_executor(stream_executor, next, tokens, None)
+                if piece is None:
+                    break
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - t0) * 1000
+                pieces.append(piece)
+                yield _sse("token", piece)
+        finally:
+            # Client went away (task cancelled) → stop decoding now
+            if not stop.is_set():
+                stop.set()
+                stream_stats["cancelled"] += 1
+
+    total_ms = (time.perf_counter() - t0) * 1000
+    STAGE_SECONDS.observe(time.perf_counter() - t_gen, stage="stream_generate")
+    REQUEST_SECONDS.observe(total_ms / 1000, endpoint="/ask/stream")
+    stream_stats["completed"] += 1
+    stream_stats["ttft_ms_total"] += ttft_ms or total_ms
+    stream_stats["total_ms_total"] += total_ms
+
+    await _cache_store(q_vec[0], {"answer": "".join(pieces).strip(), "sources": sources}, mode)
+
+    yield _sse("done", {
+        "cached": False,
+        "ttft_ms": ttft_ms,
+        "generate_ms": (time.perf_counter() - t_gen) * 1000,
+        "total_ms": total_ms
+    })
@@ -0,0 +1,179 @@
+import os
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+# ================= CONFIG =================
+
+# "torch" (fp32 eager, default), "int8" (torch dynamic quantization of
+# nn.Linear) or "onnx" (ONNX Runtime, exported by RAG.export_onnx).
+# Per model: RAG_EMBED_BACKEND / RAG_RERANK_BACKEND / RAG_LLM_BACKEND,
+# falling back to RAG_BACKEND.
+BACKENDS = ("torch", "int8", "onnx")
+
+ONNX_DIR = Path(os.environ.get("RAG_ONNX_DIR", "/artifacts/onnx"))
+
+# =========================================
+
+
+def backend_for(model_key: str) -> str:
+    """
+    Backend configured for one model ("EMBED", "RERANK" or "LLM").
+    """
+    backend = os.environ.get(
+        f"RAG_{model_key}_BACKEND",
+        os.environ.get("RAG_BACKEND", "torch")
+    ).lower()
+
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend {backend!r} for {model_key}; expected one of {BACKENDS}"
+        )
+    return backend
+
+
+def onnx_model_dir(model_key: str) -> Path:
+    return ONNX_DIR / model_key.lower()
+
+
+def quantize_int8(module):
+    """
+    Dynamic int8 quantization of every nn.Linear, in place. Weights are
+    stored as int8; activations are quantized per batch at runtime.
+    """
+    import torch
+
+    return torch.quantization.quantize_dynamic(
+        module,
+        {torch.nn.Linear},
+        dtype=torch.qint8,
+        inplace=True
+    )
+
+
+def require_optimum():
+    try:
+        import optimum.onnxruntime as ort
+    except ImportError as exc:
+        raise RuntimeError(
+            "The onnx backend requires 'optimum[onnxruntime]'"
+        ) from exc
+    return ort
+
+
+def _require_onnx_dir(model_key: str) -> Path:
+    model_dir = onnx_model_dir(model_key)
+    if not model_dir.exists():
+        raise RuntimeError(
+            f"No ONNX export at {model_dir}; run `python -m RAG.export_onnx` first"
+        )
+    return model_dir
+
+
+class OnnxSentenceEncoder:
+    """
+    ONNX Runtime stand-in for the SentenceTransformer calls we use
+    (encode, get_sentence_embedding_dimension). Mean pooling over the
+    attention mask, as in all-MiniLM-L6-v2.
+    """
+
+    def __init__(self, model_key: str = "EMBED"):
+        from transformers import AutoTokenizer
+
+        ort = require_optimum()
+        model_dir = _require_onnx_dir(model_key)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ort.ORTModelForFeatureExtraction.from_pretrained(model_dir)
+        self.max_seq_length = 256
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.model.config.hidden_size)
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        normalize_embeddings: bool = False
+    ) -> np.ndarray:
+        out = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            hidden = self.model(**inputs).last_hidden_state
+            hidden = np.asarray(hidden, dtype="float32")
+
+            mask = inputs["attention_mask"][..., None].astype("float32")
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            out.append(pooled)
+
+        if not out:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype="float32")
+
+        vecs = np.concatenate(out)
+        if normalize_embeddings:
+            vecs /= np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        return vecs
+
+
+class OnnxCrossEncoder:
+    """
+    ONNX Runtime stand-in for CrossEncoder.predict. Single-logit models
+    get the same sigmoid CrossEncoder applies by default.
+    """
+
+    def __init__(self, model_key: str = "RERANK"):
+        from transformers import AutoTokenizer
+
+        ort = require_optimum()
+        model_dir = _require_onnx_dir(model_key)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ort.ORTModelForSequenceClassification.from_pretrained(model_dir)
+
+    def predict(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        batch_size: int = 32
+    ) -> np.ndarray:
+        out = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            inputs = self.tokenizer(
+                [q for q, _ in batch],
+                [t for _, t in batch],
+                padding=True,
+                truncation=True,
+                max_length=512,
+                return_tensors="np"
+            )
+            logits = np.asarray(self.model(**inputs).logits, dtype="float32")
+            if logits.shape[1] == 1:
+                logits = 1.0 / (1.0 + np.exp(-logits[:, 0]))
+            out.append(logits)
+
+        return np.concatenate(out) if out else np.zeros(0, dtype="float32")
+
+
+def load_onnx_seq2seq(model_key: str = "LLM"):
+    """
+    (tokenizer, model) for an exported seq2seq model. The ORT model
+    supports generate(), streamers and stopping criteria.
+    """
+    from transformers import AutoTokenizer
+
+    ort = require_optimum()
+    model_dir = _require_onnx_dir(model_key)
+
+    return (
+        AutoTokenizer.from_pretrained(model_dir),
+        ort.ORTModelForSeq2SeqLM.from_pretrained(model_dir)
+    )
@@ -0,0 +1,324 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from RAG.embeddings_free import embed_texts
+from RAG.faiss_hnsw import search_index
+from RAG.reranker_cross_encoder import rerank_batch
+from RAG.retriever import hybrid_search_batch
+
+
+# ===== CONFIG =====
+ARTIFACTS_DIR = Path(__file__).resolve().parent.parent / "artifacts"
+
+RETRIEVE_K = 10
+RERANK_TOP = 5
+TOP_CONTEXT = 3
+GEN_BATCH_SIZE = 16         # prompts per generate() call, grouped by length
+BATCH_SIZE = 256            # queries per answer_batch() call in the CLI
+
+NO_ANSWER = "I could not find relevant information in the documents."
+
+
+# ===== BATCH PIPELINE =====
+
+def rank_batch(
+    queries: List[str],
+    q_vecs: np.ndarray,
+    index,
+    chunks,
+    bm25=None,
+    retrieve_k: int = RETRIEVE_K,
+    rerank_top: int = RERANK_TOP,
+    timings: Optional[Dict[str, float]] = None
+) -> List[List[int]]:
+    """
+    Retrieve and rerank N queries: one multi-query index.search and one
+    cross-encoder pass over every (query, candidate) pair. Returns FAISS
+    ids per query, best first ([] when nothing was retrieved).
+    """
+    timings = {} if timings is None else timings
+
+    # 2️⃣ Retrieve: all queries in one search (+ BM25 over the batch alongside, fused with RRF)
+    t0 = time.perf_counter()
+    q_vecs = np.ascontiguousarray(q_vecs, dtype="float32")
+    if bm25 is not None:
+        retrieved = hybrid_search_batch(queries, q_vecs, index, bm25, retrieve_k)
+    else:
+        _, indices = search_index(index, q_vecs, retrieve_k)
+        retrieved = [[int(i) for i in row if i != -1] for row in indices]
+    timings["search"] = timings.get("search", 0.0) + time.perf_counter() - t0
+
+    # 3️⃣ Rerank: top candidates of every query in one pass
+    t0 = time.perf_counter()
+    candidates = [ids[:rerank_top] for ids in retrieved]
+    scores = rerank_batch([
+        (
+            query,
+            [chunks[i]["text"] for i in ids],
+            [chunks[i]["chunk_id"] for i in ids]
+        )
+        for query, ids in zip(queries, candidates)
+    ])
+    timings["rerank"] = timings.get("rerank", 0.0) + time.perf_counter() - t0
+
+    return [
+        [idx for _, idx in sorted(zip(s, ids), reverse=True)] + full[rerank_top:]
+        for s, ids, full in zip(scores, candidates, retrieved)
+    ]
+
+
+def sources(chunks, reranked: List[int], top: int = TOP_CONTEXT) -> List[dict]:
+    return [
+        {
+            "rank": r + 1,
+            "doc_id": chunks[idx]["doc_id"],
+            "preview": chunks[idx]["text"][:200]
+        }
+        for r, idx in enumerate(reranked[:top])
+    ]
+
+
+def answer_batch(
+    queries: List[str],
+    index,
+    chunks,
+    bm25=None,
+    retrieve_k: int = RETRIEVE_K,
+    rerank_top: int = RERANK_TOP,
+    top_context: int = TOP_CONTEXT,
+    generate: bool = True,
+    gen_batch_size: int = GEN_BATCH_SIZE,
+    max_new_tokens: int = 200,
+    q_vecs: Optional[np.ndarray] = None,
+    timings: Optional[Dict[str, float]] = None
+) -> List[dict]:
+    """
+    Answer N queries together: one embedding call, one multi-query search,
+    one rerank pass, and generation in length-grouped batches. Returns
+    {"query", "answer", "sources"} per query, in input order; answer is
+    None with generate=False.
+
+    q_vecs skips step 1 when the caller has the query embeddings already.
+    timings, if given, accumulates seconds per stage.
+    """
+    timings = {} if timings is None else timings
+    if not queries:
+        return []
+
+    # 1️⃣ Embed all queries in one call
+    if q_vecs is None:
+        t0 = time.perf_counter()
+        q_vecs = embed_texts(queries, use_cache=True)
+        timings["embed"] = timings.get("embed", 0.0) + time.perf_counter() - t0
+
+    # 2️⃣ 3️⃣ Retrieve + rerank
+    ranked = rank_batch(queries, q_vecs, index, chunks, bm25, retrieve_k, rerank_top, timings)
+
+    # 4️⃣ Generate, grouping prompts of similar length into one generate()
+    answers: List[Optional[str]] = [None] * len(queries)
+    if generate:
+        from RAG.llm_flan_t5 import generate_answers_grouped
+
+        todo = [i for i, ids in enumerate(ranked) if ids]
+        t0 = time.perf_counter()
+        generated = generate_answers_grouped(
+            [
+                (queries[i], [chunks[c]["text"] for c in ranked[i][:top_context]], q_vecs[i])
+                for i in todo
+            ],
+            batch_size=gen_batch_size,
+            max_new_tokens=max_new_tokens
+        )
+        timings["generate"] = timings.get("generate", 0.0) + time.perf_counter() - t0
+
+        for i, answer in zip(todo, generated):
+            answers[i] = answer
+        for i, ids in enumerate(ranked):
+            if not ids:
+                answers[i] = NO_ANSWER
+
+    return [
+        {
+            "query": query,
+            "answer": answer,
+            "sources": sources(chunks, ids, top_context)
+        }
+        for query, answer, ids in zip(queries, answers, ranked)
+    ]
+
+
+# ===== JSONL JOB =====
+
+def load_search_index(artifacts: Path):
+    """
+    The index build_index wrote last: the shards behind the shard map
+    when there is one (searched in-process, global ids), else the single
+    index file.
+    """
+    from RAG.faiss_hnsw import load_index
+    from RAG.sharded_index import SHARD_MAP_NAME, ShardedIndex
+
+    if (artifacts / SHARD_MAP_NAME).exists():
+        return ShardedIndex(artifacts / SHARD_MAP_NAME, mode="thread")
+    return load_index(str(artifacts / "policy_hnsw.index"))
+
+
+def load_artifacts(artifacts: Path):
+    """
+    (index, chunks, bm25 or None) as build_index writes them.
+    """
+    from RAG.bm25 import BM25Index
+    from RAG.chunk_store import ChunkStore, is_chunk_store
+
+    index = load_search_index(artifacts)
+
+    if is_chunk_store(artifacts / "chunks.store"):
+        chunks = ChunkStore(artifacts / "chunks.store")
+    else:
+        with open(artifacts / "chunks.json", "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+
+    bm25_path = artifacts / "bm25.npz"
+    bm25 = BM25Index.load(bm25_path) if bm25_path.exists() else None
+    return index, chunks, bm25
+
+
+def read_queries(path: Path) -> Iterator[dict]:
+    """
+    One record per non-empty line: {"query": ..., other fields kept} or
+    a bare JSON string.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield {"query": record} if isinstance(record, str) else record
+
+
+def resume_point(out_path: Path) -> int:
+    """
+    Answers already in the output. The output is the checkpoint: each
+    batch is appended and fsync'ed, so a complete line is a finished
+    query. A torn last line (killed mid-write) is cut off.
+    """
+    if not out_path.exists():
+        return 0
+
+    with open(out_path, "rb+") as f:
+        data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            f.truncate(complete)
+    return data.count(b"\n", 0, complete)
+
+
+def run_job(
+    in_path: Path,
+    out_path: Path,
+    index,
+    chunks,
+    bm25=None,
+    batch_size: int = BATCH_SIZE,
+    restart: bool = False,
+    **answer_kw
+) -> dict:
+    """
+    Stream in_path through answer_batch, batch_size queries at a time,
+    appending to out_path. Picks up after the last finished batch unless
+    restart is set. Returns run totals.
+    """
+    done = 0 if restart else resume_point(out_path)
+    if done:
+        print(f"⏩ Resuming after {done} answered queries")
+
+    records = itertools.islice(read_queries(in_path), done, None)
+    timings: Dict[str, float] = {}
+    answered = 0
+    t_start = time.perf_counter()
+
+    with open(out_path, "w" if restart else "a", encoding="utf-8") as out:
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+
+            results = answer_batch(
+                [r["query"] for r in batch], index, chunks, bm25, timings=timings, **answer_kw
+            )
+            for record, result in zip(batch, results):
+                out.write(json.dumps({**record, **result}, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+
+            answered += len(batch)
+            elapsed = time.perf_counter() - t_start
+            print(
+                f"✅ {done + answered} answered "
+                f"({answered / elapsed:.1f} queries/s this run)"
+            )
+
+    elapsed = time.perf_counter() - t_start
+    return {
+        "resumed_from": done,
+        "answered": answered,
+        "seconds": elapsed,
+        "queries_per_s": answered / elapsed if elapsed > 0 else 0.0,
+        "stage_seconds": timings
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of queries in batches")
+    parser.add_argument("queries", type=Path, help='input JSONL, one {"query": ...} per line')
+    parser.add_argument("out", type=Path, help="output JSONL; also the resume checkpoint")
+    parser.add_argument("--artifacts", type=Path, default=ARTIFACTS_DIR)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--gen-batch-size", type=int, default=GEN_BATCH_SIZE)
+    parser.add_argument("--max-new-tokens", type=int, default=200)
+    parser.add_argument("--retrieve-k", type=int, default=RETRIEVE_K)
+    parser.add_argument("--rerank-top", type=int, default=RERANK_TOP)
+    parser.add_argument("--retrieval-only", action="store_true", help="sources only, no generation")
+    parser.add_argument("--restart", action="store_true", help="overwrite the output instead of resuming")
+    args = parser.parse_args()
+
+    print("\n===== BATCH ANSWERING =====\n")
+
+    index, chunks, bm25 = load_artifacts(args.artifacts)
+    print(f"📦 {index.ntotal} vectors, BM25 {'on' if bm25 is not None else 'off'}")
+
+    totals = run_job(
+        args.queries,
+        args.out,
+        index,
+        chunks,
+        bm25,
+        batch_size=args.batch_size,
+        restart=args.restart,
+        retrieve_k=args.retrieve_k,
+        rerank_top=args.rerank_top,
+        generate=not args.retrieval_only,
+        gen_batch_size=args.gen_batch_size,
+        max_new_tokens=args.max_new_tokens
+    )
+
+    print(
+        f"\n🏁 {totals['answered']} queries in {totals['seconds']:.1f}s "
+        f"→ {totals['queries_per_s']:.1f} queries/s"
+    )
+    for stage, seconds in totals["stage_seconds"].items():
+        print(f"   {stage:<9} {seconds:8.2f}s")
+    print(f"💾 Answers in {args.out}")
+
+    print("\n===== END BATCH ANSWERING =====\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty
+from typing import Any, Callable, List
+
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from concurrent requests and runs them
+    through `batch_fn` as a single call.
+
+    A batch is closed when it holds `max_batch_size` items or when the
+    first item in it has waited `max_wait_ms`. `batch_fn` receives a list
+    of items and must return one result per item, in the same order.
+
+    `workers` bounds how many batches of this stage run at once; each
+    worker is a dedicated thread, so a saturated stage never borrows
+    threads from another stage or from the event loop.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "batcher",
+        workers: int = 1
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self.workers = workers
+
+        self._queue: Queue = Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f"{self.name}-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        with self._lock:
+            if not self._threads:
+                return
+            for _ in self._threads:
+                self._queue.put(_STOP)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue one item; the returned future resolves to its result.
+        """
+        if not self._threads:
+            self.start()
+
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        return self.submit(item).result()
+
+    async def run(self, item: Any) -> Any:
+        """
+        Awaitable variant of __call__ for async request handlers.
+        """
+        return await asyncio.wrap_future(self.submit(item))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+            "workers": self.workers
+        }
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+                if nxt is _STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            self._run_batch(batch)
+
+            if stopping:
+                return
+
+    def _run_batch(self, batch):
+        # Callers that went away (e.g. a cancelled request task cancels
+        # its wrapped future) are dropped; the rest can no longer be
+        # cancelled once marked running
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        items = [item for item, _ in batch]
+
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: batch_fn returned {len(results)} "
+                    f"results for {len(items)} items"
+                )
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(items)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from RAG.backends import BACKENDS
+
+
+QUERIES = [
+    "What are the penalties for non-compliance?",
+    "Who approves guidance documents?",
+    "How often is the policy reviewed?",
+    "What is the purpose of the policy statement?",
+    "Who is responsible for IT security incidents?",
+    "How do employees request leave?",
+    "What forms are required for onboarding?",
+    "Where are policy templates stored?",
+]
+
+CANDIDATES = [
+    "Violations of this policy may result in disciplinary action up to and including termination.",
+    "Guidance documents are approved by the policy owner and reviewed by the compliance office.",
+    "All policies must be reviewed at least every three years or when regulations change.",
+    "The policy statement describes the intent and scope of the policy.",
+    "Security incidents must be reported to the IT service desk within 24 hours.",
+]
+
+
+def _rss_mb(field: str = "VmRSS") -> float:
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _timed_ms(fn, repeat: int):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - t0) / repeat * 1000
+
+
+def _child(backend: str, out_path: Path, repeat: int, max_new_tokens: int):
+    """
+    Runs in a fresh process: backends are chosen at import time.
+    """
+    base_rss = _rss_mb()
+    t0 = time.perf_counter()
+
+    from RAG.embeddings_free import embed_texts
+    from RAG.reranker_cross_encoder import rerank_batch
+    from RAG.llm_flan_t5 import generate_answers
+
+    load_s = time.perf_counter() - t0
+    load_rss = _rss_mb() - base_rss
+
+    vecs, embed_ms = _timed_ms(lambda: embed_texts(QUERIES), repeat)
+    scores, rerank_ms = _timed_ms(
+        lambda: rerank_batch([(q, CANDIDATES) for q in QUERIES]), repeat
+    )
+    answers, generate_ms = _timed_ms(
+        lambda: generate_answers(
+            [(q, CANDIDATES[:3]) for q in QUERIES],
+            max_new_tokens=max_new_tokens
+        ),
+        1
+    )
+
+    np.savez(out_path, vecs=vecs, scores=np.array(scores, dtype="float32"))
+    print(json.dumps({
+        "backend": backend,
+        "load_s": load_s,
+        "load_rss_mb": load_rss,
+        "peak_rss_mb": _rss_mb("VmHWM") - base_rss,
+        "embed_ms": embed_ms,
+        "rerank_ms": rerank_ms,
+        "generate_ms": generate_ms,
+        "answers": answers
+    }))
+
+
+def _measure(backend: str, out_path: Path, args) -> dict:
+    env = dict(os.environ, RAG_BACKEND=backend)
+    for key in ("EMBED", "RERANK", "LLM"):
+        env.pop(f"RAG_{key}_BACKEND", None)
+
+    out = subprocess.run(
+        [sys.executable, "-m", "RAG.bench_backends", "--child", backend, str(out_path),
+         "--repeat", str(args.repeat), "--max-new-tokens", str(args.max_new_tokens)],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=env
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    with np.load(out_path) as data:
+        result["vecs"] = data["vecs"]
+        result["scores"] = data["scores"]
+    return result
+
+
+def parity(ref: dict, other: dict) -> dict:
+    """
+    Drift of `other` against the fp32 torch reference on the fixed set.
+    """
+    cos = (ref["vecs"] * other["vecs"]).sum(axis=1) / (
+        np.linalg.norm(ref["vecs"], axis=1) * np.linalg.norm(other["vecs"], axis=1)
+    )
+
+    ref_order = np.argsort(-ref["scores"], axis=1, kind="stable")
+    other_order = np.argsort(-other["scores"], axis=1, kind="stable")
+
+    return {
+        "min_cosine": float(cos.min()),
+        "mean_cosine": float(cos.mean()),
+        "top1_agree": float(np.mean(ref_order[:, 0] == other_order[:, 0])),
+        "order_agree": float(np.mean(np.all(ref_order == other_order, axis=1))),
+        "answers_equal": float(np.mean([
+            a == b for a, b in zip(ref["answers"], other["answers"])
+        ]))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="torch vs int8 vs onnx model backends")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument(
+        "--min-cosine", type=float, default=0.0,
+        help="exit non-zero if any backend's embedding cosine drops below this"
+    )
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child[0], Path(args.child[1]), args.repeat, args.max_new_tokens)
+        return
+
+    print("\n===== MODEL BACKEND BENCHMARK =====\n")
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            try:
+                results[backend] = _measure(backend, Path(tmp) / f"{backend}.npz", args)
+            except subprocess.CalledProcessError as e:
+                last = (e.stderr or "").strip().splitlines()[-1:] or ["?"]
+                print(f"⚠️  {backend}: failed ({last[0]})")
+
+    if "torch" not in results:
+        print("❌ torch reference failed; nothing to compare against")
+        sys.exit(1)
+
+    print(
+        f"{'backend':<8} {'load s':>7} {'RSS +MB':>8} {'peak +MB':>9} "
+        f"{'embed ms':>9} {'rerank ms':>10} {'gen ms':>9}"
+    )
+    for r in results.values():
+        print(
+            f"{r['backend']:<8} {r['load_s']:>7.1f} {r['load_rss_mb']:>8.0f} "
+            f"{r['peak_rss_mb']:>9.0f} {r['embed_ms']:>9.1f} {r['rerank_ms']:>10.1f} "
+            f"{r['generate_ms']:>9.0f}"
+        )
+
+    print(f"\nParity vs torch fp32 ({len(QUERIES)} queries x {len(CANDIDATES)} candidates)\n")
+    print(
+        f"{'backend':<8} {'min cos':>8} {'mean cos':>9} {'top1 agree':>11} "
+        f"{'order agree':>12} {'answers =':>10}"
+    )
+
+    failed = False
+    for backend, r in results.items():
+        if backend == "torch":
+            continue
+        p = parity(results["torch"], r)
+        failed |= p["min_cosine"] < args.min_cosine
+        print(
+            f"{backend:<8} {p['min_cosine']:>8.4f} {p['mean_cosine']:>9.4f} "
+            f"{p['top1_agree']:>11.2f} {p['order_agree']:>12.2f} {p['answers_equal']:>10.2f}"
+        )
+
+    print("\n===== END BENCHMARK =====\n")
+
+    if failed:
+        print(f"❌ embedding cosine below {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from RAG.batching import MicroBatcher
+from RAG.embeddings_free import embed_texts
+from RAG.reranker_cross_encoder import rerank, rerank_batch
+from RAG.llm_flan_t5 import generate_answer, generate_answers
+
+
+QUERIES = [
+    "What are the penalties for non-compliance?",
+    "Who approves guidance documents?",
+    "How often is the policy reviewed?",
+    "What is the purpose of the policy statement?",
+    "Who is responsible for IT security incidents?",
+    "How do employees request leave?",
+    "What forms are required for onboarding?",
+    "Where are policy templates stored?",
+]
+
+CANDIDATES = [
+    "Violations of this policy may result in disciplinary action up to and including termination.",
+    "Guidance documents are approved by the policy owner and reviewed by the compliance office.",
+    "All policies must be reviewed at least every three years or when regulations change.",
+    "The policy statement describes the intent and scope of the policy.",
+    "Security incidents must be reported to the IT service desk within 24 hours.",
+]
+
+
+def _percentile(values, q):
+    return float(np.percentile(np.array(values), q)) if values else 0.0
+
+
+def _run_load(handler, concurrency, requests_per_client):
+    latencies = []
+
+    def client(client_id):
+        local = []
+        for i in range(requests_per_client):
+            query = QUERIES[(client_id + i) % len(QUERIES)]
+            t0 = time.perf_counter()
+            handler(query)
+            local.append(time.perf_counter() - t0)
+        return local
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for local in pool.map(client, range(concurrency)):
+            latencies.extend(local)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "qps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000
+    }
+
+
+def unbatched_handler(max_new_tokens):
+    def handle(query):
+        embed_texts([query])
+        rerank(query, CANDIDATES)
+        return generate_answer(query, CANDIDATES[:3], max_new_tokens=max_new_tokens)
+    return handle
+
+
+def batched_handler(max_batch_size, max_wait_ms, max_new_tokens):
+    embed = MicroBatcher(
+        lambda queries: list(embed_texts(queries)),
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+        name="embed"
+    )
+    rr = MicroBatcher(
+        rerank_batch,
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+        name="rerank"
+    )
+    gen = MicroBatcher(
+        lambda reqs: generate_answers(reqs, max_new_tokens=max_new_tokens),
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+        name="generate"
+    )
+
+    def handle(query):
+        embed(query)
+        rr((query, CANDIDATES))
+        return gen((query, CANDIDATES[:3]))
+
+    return handle, (embed, rr, gen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched vs unbatched /ask stage throughput")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=4, help="requests per client")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    print("\n===== MICRO-BATCHING BENCHMARK =====\n")
+    print(
+        f"concurrency={args.concurrency} requests/client={args.requests} "
+        f"max_batch_size={args.max_batch_size} max_wait_ms={args.max_wait_ms}"
+    )
+
+    # Warm up both paths so model init is not measured
+    unbatched_handler(args.max_new_tokens)(QUERIES[0])
+
+    unbatched = _run_load(
+        unbatched_handler(args.max_new_tokens),
+        args.concurrency,
+        args.requests
+    )
+
+    handler, batchers = batched_handler(
+        args.max_batch_size,
+        args.max_wait_ms,
+        args.max_new_tokens
+    )
+    batched = _run_load(handler, args.concurrency, args.requests)
+    for b in batchers:
+        b.stop()
+
+    print(f"\n{'mode':<10} {'qps':>8} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, r in (("unbatched", unbatched), ("batched", batched)):
+        print(f"{name:<10} {r['qps']:>8.2f} {r['p50_ms']:>10.1f} {r['p99_ms']:>10.1f}")
+
+    for b in batchers:
+        print(f"{b.name}: {b.stats()}")
+
+    print(f"\nSpeedup (qps): {batched['qps'] / unbatched['qps']:.2f}x")
+    print("\n===== END BENCHMARK =====\n")
+
+
+if __name__ == "__main__":
+    main()
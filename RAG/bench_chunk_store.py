@@ -0,0 +1,110 @@
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from RAG.chunk_store import ChunkStore, convert_json
+
+
+ARTIFACTS_DIR = Path(__file__).resolve().parent.parent / "artifacts"
+
+
+def _rss_mb(field: str = "VmRSS") -> float:
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _child(mode: str, path: Path, lookups: int):
+    base_rss = _rss_mb()
+    base_anon = _rss_mb("RssAnon")
+    t0 = time.perf_counter()
+
+    if mode == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+    else:
+        chunks = ChunkStore(path)
+    n = len(chunks)
+    startup_s = time.perf_counter() - t0
+
+    rng = random.Random(0)
+    ids = [rng.randrange(n) for _ in range(lookups)]
+    t0 = time.perf_counter()
+    for i in ids:
+        chunks[i]["text"]
+    lookup_us = (time.perf_counter() - t0) / max(lookups, 1) * 1e6
+
+    print(json.dumps({
+        "mode": mode,
+        "chunks": n,
+        "startup_ms": startup_s * 1000,
+        "lookup_us": lookup_us,
+        "rss_delta_mb": _rss_mb() - base_rss,
+        # Private memory; mapped file pages are shared via the page cache
+        "anon_delta_mb": _rss_mb("RssAnon") - base_anon
+    }))
+
+
+def _measure(mode: str, path: Path, lookups: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "RAG.bench_chunk_store", "--child", mode, str(path),
+         "--lookups", str(lookups)],
+        check=True,
+        capture_output=True,
+        text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="chunks.json vs mmap chunk store")
+    parser.add_argument("--chunks-json", type=Path, default=ARTIFACTS_DIR / "chunks.json")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child[0], Path(args.child[1]), args.lookups)
+        return
+
+    print("\n===== CHUNK STORE BENCHMARK =====\n")
+
+    if not args.chunks_json.exists():
+        print(f"❌ {args.chunks_json} not found")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = Path(tmp) / "chunks.store"
+        convert_json(args.chunks_json, store_dir)
+
+        json_mb = args.chunks_json.stat().st_size / 1e6
+        store_mb = sum(p.stat().st_size for p in store_dir.iterdir()) / 1e6
+        print(f"On disk: chunks.json {json_mb:.2f} MB | chunk store {store_mb:.2f} MB\n")
+
+        results = [
+            _measure("json", args.chunks_json, args.lookups),
+            _measure("store", store_dir, args.lookups)
+        ]
+
+    print(
+        f"{'format':<8} {'chunks':>8} {'startup ms':>11} {'lookup us':>10} "
+        f"{'RSS +MB':>9} {'anon +MB':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<8} {r['chunks']:>8} {r['startup_ms']:>11.1f} "
+            f"{r['lookup_us']:>10.1f} {r['rss_delta_mb']:>9.1f} {r['anon_delta_mb']:>9.1f}"
+        )
+
+    print("\n===== END BENCHMARK =====\n")
+
+
+if __name__ == "__main__":
+    main()
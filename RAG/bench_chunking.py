@@ -0,0 +1,134 @@
+import argparse
+import random
+import time
+
+from RAG.Chunking import RecursiveTextSplitter, chunk_document
+
+
+WORDS = (
+    "policy employee manager approval leave request security incident report "
+    "compliance review procedure form section department training access data"
+).split()
+
+
+def synthetic_document(size_mb: float, unbroken_kb: int = 64, seed: int = 0) -> dict:
+    """
+    Paragraph text with page blocks every ~600 chars, plus one long run
+    without any separator (tables / encoded data extracted as one line).
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+
+    parts, blocks = [], []
+    cursor, page = 0, 1
+
+    while cursor < target:
+        if unbroken_kb and not blocks:
+            block_text = "".join(rng.choice("abcdef0123456789") for _ in range(unbroken_kb * 1024))
+        else:
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 20))).capitalize() + "."
+                for _ in range(rng.randint(2, 8))
+            ]
+            block_text = " ".join(sentences) + rng.choice(["\n", "\n\n", "\n\n\n"])
+
+        parts.append(block_text)
+        blocks.append({
+            "start": cursor,
+            "end": cursor + len(block_text),
+            "page": page,
+            "type": "text"
+        })
+        cursor += len(block_text)
+        page += rng.random() < 0.2
+
+    return {
+        "doc_id": "synthetic",
+        "source_path": "synthetic.pdf",
+        "text": "".join(parts),
+        "blocks": blocks
+    }
+
+
+def _dominant_block(blocks, start, end):
+    best = None
+    best_overlap = 0
+
+    for block in blocks:
+        overlap = max(0, min(end, block["end"]) - max(start, block["start"]))
+        if overlap > best_overlap:
+            best_overlap = overlap
+            best = block
+
+    return best
+
+
+def legacy_chunk_document(doc: dict) -> list[dict]:
+    """
+    The previous chunk_document: string-building recursive split,
+    prepended overlap, cursor offsets and a linear block scan per chunk.
+    """
+    splitter = RecursiveTextSplitter(chunk_size=1200, chunk_overlap=200)
+
+    raw_chunks = splitter.add_overlap(splitter.split_text(doc["text"]))
+
+    chunks = []
+    cursor = 0
+    for i, chunk_text in enumerate(raw_chunks):
+        start, end = cursor, cursor + len(chunk_text)
+        cursor = end
+        block = _dominant_block(doc["blocks"], start, end)
+        chunks.append({
+            "chunk_id": f"{doc['doc_id']}::chunk_{i}",
+            "text": chunk_text,
+            "start": start,
+            "end": end,
+            "page": block["page"] if block else None
+        })
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Legacy vs offset-based chunking")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4])
+    parser.add_argument("--unbroken-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    print("\n===== CHUNKING BENCHMARK =====\n")
+    print(
+        f"{'doc MB':>7} {'impl':<8} {'seconds':>8} {'MB/s':>7} {'chunks':>7} "
+        f"{'avg chars':>10} {'offsets ok':>11}"
+    )
+
+    for size_mb in args.sizes_mb:
+        doc = synthetic_document(size_mb, args.unbroken_kb)
+        text = doc["text"]
+        mb = len(text) / (1024 * 1024)
+
+        t0 = time.perf_counter()
+        legacy = legacy_chunk_document(doc)
+        legacy_s = time.perf_counter() - t0
+        # Cursor offsets drift once overlap is prepended
+        legacy_ok = sum(text[c["start"]:c["end"]] == c["text"] for c in legacy) / max(len(legacy), 1)
+
+        t0 = time.perf_counter()
+        chunks = chunk_document(doc)
+        new_s = time.perf_counter() - t0
+
+        for name, seconds, out, ok in (
+            ("legacy", legacy_s, legacy, legacy_ok),
+            ("spans", new_s, chunks, 1.0)
+        ):
+            avg = sum(len(c["text"]) for c in out) / max(len(out), 1)
+            print(
+                f"{mb:>7.1f} {name:<8} {seconds:>8.2f} {mb / seconds:>7.1f} "
+                f"{len(out):>7} {avg:>10.0f} {ok:>11.0%}"
+            )
+
+        print(f"{'':>7} speedup  {legacy_s / new_s:>8.1f}x\n")
+
+    print("===== END BENCHMARK =====\n")
+
+
+if __name__ == "__main__":
+    main()
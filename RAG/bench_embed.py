@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+from RAG import models
+from RAG.chunk_store import ChunkStore, is_chunk_store
+from RAG.embeddings_free import embed_texts, shutdown_pool
+
+
+ARTIFACTS_DIR = Path(__file__).resolve().parent.parent / "artifacts"
+
+WORDS = (
+    "policy employee manager approval leave request security incident report "
+    "compliance review procedure form section department training access data"
+).split()
+
+
+def synthetic_chunks(n: int, seed: int = 0) -> list[str]:
+    """
+    Mixed-length texts: mostly short/medium chunks plus a long tail, as
+    produced by the chunker on headings, tables and body text.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        words = int(min(rng.lognormvariate(4.0, 0.9), 400)) + 3
+        texts.append(" ".join(rng.choice(WORDS) for _ in range(words)))
+    return texts
+
+
+def load_chunks(limit: int) -> list[str]:
+    store_dir = ARTIFACTS_DIR / "chunks.store"
+    if not is_chunk_store(store_dir):
+        return []
+    store = ChunkStore(store_dir)
+    return [store.text(i) for i in range(min(limit, len(store)))]
+
+
+def _baseline(texts: list[str]) -> np.ndarray:
+    """
+    The previous embed_texts call: one encode(), fixed batch_size=32.
+    """
+    return np.asarray(
+        models.get("embed").encode(
+            texts,
+            batch_size=32,
+            show_progress_bar=False,
+            normalize_embeddings=True
+        ),
+        dtype="float32"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed-size vs token-budget embedding batches")
+    parser.add_argument("--n", type=int, default=2000, help="chunks to embed")
+    parser.add_argument("--synthetic", action="store_true", help="ignore artifacts/chunks.store")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        nargs="+",
+        default=[2, os.cpu_count() or 2]
+    )
+    args = parser.parse_args()
+
+    print("\n===== EMBEDDING THROUGHPUT BENCHMARK =====\n")
+
+    texts = [] if args.synthetic else load_chunks(args.n)
+    source = "chunk store"
+    if not texts:
+        texts, source = synthetic_chunks(args.n), "synthetic"
+
+    print(f"{len(texts)} chunks ({source})\n")
+
+    models.warm_up(["embed"])
+    embed_texts(texts[:64], processes=0)
+
+    t0 = time.perf_counter()
+    reference = _baseline(texts)
+    base_s = time.perf_counter() - t0
+
+    configs = [("bucketed", 0)] + [(f"bucketed x{p} procs", p) for p in args.processes if p > 1]
+
+    print(f"{'mode':<22} {'seconds':>9} {'chunks/s':>10} {'speedup':>8} {'max |diff|':>11}")
+    print(f"{'fixed batch=32':<22} {base_s:>9.2f} {len(texts) / base_s:>10.1f} {1.0:>8.2f} {'-':>11}")
+
+    for name, processes in configs:
+        if processes > 1:
+            # Pool start-up (model load per worker) is paid once per process
+            embed_texts(texts[:processes * 64], processes=processes)
+
+        t0 = time.perf_counter()
+        vecs = embed_texts(texts, processes=processes)
+        seconds = time.perf_counter() - t0
+
+        print(
+            f"{name:<22} {seconds:>9.2f} {len(texts) / seconds:>10.1f} "
+            f"{base_s / seconds:>8.2f} {np.abs(vecs - reference).max():>11.2e}"
+        )
+
+    shutdown_pool()
+    print("\n===== END BENCHMARK =====\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from RAG.batch_answer import load_search_index
+from RAG.bm25 import BM25Index
+from RAG.chunk_store import ChunkStore
+from RAG.embeddings_free import embed_texts
+from RAG.retriever import dense_search, lexical_search, reciprocal_rank_fusion
+
+
+ARTIFACTS_DIR = Path(__file__).resolve().parent.parent / "artifacts"
+
+
+def load_labeled_queries(path: Path) -> list[dict]:
+    """
+    JSONL with one {"query": ..., "relevant_chunk_ids": [...]} per line.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs hybrid (BM25 + dense) retrieval")
+    parser.add_argument("queries", type=Path, help="labeled queries JSONL")
+    parser.add_argument("--artifacts", type=Path, default=ARTIFACTS_DIR)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--retrieve-k", type=int, default=20)
+    args = parser.parse_args()
+
+    print("\n===== HYBRID RETRIEVAL BENCHMARK =====\n")
+
+    index = load_search_index(args.artifacts)
+    chunks = ChunkStore(args.artifacts / "chunks.store")
+    bm25 = BM25Index.load(args.artifacts / "bm25.npz")
+
+    row_of = {chunks.chunk_id(i): i for i in range(len(chunks))}
+    labeled = load_labeled_queries(args.queries)
+    relevant = [
+        {row_of[c] for c in q["relevant_chunk_ids"] if c in row_of}
+        for q in labeled
+    ]
+
+    q_vecs = embed_texts([q["query"] for q in labeled])
+
+    rankings = {"dense": [], "bm25": [], "hybrid": []}
+    latency = {"dense": [], "bm25": [], "hybrid": []}
+
+    for q, q_vec in zip(labeled, q_vecs):
+        q_vec = q_vec.reshape(1, -1)
+
+        dense, dense_ms = _timed(lambda: dense_search(index, q_vec, args.retrieve_k))
+        lexical, lexical_ms = _timed(lambda: lexical_search(bm25, q["query"], args.retrieve_k))
+        fused, fuse_ms = _timed(lambda: reciprocal_rank_fusion([dense, lexical]))
+
+        rankings["dense"].append(dense)
+        rankings["bm25"].append(lexical)
+        rankings["hybrid"].append([idx for idx, _ in fused])
+
+        latency["dense"].append(dense_ms)
+        latency["bm25"].append(lexical_ms)
+        # Served concurrently: the slower retriever plus fusion
+        latency["hybrid"].append(max(dense_ms, lexical_ms) + fuse_ms)
+
+    print(f"{len(labeled)} labeled queries, {len(chunks)} chunks\n")
+
+    header = f"{'retriever':<10} {'p50 ms':>8} {'p95 ms':>8}"
+    header += "".join(f" {'R@' + str(b):>7}" for b in args.budgets)
+    print(header)
+
+    for name in ("dense", "bm25", "hybrid"):
+        lat = np.array(latency[name])
+        row = f"{name:<10} {np.percentile(lat, 50):>8.3f} {np.percentile(lat, 95):>8.3f}"
+        for budget in args.budgets:
+            hits = [
+                bool(set(ranking[:budget]) & rel)
+                for ranking, rel in zip(rankings[name], relevant)
+            ]
+            row += f" {np.mean(hits):>7.3f}"
+        print(row)
+
+    print("\nR@b = share of queries with a relevant chunk among the b candidates")
+    print("sent to the cross-encoder (equal rerank budget across retrievers).")
+    print("\n===== END BENCHMARK =====\n")
+
+
+if __name__ == "__main__":
+    main()
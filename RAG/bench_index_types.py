@@ -0,0 +1,108 @@
+import argparse
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from RAG.faiss_hnsw import (
+    build_and_save_hnsw_index,
+    build_index,
+    choose_index_kind,
+    set_search_params
+)
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    """
+    Clustered unit vectors; closer to sentence embeddings than uniform noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    assign = rng.integers(0, clusters, size=n)
+    x = centers[assign] + 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+def make_queries(xb: np.ndarray, nq: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(xb.shape[0], size=nq, replace=False)
+    xq = xb[picks] + 0.3 * rng.standard_normal((nq, xb.shape[1])).astype("float32")
+    faiss.normalize_L2(xq)
+    return xq
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray, k: int) -> float:
+    hits = [len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth)]
+    return float(np.mean(hits)) / k
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS index type comparison")
+    parser.add_argument("--embeddings", type=Path, help=".npy matrix; synthetic if omitted")
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=50)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--pca-dim", type=int, default=128)
+    parser.add_argument("--rescore-k-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    print("\n===== FAISS INDEX TYPE BENCHMARK =====\n")
+
+    if args.embeddings:
+        xb = np.load(args.embeddings).astype("float32")
+    else:
+        xb = synthetic_embeddings(args.n, args.dim)
+    xq = make_queries(xb, args.queries)
+    n, dim = xb.shape
+
+    exact = faiss.IndexFlatIP(dim)
+    exact.add(xb)
+    _, truth = exact.search(xq, args.k)
+
+    print(f"n={n} dim={dim} queries={len(xq)} k={args.k}")
+    print(f"auto choice at 1 GiB budget: {choose_index_kind(n, dim)}\n")
+
+    configs = [
+        ("HNSWFlat (baseline)", lambda: build_and_save_hnsw_index(xb)),
+        ("flat", lambda: build_index(xb, kind="flat")),
+        ("hnsw_sq8", lambda: build_index(xb, kind="hnsw_sq8")),
+        ("ivfpq", lambda: build_index(xb, kind="ivfpq")),
+        ("ivfpq+rescore", lambda: build_index(
+            xb, kind="ivfpq", rescore_k_factor=args.rescore_k_factor)),
+        (f"pca{args.pca_dim}+hnsw_sq8", lambda: build_index(
+            xb, kind="hnsw_sq8", pca_dim=args.pca_dim)),
+        (f"pca{args.pca_dim}+hnsw_sq8+rescore", lambda: build_index(
+            xb, kind="hnsw_sq8", pca_dim=args.pca_dim,
+            rescore_k_factor=args.rescore_k_factor)),
+    ]
+
+    print(f"{'index':<30} {'build s':>8} {'recall@k':>9} {'ms/query':>9} {'bytes/vec':>10}")
+
+    for name, build in configs:
+        t0 = time.perf_counter()
+        index = build()
+        build_s = time.perf_counter() - t0
+
+        set_search_params(index, ef_search=args.ef_search, nprobe=args.nprobe)
+
+        t0 = time.perf_counter()
+        _, found = index.search(xq, args.k)
+        ms_per_query = (time.perf_counter() - t0) / len(xq) * 1000
+
+        bytes_per_vec = faiss.serialize_index(index).nbytes / n
+
+        print(
+            f"{name:<30} {build_s:>8.2f} {recall_at_k(found, truth, args.k):>9.3f} "
+            f"{ms_per_query:>9.3f} {bytes_per_vec:>10.1f}"
+        )
+
+    print("\n===== END BENCHMARK =====\n")
+
+
+if __name__ == "__main__":
+    main()
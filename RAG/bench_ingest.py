@@ -0,0 +1,57 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+from RAG.ingest import extract_pdfs, PAGES_PER_TASK
+
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data_pdfs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs parallel PDF extraction")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[2, os.cpu_count() or 2]
+    )
+    parser.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK)
+    args = parser.parse_args()
+
+    print("\n===== PDF EXTRACTION BENCHMARK =====\n")
+
+    pdf_files = sorted(args.data_dir.glob("*.pdf"))
+    if not pdf_files:
+        print(f"❌ No PDF files found in {args.data_dir}")
+        return
+
+    t0 = time.perf_counter()
+    baseline = extract_pdfs(pdf_files, workers=1)
+    serial_s = time.perf_counter() - t0
+
+    chars = sum(len(d["text"]) for d in baseline)
+    print(f"{len(pdf_files)} PDFs, {chars} chars extracted\n")
+
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>9} {'identical':>10}")
+    print(f"{1:>8} {serial_s:>9.2f} {1.0:>9.2f} {'-':>10}")
+
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        result = extract_pdfs(
+            pdf_files,
+            workers=workers,
+            pages_per_task=args.pages_per_task
+        )
+        elapsed = time.perf_counter() - t0
+
+        identical = result == baseline
+        print(f"{workers:>8} {elapsed:>9.2f} {serial_s / elapsed:>9.2f} {str(identical):>10}")
+
+    print("\n===== END BENCHMARK =====\n")
+
+
+if __name__ == "__main__":
+    main()
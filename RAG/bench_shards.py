@@ -0,0 +1,153 @@
+import argparse
+import json
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from RAG.eval_retrieval import hit_matrix, recall_at_k
+from RAG.sharded_index import SHARD_MAP_NAME, ShardedIndex, build_shards
+from RAG.synthetic_corpus import iter_synthetic_vectors, synthetic_vectors
+
+
+def measure_qps(index: ShardedIndex, xq: np.ndarray, k: int, clients: int) -> dict:
+    """
+    `clients` threads issue single-query searches (like concurrent /ask
+    requests) until every query has been searched once.
+    """
+    latencies = []
+    lock = threading.Lock()
+    cursor = iter(range(len(xq)))
+
+    def client():
+        while True:
+            with lock:
+                i = next(cursor, None)
+            if i is None:
+                return
+            t0 = time.perf_counter()
+            index.search(xq[i:i + 1], k)
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    ms = np.array(latencies) * 1000
+    return {
+        "qps": len(xq) / wall,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded index: build time and QPS from 1 to N shards")
+    parser.add_argument("--n", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--mode", choices=("process", "thread"), default="process")
+    parser.add_argument("--build-processes", type=int, default=None,
+                        help="parallel shard builds (default: one per core, at most one per shard)")
+    parser.add_argument("--kind", default="hnsw", choices=("flat", "hnsw", "hnsw_sq8"))
+    parser.add_argument("--m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, default=None)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent searching threads")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--workdir", type=Path, help="keep shards here (default: temporary)")
+    parser.add_argument("--out", type=Path, help="write rows as JSON")
+    args = parser.parse_args()
+
+    print("\n===== SHARDED INDEX BENCHMARK =====\n")
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="rag_shards_"))
+    xq = next(iter_synthetic_vectors(args.queries, args.dim, seed=1000))
+
+    # Exact ground truth over all shards' vectors
+    exact = faiss.IndexFlatIP(args.dim)
+    exact.add(synthetic_vectors(args.n, args.dim))
+    _, truth = exact.search(xq, args.k)
+    del exact
+
+    print(f"n={args.n} dim={args.dim} kind={args.kind} mode={args.mode} "
+          f"queries={args.queries} clients={args.clients} k={args.k}\n")
+
+    rows = []
+    base_build = base_qps = None
+    try:
+        for n_shards in args.shards:
+            out_dir = workdir / f"{n_shards}_shards"
+            shard_map = build_shards(
+                iter_synthetic_vectors(args.n, args.dim),
+                args.n,
+                out_dir,
+                n_shards,
+                kind=args.kind,
+                m=args.m,
+                ef_construction=args.ef_construction,
+                processes=args.build_processes
+            )
+            build_s = shard_map["build_s"]
+            base_build = base_build or build_s
+            print(f"🏗️  {n_shards} shard(s) built in {build_s:.1f}s "
+                  f"({shard_map['build_processes']} processes)")
+
+            for replicas in args.replicas:
+                index = ShardedIndex(
+                    out_dir / SHARD_MAP_NAME, mode=args.mode, replicas=replicas, ef_search=args.ef_search
+                )
+                try:
+                    _, found = index.search(xq, args.k)
+                    recall = float(recall_at_k(hit_matrix(found, truth), truth).mean())
+                    load = measure_qps(index, xq, args.k, args.clients)
+                finally:
+                    index.close()
+
+                base_qps = base_qps or load["qps"]
+                rows.append({
+                    "shards": n_shards,
+                    "replicas": replicas,
+                    "build_s": build_s,
+                    "build_speedup": base_build / build_s,
+                    "recall": recall,
+                    **load,
+                    "qps_speedup": load["qps"] / base_qps
+                })
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'shards':>6} {'replicas':>8} {'build s':>8} {'build ×':>8} {'recall@k':>9} "
+          f"{'QPS':>8} {'QPS ×':>6} {'p50 ms':>7} {'p95 ms':>7}")
+    for r in rows:
+        print(
+            f"{r['shards']:>6} {r['replicas']:>8} {r['build_s']:>8.1f} {r['build_speedup']:>8.2f} "
+            f"{r['recall']:>9.3f} {r['qps']:>8.0f} {r['qps_speedup']:>6.2f} "
+            f"{r['p50_ms']:>7.2f} {r['p95_ms']:>7.2f}"
+        )
+    print("\n× = relative to the first row. Speedups need free cores: shards and "
+          "replicas beyond the core count only add scatter-gather overhead.")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n💾 Rows written to {args.out}")
+
+    print("\n===== END BENCHMARK =====\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+
+ARTIFACTS_DIR = Path(__file__).resolve().parent.parent / "artifacts"
+
+STAGES = ("extract", "chunk", "embed", "build", "search", "rerank", "generate")
+
+# Parameters that change what is measured; baselines must match on these
+SCALE_PARAMS = (
+    "n_chunks", "dim", "queries", "embed_chunks", "pdf_docs", "pdf_pages",
+    "chunk_docs", "doc_kb", "index_kind", "m", "ef_construction", "ef_search",
+    "k", "rerank_candidates", "gen_queries", "max_new_tokens", "real_models"
+)
+
+# metric → True if higher is better
+COMPARED_METRICS = {
+    "throughput": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False
+}
+
+
+class SkipStage(Exception):
+    pass
+
+
+def _rss_mb(field: str = "VmRSS") -> float:
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _result(items: int, seconds: float, latencies_ms: list, unit: str, **extra) -> dict:
+    lat = np.asarray(latencies_ms, dtype="float64")
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if lat.size else (0.0, 0.0, 0.0)
+    return {
+        "items": items,
+        "unit": unit,
+        "seconds": seconds,
+        "throughput": items / seconds if seconds > 0 else 0.0,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "samples": int(lat.size),
+        **extra
+    }
+
+
+def _timed_calls(fn, calls) -> tuple:
+    """
+    Run fn(x) for every x; return (results, total seconds, per-call ms).
+    """
+    results, latencies = [], []
+    t0 = time.perf_counter()
+    for x in calls:
+        t = time.perf_counter()
+        results.append(fn(x))
+        latencies.append((time.perf_counter() - t) * 1000)
+    return results, time.perf_counter() - t0, latencies
+
+
+def _load_model(name: str) -> float:
+    from RAG import models
+
+    t0 = time.perf_counter()
+    models.warm_up([name])
+    return time.perf_counter() - t0
+
+
+# ===== STAGES =====
+# Each runs in its own process and returns a _result() dict. Inputs are
+# generated outside the timed region.
+
+def stage_extract(args, workdir: Path) -> dict:
+    from RAG.ingest import extract_text_from_pdf
+    from RAG.synthetic_corpus import write_synthetic_pdfs
+
+    paths = write_synthetic_pdfs(workdir / "pdfs", args.pdf_docs, args.pdf_pages, args.seed)
+
+    extracted, seconds, latencies = _timed_calls(extract_text_from_pdf, paths)
+
+    return _result(
+        len(paths) * args.pdf_pages, seconds, latencies, "pages/s",
+        latency_of="document",
+        chars=sum(len(d["text"]) for d in extracted)
+    )
+
+
+def stage_chunk(args, workdir: Path) -> dict:
+    from RAG.Chunking import chunk_document
+    from RAG.synthetic_corpus import synthetic_documents
+
+    docs = synthetic_documents(args.chunk_docs, args.doc_kb * 1024, args.seed)
+    chunk_document(docs[0])  # warm-up
+
+    chunks, seconds, latencies = _timed_calls(chunk_document, docs)
+    mb = sum(len(d["text"]) for d in docs) / (1024 * 1024)
+
+    return _result(
+        sum(len(c) for c in chunks), seconds, latencies, "chunks/s",
+        latency_of="document",
+        mb_per_s=mb / seconds
+    )
+
+
+def stage_embed(args, workdir: Path) -> dict:
+    from RAG.embeddings_free import embed_texts
+    from RAG.synthetic_corpus import synthetic_queries, synthetic_texts
+
+    texts = synthetic_texts(args.embed_chunks, args.seed)
+    queries = synthetic_queries(args.queries, args.seed + 1)
+
+    load_s = _load_model("embed")
+    embed_texts(texts[:64])  # warm-up
+
+    batches = [texts[i:i + args.embed_call_size] for i in range(0, len(texts), args.embed_call_size)]
+    _, seconds, latencies = _timed_calls(embed_texts, batches)
+
+    _, _, query_latencies = _timed_calls(lambda q: embed_texts([q]), queries)
+
+    return _result(
+        len(texts), seconds, latencies, "chunks/s",
+        latency_of=f"embed_texts call of {args.embed_call_size} chunks",
+        load_s=load_s,
+        query=_result(len(queries), sum(query_latencies) / 1000, query_latencies, "queries/s")
+    )
+
+
+def stage_build(args, workdir: Path) -> dict:
+    import faiss
+    from RAG.faiss_hnsw import TRAIN_SAMPLE_ROWS, create_index, save_index_meta
+    from RAG.synthetic_corpus import iter_synthetic_vectors
+
+    index, meta = create_index(
+        args.n_chunks, args.dim, args.index_kind, args.m, args.ef_construction
+    )
+
+    train_s = 0.0
+    if not index.is_trained:
+        sample = next(iter_synthetic_vectors(
+            min(args.n_chunks, TRAIN_SAMPLE_ROWS), args.dim, args.seed,
+            batch_rows=TRAIN_SAMPLE_ROWS
+        ))
+        t0 = time.perf_counter()
+        index.train(sample)
+        train_s = time.perf_counter() - t0
+        del sample
+
+    latencies = []
+    add_s = 0.0
+    for batch in iter_synthetic_vectors(args.n_chunks, args.dim, args.seed, batch_rows=args.build_batch):
+        t0 = time.perf_counter()
+        index.add(batch)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        add_s += latencies[-1] / 1000
+
+    index_path = str(workdir / "index.faiss")
+    faiss.write_index(index, index_path)
+    save_index_meta(index_path, meta)
+
+    return _result(
+        args.n_chunks, train_s + add_s, latencies, "vectors/s",
+        latency_of=f"add() of {args.build_batch} vectors",
+        kind=meta["kind"],
+        train_s=train_s,
+        index_mb=os.path.getsize(index_path) / (1024 * 1024)
+    )
+
+
+def _exact_top_k(args, queries: np.ndarray) -> np.ndarray:
+    """
+    Brute-force top-k ids over the regenerated corpus, batch by batch.
+    """
+    from RAG.synthetic_corpus import iter_synthetic_vectors
+
+    best_scores = np.full((len(queries), 0), -np.inf, dtype="float32")
+    best_ids = np.zeros((len(queries), 0), dtype="int64")
+    offset = 0
+
+    for batch in iter_synthetic_vectors(args.n_chunks, args.dim, args.seed):
+        scores = queries @ batch.T
+        ids = np.broadcast_to(np.arange(offset, offset + len(batch)), scores.shape)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        best_ids = np.concatenate([best_ids, ids], axis=1)
+
+        keep = np.argsort(-best_scores, axis=1, kind="stable")[:, :args.k]
+        best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        best_ids = np.take_along_axis(best_ids, keep, axis=1)
+        offset += len(batch)
+
+    return best_ids
+
+
+def stage_search(args, workdir: Path) -> dict:
+    from RAG.faiss_hnsw import load_index
+    from RAG.synthetic_corpus import iter_synthetic_vectors
+
+    index_path = workdir / "index.faiss"
+    if not index_path.exists():
+        stage_build(args, workdir)
+
+    index = load_index(str(index_path), ef_search=args.ef_search)
+
+    # Same cluster centres as the corpus, different rows
+    queries = next(iter_synthetic_vectors(args.queries, args.dim, args.seed + 1000))
+
+    for q in queries[:10]:  # warm-up
+        index.search(q[None, :], args.k)
+
+    results, seconds, latencies = _timed_calls(
+        lambda q: index.search(q[None, :], args.k)[1][0], queries
+    )
+
+    exact = _exact_top_k(args, queries)
+    recall = np.mean([
+        len(set(found.tolist()) & set(truth.tolist())) / args.k
+        for found, truth in zip(results, exact)
+    ])
+
+    return _result(
+        len(queries), seconds, latencies, "queries/s",
+        latency_of="single-query search",
+        recall_at_k=float(recall),
+        ntotal=int(index.ntotal)
+    )
+
+
+def stage_rerank(args, workdir: Path) -> dict:
+    from RAG.reranker_cross_encoder import rerank
+    from RAG.synthetic_corpus import synthetic_queries, synthetic_texts
+
+    queries = synthetic_queries(args.queries, args.seed + 1)
+    pool = synthetic_texts(args.rerank_candidates * 8, args.seed + 2)
+
+    load_s = _load_model("rerank")
+
+    def candidates(i):
+        start = (i * args.rerank_candidates) % (len(pool) - args.rerank_candidates + 1)
+        return pool[start:start + args.rerank_candidates]
+
+    rerank(queries[0], candidates(0))  # warm-up
+
+    # No chunk_ids → the score cache is bypassed and every pair is scored
+    _, seconds, latencies = _timed_calls(
+        lambda i: rerank(queries[i], candidates(i)), range(len(queries))
+    )
+
+    return _result(
+        len(queries) * args.rerank_candidates, seconds, latencies, "pairs/s",
+        latency_of=f"rerank of {args.rerank_candidates} candidates",
+        load_s=load_s
+    )
+
+
+def stage_generate(args, workdir: Path) -> dict:
+    missing = [m for m in ("torch", "transformers") if importlib.util.find_spec(m) is None]
+    if missing:
+        raise SkipStage(f"{', '.join(missing)} not installed")
+
+    from RAG.llm_flan_t5 import generate_answer
+    from RAG.synthetic_corpus import synthetic_queries, synthetic_texts
+
+    queries = synthetic_queries(args.gen_queries, args.seed + 1)
+    contexts = synthetic_texts(args.gen_queries * 3, args.seed + 3)
+
+    load_s = _load_model("llm")
+    generate_answer(queries[0], contexts[:3], max_new_tokens=args.max_new_tokens)  # warm-up
+
+    _, seconds, latencies = _timed_calls(
+        lambda i: generate_answer(
+            queries[i], contexts[3 * i:3 * i + 3], max_new_tokens=args.max_new_tokens
+        ),
+        range(len(queries))
+    )
+
+    return _result(
+        len(queries), seconds, latencies, "requests/s",
+        latency_of=f"generate_answer, max_new_tokens={args.max_new_tokens}",
+        load_s=load_s
+    )
+
+
+STAGE_FUNCS = {
+    "extract": stage_extract,
+    "chunk": stage_chunk,
+    "embed": stage_embed,
+    "build": stage_build,
+    "search": stage_search,
+    "rerank": stage_rerank,
+    "generate": stage_generate
+}
+
+
+# ===== RUNNER =====
+
+def _child(stage: str, workdir: Path, args):
+    """
+    Runs in a fresh process so each stage's peak RSS is its own.
+    """
+    if not args.real_models:
+        from RAG.stand_in_models import use_stand_ins
+        use_stand_ins()
+
+    try:
+        result = STAGE_FUNCS[stage](args, workdir)
+    except SkipStage as e:
+        result = {"skipped": str(e)}
+
+    result["peak_rss_mb"] = _rss_mb("VmHWM")
+    print(json.dumps(result))
+
+
+def _run_stage(stage: str, workdir: Path) -> dict:
+    env = dict(os.environ, RAG_EMBED_PROCESSES="0")
+    try:
+        out = subprocess.run(
+            [sys.executable, "-m", "RAG.bench_suite", *sys.argv[1:], "--child", stage, str(workdir)],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=env
+        )
+    except subprocess.CalledProcessError as e:
+        last = (e.stderr or "").strip().splitlines()[-1:] or ["?"]
+        return {"failed": last[0]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _meta(args) -> dict:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {p: getattr(args, p) for p in SCALE_PARAMS}
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    One row per (stage, metric) present in both runs. A row regresses
+    when it is worse than the baseline by more than `tolerance`
+    (fraction, e.g. 0.10 = 10%).
+    """
+    rows = []
+    for stage, cur in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or "throughput" not in base or "throughput" not in cur:
+            continue
+
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in base or metric not in cur:
+                continue
+            b, c = base[metric], cur[metric]
+            change = (c - b) / b if b else 0.0
+            rows.append({
+                "stage": stage,
+                "metric": metric,
+                "baseline": b,
+                "current": c,
+                "change": change,
+                "regressed": change < -tolerance if higher_is_better else change > tolerance
+            })
+    return rows
+
+
+def _print_results(stages: dict):
+    print(
+        f"{'stage':<9} {'throughput':>12} {'unit':<11} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'peak MB':>8}"
+    )
+    for stage, r in stages.items():
+        if "throughput" not in r:
+            reason = r.get("skipped") or f"failed: {r.get('failed')}"
+            print(f"{stage:<9} {'-':>12} {reason}")
+            continue
+        print(
+            f"{stage:<9} {r['throughput']:>12.1f} {r['unit']:<11} {r['p50_ms']:>9.2f} "
+            f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['peak_rss_mb']:>8.0f}"
+        )
+
+
+def _print_comparison(rows: list, tolerance: float):
+    print(f"\nvs baseline (tolerance {tolerance:.0%})\n")
+    print(f"{'stage':<9} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}")
+    for r in rows:
+        flag = "  ❌" if r["regressed"] else ""
+        print(
+            f"{r['stage']:<9} {r['metric']:<12} {r['baseline']:>10.2f} "
+            f"{r['current']:>10.2f} {r['change']:>+8.1%}{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark suite")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--real-models", action="store_true",
+                        help="use the real (downloaded) models instead of offline stand-ins")
+    parser.add_argument("--seed", type=int, default=0)
+
+    parser.add_argument("--n-chunks", type=int, default=10_000, help="index size for build/search")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--embed-chunks", type=int, default=5000)
+    parser.add_argument("--embed-call-size", type=int, default=256)
+    parser.add_argument("--pdf-docs", type=int, default=8)
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--chunk-docs", type=int, default=20)
+    parser.add_argument("--doc-kb", type=int, default=256)
+    parser.add_argument("--index-kind", default="hnsw",
+                        choices=("auto", "flat", "hnsw", "hnsw_sq8", "ivfpq"))
+    parser.add_argument("--m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, default=50)
+    parser.add_argument("--build-batch", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-candidates", type=int, default=20)
+    parser.add_argument("--gen-queries", type=int, default=10)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+
+    parser.add_argument("--out", type=Path, default=ARTIFACTS_DIR / "bench" / "suite.json")
+    parser.add_argument("--baseline", type=Path, help="earlier --out file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--child", nargs=2, metavar=("STAGE", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child[0], Path(args.child[1]), args)
+        return
+
+    print("\n===== BENCHMARK SUITE =====\n")
+    print(
+        f"{'real' if args.real_models else 'stand-in'} models, "
+        f"{args.n_chunks} indexed chunks, {args.queries} queries\n"
+    )
+
+    stages = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # build runs before search in STAGES, so search reuses its index
+        for stage in (s for s in STAGES if s in args.stages):
+            print(f"⏱️  {stage} ...")
+            stages[stage] = _run_stage(stage, Path(tmp))
+
+    report = {"meta": _meta(args), "stages": stages}
+
+    print()
+    _print_results(stages)
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {args.out}")
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        differs = [
+            p for p in SCALE_PARAMS
+            if baseline.get("meta", {}).get("params", {}).get(p) != report["meta"]["params"][p]
+        ]
+        if differs:
+            print(f"\n⚠️  Baseline was run with different parameters: {', '.join(differs)}")
+
+        rows = compare(report, baseline, args.tolerance)
+        _print_comparison(rows, args.tolerance)
+        regressed = any(r["regressed"] for r in rows)
+
+    print("\n===== END BENCHMARK =====\n")
+
+    if regressed:
+        print("❌ Regression against baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# Keeps section numbers, form ids and hyphenated acronyms together
+# ("4.2.1", "hr-101", "i-9") and also indexes their parts.
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+_PART_RE = re.compile(r"[.\-/]")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have if in into is it its of on
+or such that the their then there these they this to was were will with
+what which who whom how when where why do does did can could should would
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if tok in STOPWORDS:
+            continue
+        tokens.append(tok)
+        parts = _PART_RE.split(tok)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p and p not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Compact BM25 inverted index over chunk texts, row-aligned with the
+    FAISS index (doc id == FAISS id).
+
+    Postings are stored CSR-style: for term t, doc ids and precomputed
+    BM25 term weights live in [term_offsets[t], term_offsets[t + 1]).
+    Scoring a query is then a handful of vectorized scatter-adds.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        term_offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        idf: np.ndarray,
+        n_docs: int
+    ):
+        self.vocab = vocab
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.idf = idf
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, texts: List[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        postings: List[Dict[int, int]] = []
+        doc_len = np.zeros(len(texts), dtype="float32")
+
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[doc_id] = len(tokens)
+            for tok in tokens:
+                term = vocab.setdefault(tok, len(vocab))
+                if term == len(postings):
+                    postings.append({})
+                tf = postings[term]
+                tf[doc_id] = tf.get(doc_id, 0) + 1
+
+        n_docs = len(texts)
+        avgdl = float(doc_len.mean()) if n_docs else 0.0
+
+        df = np.array([len(p) for p in postings], dtype="float32")
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype("float32")
+
+        term_offsets = np.zeros(len(postings) + 1, dtype="int64")
+        term_offsets[1:] = np.cumsum(df.astype("int64"))
+
+        doc_ids = np.zeros(int(term_offsets[-1]), dtype="int32")
+        weights = np.zeros(int(term_offsets[-1]), dtype="float32")
+
+        for term, tf_map in enumerate(postings):
+            lo = term_offsets[term]
+            ids = np.fromiter(tf_map.keys(), dtype="int32", count=len(tf_map))
+            tf = np.fromiter(tf_map.values(), dtype="float32", count=len(tf_map))
+            norm = k1 * (1.0 - b + b * doc_len[ids] / max(avgdl, 1e-9))
+            doc_ids[lo : lo + len(ids)] = ids
+            weights[lo : lo + len(ids)] = tf * (k1 + 1.0) / (tf + norm)
+
+        return cls(vocab, term_offsets, doc_ids, weights, idf, n_docs)
+
+    def search(self, query: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (scores, doc ids) for a query, best first. Fewer than k
+        results are returned when fewer documents match.
+        """
+        return self.search_batch([query], k)[0]
+
+    def search_batch(self, queries: List[str], k: int = 10) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        search() for many queries. One scratch score array serves the
+        whole batch and only the matched docs are read back and reset,
+        so a query costs O(its postings) instead of O(n_docs).
+        """
+        scores = np.zeros(self.n_docs, dtype="float32")
+        empty = (np.zeros(0, dtype="float32"), np.zeros(0, dtype="int64"))
+        results = []
+
+        for query in queries:
+            terms = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+            if not terms:
+                results.append(empty)
+                continue
+
+            postings = []
+            for term in terms:
+                lo, hi = self.term_offsets[term], self.term_offsets[term + 1]
+                # doc ids are unique within one posting list
+                scores[self.doc_ids[lo:hi]] += self.idf[term] * self.weights[lo:hi]
+                postings.append(self.doc_ids[lo:hi])
+
+            matched = np.unique(np.concatenate(postings))
+            found = scores[matched]
+            scores[matched] = 0.0
+
+            if len(matched) > k > 0:
+                # Everything tied with the k-th score stays a candidate
+                kth = np.partition(found, len(found) - k)[len(found) - k]
+                keep = found >= kth
+                matched, found = matched[keep], found[keep]
+            # Ties go to the lower doc id
+            order = np.lexsort((matched, -found))[:k]
+            results.append((found[order], matched[order].astype("int64")))
+
+        return results
+
+    def save(self, path: Path):
+        terms = [None] * len(self.vocab)
+        for term, i in self.vocab.items():
+            terms[i] = term
+
+        np.savez(
+            path,
+            vocab=np.frombuffer("\n".join(terms).encode("utf-8"), dtype="uint8"),
+            term_offsets=self.term_offsets,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            idf=self.idf,
+            n_docs=np.array([self.n_docs], dtype="int64")
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        with np.load(path) as data:
+            raw = data["vocab"].tobytes().decode("utf-8")
+            terms = raw.split("\n") if raw else []
+            return cls(
+                vocab={term: i for i, term in enumerate(terms)},
+                term_offsets=data["term_offsets"],
+                doc_ids=data["doc_ids"],
+                weights=data["weights"],
+                idf=data["idf"],
+                n_docs=int(data["n_docs"][0])
+            )
@@ -1,10 +1,27 @@
 from pathlib import Path
+from collections import Counter
+import argparse
 import json
+import time
 
-from RAG.ingest import extract_text_from_pdf
+import numpy as np
+
+from RAG.ingest import extract_pdfs, format_ocr_stats, PAGES_PER_TASK, OCR_WORKERS
 from RAG.Chunking import chunk_document
-from RAG.embeddings_free import embed_texts
-from RAG.faiss_hnsw import build_and_save_hnsw_index
+from RAG.bm25 import BM25Index
+from RAG.chunk_store import ChunkStore, write_chunk_store, is_chunk_store
+from RAG.embeddings_free import embed_texts, MODEL_ID
+from RAG.embedding_cache import EmbeddingCache, file_sha256
+from RAG.sharded_index import SHARD_MAP_NAME, build_shards
+from RAG.faiss_hnsw import (
+    build_index_streaming,
+    append_to_index,
+    load_index_meta,
+    tune_and_record,
+    tuning_queries,
+    INDEX_KINDS,
+    INDEX_MEMORY_BUDGET_BYTES
+)
 
 
 # Paths
@@ -12,55 +29,484 @@ DATA_DIR = Path(__file__).resolve().parent.parent / "data_pdfs"
 ARTIFACTS_DIR = Path(__file__).resolve().parent.parent / "artifacts"
 
 INDEX_PATH = ARTIFACTS_DIR / "policy_hnsw.index"
-CHUNKS_PATH = ARTIFACTS_DIR / "chunks.json"
+CHUNKS_PATH = ARTIFACTS_DIR / "chunks.json"  # legacy format, read-only
+CHUNK_STORE_DIR = ARTIFACTS_DIR / "chunks.store"
+BM25_PATH = ARTIFACTS_DIR / "bm25.npz"
+OCR_CACHE_DIR = ARTIFACTS_DIR / "ocr_cache"
+MANIFEST_PATH = ARTIFACTS_DIR / "manifest.json"
+EMBED_CACHE_DIR = ARTIFACTS_DIR / "embedding_cache"
+SHARD_MAP_PATH = ARTIFACTS_DIR / SHARD_MAP_NAME
+
+# Chunks embedded per batch; bounds build memory independent of corpus size
+EMBED_BATCH_ROWS = 1024
+
+# efSearch tuning: ground truth is exact up to this many vectors,
+# the index at a very high efSearch beyond
+TUNE_EXACT_MAX_ROWS = 100_000
+TUNE_QUERIES = 200
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline FAISS index build")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes for PDF extraction (1 = serial)"
+    )
+    parser.add_argument(
+        "--pages-per-task",
+        type=int,
+        default=PAGES_PER_TASK,
+        help="page range size when splitting PDFs across workers"
+    )
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=OCR_WORKERS,
+        help="parallel OCR calls"
+    )
+    parser.add_argument(
+        "--ocr-cache-dir",
+        type=Path,
+        default=OCR_CACHE_DIR,
+        help="persistent OCR result cache keyed by image hash"
+    )
+    parser.add_argument(
+        "--index-type",
+        choices=("auto",) + INDEX_KINDS,
+        default="auto",
+        help="FAISS index type; auto picks from corpus size and memory budget"
+    )
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=float,
+        default=INDEX_MEMORY_BUDGET_BYTES / (1024 * 1024),
+        help="index memory budget used by --index-type auto"
+    )
+    parser.add_argument(
+        "--pca-dim",
+        type=int,
+        default=None,
+        help="reduce vectors to this many dims with PCA before indexing"
+    )
+    parser.add_argument(
+        "--rescore-k-factor",
+        type=int,
+        default=0,
+        help="re-score the top k_factor·k candidates with exact vectors (0 = off)"
+    )
+    parser.add_argument(
+        "--embed-batch-rows",
+        type=int,
+        default=EMBED_BATCH_ROWS,
+        help="chunks embedded (and held in memory) at a time"
+    )
+    parser.add_argument(
+        "--embed-processes",
+        type=int,
+        default=None,
+        help="encode processes per batch (default RAG_EMBED_PROCESSES; 0/1 = in-process)"
+    )
+    parser.add_argument(
+        "--embed-dtype",
+        choices=("float32", "float16"),
+        default="float32",
+        help="storage type of new embedding-cache shards"
+    )
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="rebuild only the FAISS index from the saved chunks and cached embeddings"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="ignore the manifest and rebuild every document"
+    )
+    parser.add_argument(
+        "--tune-recall",
+        type=float,
+        default=0.95,
+        help="tune efSearch to the smallest value reaching this recall@k (0 = no recall target)"
+    )
+    parser.add_argument(
+        "--tune-p95-ms",
+        type=float,
+        default=None,
+        help="cap single-query p95 search latency when tuning efSearch"
+    )
+    parser.add_argument(
+        "--tune-k",
+        type=int,
+        default=10,
+        help="k for the recall target"
+    )
+    parser.add_argument(
+        "--tune-queries",
+        type=Path,
+        default=None,
+        help="JSONL of {\"query\": ...} to tune on (default: perturbed chunk vectors)"
+    )
+    parser.add_argument(
+        "--no-tune",
+        action="store_true",
+        help="keep the stored / default efSearch"
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="split the index into this many shards built in parallel (1 = single index)"
+    )
+    parser.add_argument(
+        "--shard-processes",
+        type=int,
+        default=None,
+        help="parallel shard builds (default: one per core)"
+    )
+    return parser.parse_args()
+
+
+def load_previous_build():
+    """
+    Returns (manifest, chunks) of the last complete build, or (None, None)
+    when there is nothing reusable. A sharded build (shard map, no single
+    index) counts: its chunks are reused even if the index is rebuilt.
+    """
+    if not (MANIFEST_PATH.exists() and (INDEX_PATH.exists() or SHARD_MAP_PATH.exists())):
+        return None, None
+
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("model") != MODEL_ID:
+        print(f"Embedding model changed ({manifest.get('model')} → {MODEL_ID}), full rebuild")
+        return None, None
+
+    if is_chunk_store(CHUNK_STORE_DIR):
+        chunks = list(ChunkStore(CHUNK_STORE_DIR))
+    elif CHUNKS_PATH.exists():
+        with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+    else:
+        return None, None
+
+    if sum(d["chunk_count"] for d in manifest["documents"]) != len(chunks):
+        print("⚠️ Manifest does not match saved chunks, full rebuild")
+        return None, None
+
+    return manifest, chunks
+
+
+def group_chunks_by_doc(manifest: dict, chunks: list) -> dict:
+    """
+    Split the saved chunks back into per-document row ranges using the
+    manifest's document order.
+    """
+    by_doc = {}
+    pos = 0
+    for entry in manifest["documents"]:
+        by_doc[entry["doc_id"]] = chunks[pos : pos + entry["chunk_count"]]
+        pos += entry["chunk_count"]
+    return by_doc
+
+
+def embed_batches(
+    texts: list,
+    cache: EmbeddingCache,
+    batch_rows: int,
+    start: int = 0,
+    counts: Counter = None,
+    processes: int = None
+):
+    """
+    Yield float32 vectors for texts[start:] in order, batch_rows at a
+    time. Cache misses are encoded and added to the cache, which writes
+    them to disk shard by shard.
+    """
+    for lo in range(start, len(texts), batch_rows):
+        batch = texts[lo : lo + batch_rows]
+        vecs = cache.lookup(batch)
+
+        missing = [i for i, vec in enumerate(vecs) if vec is None]
+        if missing:
+            fresh = embed_texts([batch[i] for i in missing], processes=processes)
+            cache.add([batch[i] for i in missing], fresh)
+            for i, vec in zip(missing, fresh):
+                vecs[i] = vec
+
+        if counts is not None:
+            counts["computed"] += len(missing)
+
+        yield np.stack(vecs).astype("float32", copy=False)
+
+
+def build_from_cache(texts: list, cache: EmbeddingCache, args, counts: Counter):
+    """
+    Rebuild the FAISS index over all rows, streaming vectors from the
+    embedding cache (encoding only what is missing).
+    """
+    def train_sample(rows: int) -> np.ndarray:
+        rng = np.random.default_rng(0)
+        picks = np.sort(rng.choice(len(texts), size=min(rows, len(texts)), replace=False))
+        return np.stack(cache.lookup([texts[i] for i in picks])).astype("float32")
+
+    return build_index_streaming(
+        lambda: embed_batches(
+            texts, cache, args.embed_batch_rows, counts=counts, processes=args.embed_processes
+        ),
+        n=len(texts),
+        train_sample=train_sample,
+        kind=args.index_type,
+        index_path=str(INDEX_PATH),
+        pca_dim=args.pca_dim,
+        rescore_k_factor=args.rescore_k_factor,
+        memory_budget_bytes=int(args.memory_budget_mb * 1024 * 1024)
+    )
+
+
+def build_sharded(texts: list, cache: EmbeddingCache, args, counts: Counter) -> dict:
+    """
+    Build args.shards indexes over contiguous row ranges in parallel
+    processes, streaming vectors from the embedding cache, and write the
+    shard map the app serves from. Shards keep the default efSearch.
+    """
+    shard_map = build_shards(
+        embed_batches(
+            texts, cache, args.embed_batch_rows, counts=counts, processes=args.embed_processes
+        ),
+        n=len(texts),
+        out_dir=ARTIFACTS_DIR,
+        n_shards=args.shards,
+        kind=args.index_type,
+        processes=args.shard_processes
+    )
+    print(f"{args.shards} shards built in {shard_map['build_s']:.1f}s "
+          f"({shard_map['build_processes']} processes) → {SHARD_MAP_PATH}")
+
+    # The single index is now stale; don't leave it for readers to find
+    for stale in (INDEX_PATH, Path(f"{INDEX_PATH}.meta.json")):
+        stale.unlink(missing_ok=True)
+    return shard_map
+
+
+def tune_search(index, texts: list, cache: EmbeddingCache, args):
+    """
+    Calibrate efSearch on held-out queries and store it in the index
+    meta (HNSW kinds only). Queries are the --tune-queries questions, or
+    chunk vectors pushed slightly off the data.
+    """
+    if args.no_tune or (not args.tune_recall and args.tune_p95_ms is None):
+        return
+
+    if args.tune_queries:
+        with open(args.tune_queries, "r", encoding="utf-8") as f:
+            questions = [json.loads(line)["query"] for line in f if line.strip()]
+        queries = embed_texts(questions)
+    else:
+        rng = np.random.default_rng(0)
+        picks = np.sort(rng.choice(len(texts), size=min(TUNE_QUERIES, len(texts)), replace=False))
+        queries = tuning_queries(np.stack(cache.lookup([texts[i] for i in picks])))
+
+    vectors = None
+    if len(texts) <= TUNE_EXACT_MAX_ROWS:
+        vectors = np.concatenate(list(embed_batches(texts, cache, args.embed_batch_rows)))
+
+    tuning = tune_and_record(
+        index,
+        str(INDEX_PATH),
+        queries,
+        k=args.tune_k,
+        target_recall=args.tune_recall or None,
+        target_p95_ms=args.tune_p95_ms,
+        vectors=vectors
+    )
+    if tuning is None:
+        return
+
+    print(f"{'🎯' if tuning['met'] else '⚠️'} efSearch={tuning['ef_search']}: "
+          f"recall@{tuning['k']}={tuning['recall']:.3f}, p95={tuning['p95_ms']:.2f}ms "
+          f"on {tuning['queries']} queries (vs {tuning['reference']})")
+
+
+def reindex(args):
+    """
+    Index-only rebuild (e.g. a new --index-type or --pca-dim): chunks come
+    from the chunk store and vectors from the embedding cache, so nothing
+    is re-extracted or re-encoded.
+    """
+    if not is_chunk_store(CHUNK_STORE_DIR):
+        raise RuntimeError(f"No chunk store at {CHUNK_STORE_DIR}; run a full build first")
+
+    store = ChunkStore(CHUNK_STORE_DIR)
+    texts = [store.text(i) for i in range(len(store))]
+
+    cache = EmbeddingCache(EMBED_CACHE_DIR, MODEL_ID, dtype=args.embed_dtype)
+    counts = Counter()
+
+    t0 = time.perf_counter()
+    if args.shards > 1:
+        build_sharded(texts, cache, args, counts)
+        cache.save()
+        return
+
+    # A single index replaces any sharded build
+    SHARD_MAP_PATH.unlink(missing_ok=True)
+
+    index = build_from_cache(texts, cache, args, counts)
+    tune_search(index, texts, cache, args)
+    cache.save()
+
+    print(f"Index rebuilt from {index.ntotal} cached vectors in {time.perf_counter() - t0:.1f}s "
+          f"({counts['computed']} had to be encoded; "
+          f"{load_index_meta(str(INDEX_PATH))['factory']})")
 
 
 def main():
+    args = parse_args()
+
     print("\n===== OFFLINE INDEX BUILD STARTED =====\n")
 
     ARTIFACTS_DIR.mkdir(exist_ok=True)
 
-    all_chunks = []
+    if args.reindex:
+        reindex(args)
+        print("\n===== OFFLINE INDEX BUILD COMPLETE =====\n")
+        return
 
-    pdf_files = list(DATA_DIR.glob("*.pdf"))
+    pdf_files = sorted(DATA_DIR.glob("*.pdf"))
     if not pdf_files:
         raise RuntimeError("No PDFs found in data_pdfs/")
 
-    # 1️⃣ Load + chunk PDFs
-    for pdf_path in pdf_files:
-        print(f"Processing: {pdf_path.name}")
+    # 0️⃣ Diff against the last build's manifest
+    prev_manifest, prev_chunks = (None, None) if args.full else load_previous_build()
+    prev_docs = prev_manifest["documents"] if prev_manifest else []
+    prev_chunks_by_doc = group_chunks_by_doc(prev_manifest, prev_chunks) if prev_manifest else {}
+
+    hashes = {p.stem: file_sha256(p) for p in pdf_files}
+
+    kept_docs = [
+        d for d in prev_docs
+        if hashes.get(d["doc_id"]) == d["sha256"]
+    ]
+    kept_ids = {d["doc_id"] for d in kept_docs}
+    dropped_ids = [d["doc_id"] for d in prev_docs if d["doc_id"] not in kept_ids]
+    to_extract = [p for p in pdf_files if p.stem not in kept_ids]
+
+    print(f"Documents: {len(kept_docs)} unchanged, {len(to_extract)} new/changed, "
+          f"{len(dropped_ids)} removed/changed since last build")
+
+    # 1️⃣ Load + chunk new/changed PDFs; reuse chunks of unchanged ones.
+    # Unchanged documents keep their rows (FAISS ids); new rows go last.
+    all_chunks = []
+    manifest_docs = []
+
+    for entry in kept_docs:
+        all_chunks.extend(prev_chunks_by_doc[entry["doc_id"]])
+        manifest_docs.append(entry)
 
-        text = extract_text_from_pdf(pdf_path)
+    reused_rows = len(all_chunks)
 
-        chunks = chunk_document({
-            "doc_id": pdf_path.stem,
-            "source_path": str(pdf_path),
-            "text": text
-        })
+    if to_extract:
+        t0 = time.perf_counter()
+        ocr_stats = Counter()
+        extracted_all = extract_pdfs(
+            to_extract,
+            workers=args.workers,
+            pages_per_task=args.pages_per_task,
+            ocr_cache_dir=args.ocr_cache_dir,
+            ocr_workers=args.ocr_workers,
+            stats=ocr_stats
+        )
+        print(f"Extracted {len(to_extract)} PDFs in {time.perf_counter() - t0:.1f}s "
+              f"(workers={args.workers})")
+        print(f"OCR: {format_ocr_stats(ocr_stats)}")
 
-        all_chunks.extend(chunks)
+        for pdf_path, extracted in zip(to_extract, extracted_all):
+            print(f"Processing: {pdf_path.name}")
 
-    print(f"\nTotal chunks: {len(all_chunks)}")
+            chunks = chunk_document({
+                "doc_id": pdf_path.stem,
+                "source_path": str(pdf_path),
+                "text": extracted["text"],
+                "blocks": extracted["blocks"]
+            })
+
+            all_chunks.extend(chunks)
+            manifest_docs.append({
+                "doc_id": pdf_path.stem,
+                "source_path": str(pdf_path),
+                "sha256": hashes[pdf_path.stem],
+                "chunk_count": len(chunks)
+            })
+
+    print(f"\nTotal chunks: {len(all_chunks)} ({reused_rows} reused, "
+          f"{len(all_chunks) - reused_rows} rechunked)")
 
     # 2️⃣ Save chunk metadata
-    with open(CHUNKS_PATH, "w", encoding="utf-8") as f:
-        json.dump(all_chunks, f, indent=2)
+    write_chunk_store(all_chunks, CHUNK_STORE_DIR)
+
+    print(f"Chunks saved → {CHUNK_STORE_DIR}")
 
-    print(f"Chunks saved → {CHUNKS_PATH}")
+    # Lexical index over the same rows (cheap; always rebuilt)
+    t0 = time.perf_counter()
+    BM25Index.build([c["text"] for c in all_chunks]).save(BM25_PATH)
+    print(f"BM25 index saved → {BM25_PATH} ({time.perf_counter() - t0:.1f}s)")
 
-    # 3️⃣ Embed
+    # 3️⃣ + 4️⃣ Embed in bounded batches, reusing cached vectors for chunk
+    # texts seen before, and feed the FAISS index as batches arrive.
+    # New vectors are persisted to embedding-cache shards as they are
+    # computed, so a crash keeps the work and --reindex never re-encodes.
     texts = [c["text"] for c in all_chunks]
-    embeddings = embed_texts(texts)
+    if not texts:
+        raise RuntimeError("No chunks produced from data_pdfs/")
 
-    print(f"Embeddings shape: {embeddings.shape}")
+    cache = EmbeddingCache(EMBED_CACHE_DIR, MODEL_ID, dtype=args.embed_dtype)
+    counts = Counter()
 
-    # 4️⃣ Build + save FAISS index
-    build_and_save_hnsw_index(
-        embeddings=embeddings,
-        index_path=str(INDEX_PATH)
-    )
+    # HNSW cannot delete vectors, so any removed/changed document means
+    # rebuilding the graph from the (cached) vectors; pure additions are
+    # appended to the saved index.
+    index = None
+    if args.shards > 1:
+        # Shards are always rebuilt from the (cached) vectors
+        build_sharded(texts, cache, args, counts)
+    elif prev_manifest and not dropped_ids and not SHARD_MAP_PATH.exists():
+        try:
+            index = append_to_index(
+                str(INDEX_PATH),
+                embed_batches(
+                    texts, cache, args.embed_batch_rows, reused_rows, counts,
+                    processes=args.embed_processes
+                ),
+                expected_ntotal=reused_rows
+            )
+            print(f"Index updated in place: {reused_rows} vectors kept, "
+                  f"{len(all_chunks) - reused_rows} added (ntotal={index.ntotal})")
+        except ValueError as e:
+            print(f"⚠️ Cannot append to existing index ({e}), rebuilding")
+
+    if index is None and args.shards <= 1:
+        SHARD_MAP_PATH.unlink(missing_ok=True)
+        index = build_from_cache(texts, cache, args, counts)
+        print(f"Index rebuilt from {len(all_chunks)} vectors "
+              f"({load_index_meta(str(INDEX_PATH))['factory']})")
+
+    # Re-tuned after appends too: a bigger graph may need a higher efSearch
+    if index is not None:
+        tune_search(index, texts, cache, args)
+
+    cache.save(keep_texts=texts)
+
+    print(f"Embeddings: {len(texts)} x {cache.dim} "
+          f"({len(texts) - counts['computed']} reused, {counts['computed']} computed)")
+
+    # 5️⃣ Manifest last: it marks the artifacts above as a complete build
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump({"model": MODEL_ID, "documents": manifest_docs}, f, indent=2)
 
-    print(f"FAISS index saved → {INDEX_PATH}")
+    print(f"FAISS index saved → {SHARD_MAP_PATH if args.shards > 1 else INDEX_PATH}")
     print("\n===== OFFLINE INDEX BUILD COMPLETE =====\n")
 
 
@@ -0,0 +1,241 @@
+import argparse
+import json
+import mmap
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+
+FORMAT_VERSION = 1
+
+# Longest prefix of a chunk that is looked up in the tail of the previous
+# chunk when sharing overlap bytes (covers Chunking's 200-char overlap).
+MAX_SHARED_OVERLAP = 512
+
+
+def _shared_prefix_len(prev: str, text: str) -> int:
+    """
+    Length of the longest prefix of `text` that is a suffix of `prev`.
+    """
+    for k in range(min(len(prev), len(text), MAX_SHARED_OVERLAP), 0, -1):
+        if prev.endswith(text[:k]):
+            return k
+    return 0
+
+
+def write_chunk_store(chunks: List[Dict], store_dir: Path):
+    """
+    Write chunks in the compact columnar layout read by ChunkStore:
+
+      text.bin           UTF-8 text blob; consecutive chunks of a document
+                         share their overlap bytes
+      spans.npy          (n, 2) int64 byte [start, end) of each chunk
+      chunk_ids.bin      UTF-8 chunk ids, concatenated
+      chunk_id_ends.npy  (n,) int64 end offset of each id in chunk_ids.bin
+      doc_codes.npy      (n,) int32 index into meta["documents"]
+      pages.npy          (n,) int32 page number, -1 if unknown
+      type_codes.npy     (n,) uint8 index into meta["content_types"]
+      meta.json          format, count, document and content-type tables
+
+    The store is written to a sibling temp directory and swapped in, so
+    processes still mapping the old files are never handed truncated data.
+    """
+    final_dir = Path(store_dir)
+    store_dir = final_dir.with_name(final_dir.name + ".tmp")
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    store_dir.mkdir(parents=True)
+
+    n = len(chunks)
+    spans = np.zeros((n, 2), dtype="int64")
+    chunk_id_ends = np.zeros(n, dtype="int64")
+    doc_codes = np.zeros(n, dtype="int32")
+    pages = np.full(n, -1, dtype="int32")
+    type_codes = np.zeros(n, dtype="uint8")
+
+    documents: List[Dict] = []
+    doc_index: Dict[tuple, int] = {}
+    content_types: List[str] = []
+    type_index: Dict[str, int] = {}
+
+    text_pos = 0
+    id_pos = 0
+    prev_text = ""
+    prev_doc = None
+
+    with open(store_dir / "text.bin", "wb") as text_f, \
+            open(store_dir / "chunk_ids.bin", "wb") as ids_f:
+
+        for i, chunk in enumerate(chunks):
+            text = chunk["text"]
+
+            doc_key = (chunk["doc_id"], chunk.get("source_path"))
+            if doc_key not in doc_index:
+                doc_index[doc_key] = len(documents)
+                documents.append({"doc_id": doc_key[0], "source_path": doc_key[1]})
+            doc_code = doc_index[doc_key]
+
+            shared = _shared_prefix_len(prev_text, text) if doc_code == prev_doc else 0
+            shared_bytes = len(text[:shared].encode("utf-8"))
+            rest = text[shared:].encode("utf-8")
+
+            start = text_pos - shared_bytes
+            text_f.write(rest)
+            text_pos += len(rest)
+            spans[i] = (start, text_pos)
+
+            chunk_id = chunk["chunk_id"].encode("utf-8")
+            ids_f.write(chunk_id)
+            id_pos += len(chunk_id)
+            chunk_id_ends[i] = id_pos
+
+            content_type = chunk.get("content_type") or "unknown"
+            if content_type not in type_index:
+                type_index[content_type] = len(content_types)
+                content_types.append(content_type)
+
+            doc_codes[i] = doc_code
+            type_codes[i] = type_index[content_type]
+            if chunk.get("page") is not None:
+                pages[i] = chunk["page"]
+
+            prev_text = text
+            prev_doc = doc_code
+
+    np.save(store_dir / "spans.npy", spans)
+    np.save(store_dir / "chunk_id_ends.npy", chunk_id_ends)
+    np.save(store_dir / "doc_codes.npy", doc_codes)
+    np.save(store_dir / "pages.npy", pages)
+    np.save(store_dir / "type_codes.npy", type_codes)
+
+    # meta.json last: its presence marks a complete store
+    with open(store_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "count": n,
+            "documents": documents,
+            "content_types": content_types
+        }, f)
+
+    if final_dir.exists():
+        shutil.rmtree(final_dir)
+    store_dir.rename(final_dir)
+
+
+def _map_file(path: Path):
+    with open(path, "rb") as f:
+        if path.stat().st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped view of a chunk store directory.
+
+    Behaves like the list loaded from chunks.json: `store[i]` returns the
+    chunk dict for FAISS id `i` in O(1). Nothing is read until the first
+    access, and text is decoded only for the chunks actually requested,
+    so the pages are shared through the OS page cache by every process
+    that maps the same files.
+    """
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        self._opened = False
+
+    def _open(self):
+        if self._opened:
+            return
+
+        with open(self.store_dir / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("format") != FORMAT_VERSION:
+            raise RuntimeError(
+                f"Unsupported chunk store format {meta.get('format')} in {self.store_dir}"
+            )
+
+        self._count = meta["count"]
+        self._documents = meta["documents"]
+        self._content_types = meta["content_types"]
+
+        self._text = _map_file(self.store_dir / "text.bin")
+        self._ids = _map_file(self.store_dir / "chunk_ids.bin")
+
+        load = lambda name: np.load(self.store_dir / name, mmap_mode="r")
+        self._spans = load("spans.npy")
+        self._chunk_id_ends = load("chunk_id_ends.npy")
+        self._doc_codes = load("doc_codes.npy")
+        self._pages = load("pages.npy")
+        self._type_codes = load("type_codes.npy")
+
+        self._opened = True
+
+    def __len__(self) -> int:
+        self._open()
+        return self._count
+
+    def text(self, i: int) -> str:
+        self._open()
+        start, end = self._spans[i]
+        return self._text[start:end].decode("utf-8")
+
+    def chunk_id(self, i: int) -> str:
+        self._open()
+        start = self._chunk_id_ends[i - 1] if i > 0 else 0
+        return self._ids[start : self._chunk_id_ends[i]].decode("utf-8")
+
+    def __getitem__(self, i: int) -> Dict:
+        self._open()
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+
+        doc = self._documents[self._doc_codes[i]]
+        page = int(self._pages[i])
+
+        return {
+            "chunk_id": self.chunk_id(i),
+            "doc_id": doc["doc_id"],
+            "source_path": doc["source_path"],
+            "text": self.text(i),
+            "page": page if page >= 0 else None,
+            "content_type": self._content_types[self._type_codes[i]]
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+def is_chunk_store(path: Path) -> bool:
+    return (Path(path) / "meta.json").exists()
+
+
+def convert_json(json_path: Path, store_dir: Path):
+    with open(json_path, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    write_chunk_store(chunks, store_dir)
+    return len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert chunks.json to a chunk store")
+    parser.add_argument("json_path", type=Path)
+    parser.add_argument("store_dir", type=Path)
+    args = parser.parse_args()
+
+    count = convert_json(args.json_path, args.store_dir)
+
+    json_bytes = args.json_path.stat().st_size
+    store_bytes = sum(p.stat().st_size for p in args.store_dir.iterdir())
+    print(f"✅ Converted {count} chunks → {args.store_dir}")
+    print(f"JSON: {json_bytes / 1e6:.2f} MB | store: {store_bytes / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
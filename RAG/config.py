@@ -1,9 +1,19 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()  # loads .env into environment
+try:
+    from dotenv import load_dotenv
+    load_dotenv()  # loads .env into environment
+except ImportError:
+    pass
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY not set")
+
+def require_openai_key() -> str:
+    """
+    Only code paths that actually call OpenAI need the key; importing
+    this module never fails.
+    """
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY not set")
+    return OPENAI_API_KEY
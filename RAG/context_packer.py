@@ -0,0 +1,182 @@
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Overlaps shorter than this are treated as coincidence, not chunk overlap
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 512
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _overlap_len(prev: str, text: str) -> int:
+    """
+    Length of the longest prefix of `text` that is a suffix of `prev`.
+    """
+    for k in range(min(len(prev), len(text), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if prev.endswith(text[:k]):
+            return k
+    return 0
+
+
+def strip_overlap(contexts: List[str]) -> Tuple[List[str], int]:
+    """
+    Remove text a context shares with an earlier one: neighbouring chunks
+    of a document repeat their overlap at the seam, in either order.
+    Returns the stripped contexts and the number of characters removed.
+    """
+    out: List[str] = []
+    removed = 0
+
+    for text in contexts:
+        original = len(text)
+        for prev in out:
+            head = _overlap_len(prev, text)
+            text = text[head:]
+            tail = _overlap_len(text, prev)
+            if tail:
+                text = text[:-tail]
+        removed += original - len(text)
+        out.append(text.strip())
+
+    return out, removed
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def pack_context(
+    query: str,
+    q_vec: Optional[np.ndarray],
+    contexts: List[str],
+    budget_tokens: int,
+    count_tokens: Callable[[List[str]], List[int]],
+    embed: Callable[[List[str]], np.ndarray]
+) -> Tuple[str, Dict]:
+    """
+    Fit ranked contexts into `budget_tokens` of prompt space.
+
+    Shared overlap is stripped first. If everything then fits it is kept
+    as is; otherwise sentences are ranked by cosine similarity to the
+    query vector and the best ones are kept, in document order, until
+    the budget is full. Nothing is left for the tokenizer to truncate.
+    Without q_vec the query is embedded along with the sentences.
+    """
+    contexts, overlap_chars = strip_overlap(contexts)
+    contexts = [c for c in contexts if c]
+
+    stats = {
+        "overlap_chars_removed": overlap_chars,
+        "sentences_total": 0,
+        "sentences_kept": 0
+    }
+
+    full = "\n\n".join(contexts)
+    if not contexts or count_tokens([full])[0] <= budget_tokens:
+        return full, stats
+
+    # (context index, sentence) in reading order
+    sentences = [
+        (c, sentence)
+        for c, text in enumerate(contexts)
+        for sentence in split_sentences(text)
+    ]
+    texts = [s for _, s in sentences]
+    lengths = count_tokens(texts)
+
+    if q_vec is None:
+        vecs = embed([query] + texts)
+        q_vec, vecs = vecs[0], vecs[1:]
+    else:
+        vecs = embed(texts)
+    scores = vecs @ np.asarray(q_vec, dtype="float32").reshape(-1)
+
+    kept: List[int] = []
+    used = 0
+    for i in np.argsort(-scores, kind="stable"):
+        if used + lengths[i] <= budget_tokens:
+            kept.append(int(i))
+            used += lengths[i]
+
+    def _join(selected: List[int]) -> str:
+        selected = sorted(selected)
+        parts: List[List[str]] = [[] for _ in contexts]
+        for i in selected:
+            parts[sentences[i][0]].append(sentences[i][1])
+        return "\n\n".join(" ".join(p) for p in parts if p)
+
+    packed = _join(kept)
+
+    # Per-sentence counts are an estimate; drop the weakest until exact
+    by_score = sorted(kept, key=lambda i: scores[i])
+    while by_score and count_tokens([packed])[0] > budget_tokens:
+        kept.remove(by_score.pop(0))
+        packed = _join(kept)
+
+    stats["sentences_total"] = len(sentences)
+    stats["sentences_kept"] = len(kept)
+    return packed, stats
+
+
+def fit_question(
+    query: str,
+    max_query_tokens: int,
+    count_tokens: Callable[[List[str]], List[int]]
+) -> str:
+    """
+    Shorten an over-long question word by word from the front, so its
+    end (usually the actual ask) is what reaches the model.
+    """
+    if count_tokens([query])[0] <= max_query_tokens:
+        return query
+
+    words = query.split()
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if count_tokens([" ".join(words[mid:])])[0] <= max_query_tokens:
+            hi = mid
+        else:
+            lo = mid + 1
+    return " ".join(words[lo:])
+
+
+def pack_prompt(
+    query: str,
+    q_vec: Optional[np.ndarray],
+    contexts: List[str],
+    build_prompt: Callable[[str, str], str],
+    count_tokens: Callable[[List[str]], List[int]],
+    embed: Callable[[List[str]], np.ndarray],
+    max_tokens: int = 512
+) -> Tuple[str, str, Dict]:
+    """
+    Pack (query, contexts) for a model that reads at most max_tokens.
+    Returns (query, context_text, stats); the question always fits, and
+    the context gets whatever the template and question leave over.
+
+    stats["tokens_saved"] is the encoder input saved against the naive
+    prompt (all contexts joined, truncated at max_tokens).
+    """
+    naive_tokens = count_tokens([build_prompt(query, "\n\n".join(contexts))])[0]
+
+    template_tokens = count_tokens([build_prompt("", "")])[0]
+    query = fit_question(query, max(max_tokens - template_tokens, 1) // 2, count_tokens)
+
+    reserved = count_tokens([build_prompt(query, "")])[0]
+    budget = max(max_tokens - reserved, 0)
+
+    context_text, stats = pack_context(query, q_vec, contexts, budget, count_tokens, embed)
+
+    prompt_tokens = count_tokens([build_prompt(query, context_text)])[0]
+
+    stats.update({
+        "naive_prompt_tokens": naive_tokens,
+        "prompt_tokens": prompt_tokens,
+        "tokens_saved": min(naive_tokens, max_tokens) - prompt_tokens,
+        "naive_truncated": naive_tokens > max_tokens
+    })
+    return query, context_text, stats
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def text_key(model_name: str, text: str) -> str:
+    """
+    Content address of one chunk embedding: the model plus the exact text.
+    """
+    h = hashlib.sha256()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+# Rows per on-disk shard; bounds the vectors held in memory while adding
+SHARD_ROWS = 8192
+
+# save(keep_texts) rewrites the cache once this share of rows is stale
+COMPACT_STALE_FRACTION = 0.25
+
+
+class EmbeddingCache:
+    """
+    Content-addressed chunk-embedding store for incremental builds.
+
+    Vectors live in append-only, memory-mapped `.npy` shards (float32 or
+    float16), each with a row-aligned `.keys.json` list; `meta.json`
+    lists the complete shards. Rows are looked up by
+    text_key(model, text), so a vector is reused whenever the same text
+    is embedded with the same model. A shard is written every SHARD_ROWS
+    additions, so a crashed build keeps everything but the last partial
+    shard.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        model_name: str,
+        dtype: str = "float32",
+        shard_rows: int = SHARD_ROWS
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.shard_rows = shard_rows
+
+        self._load()
+
+    @property
+    def meta_path(self) -> Path:
+        return self.cache_dir / "meta.json"
+
+    def _load(self):
+        self._shards: List[dict] = []
+        self._arrays: List[np.ndarray] = []
+        self._rows: Dict[str, Tuple[int, int]] = {}  # key → (shard, row)
+        self._next_shard = 0
+
+        self._pending_keys: List[str] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_rows: Dict[str, int] = {}
+
+        if self.meta_path.exists():
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            shards = meta["shards"]
+            self._next_shard = meta.get("next_shard", len(shards))
+        elif (self.cache_dir / "keys.json").exists() and (self.cache_dir / "vectors.npy").exists():
+            # Single-matrix layout of earlier builds: read it as one shard
+            shards = [{"vectors": "vectors.npy", "keys": "keys.json"}]
+        else:
+            return
+
+        for shard in shards:
+            with open(self.cache_dir / shard["keys"], "r", encoding="utf-8") as f:
+                keys = json.load(f)
+            vectors = np.load(self.cache_dir / shard["vectors"], mmap_mode="r")
+
+            if len(keys) != vectors.shape[0]:
+                print(f"⚠️ Embedding cache shard {shard['vectors']} is inconsistent, ignoring it")
+                continue
+
+            s = len(self._shards)
+            self._shards.append({**shard, "rows": len(keys)})
+            self._arrays.append(vectors)
+            for row, key in enumerate(keys):
+                self._rows[key] = (s, row)
+
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._pending_keys)
+
+    @property
+    def dim(self) -> Optional[int]:
+        if self._arrays:
+            return int(self._arrays[0].shape[1])
+        if self._pending_vectors:
+            return int(self._pending_vectors[0].shape[0])
+        return None
+
+    def _get(self, key: str) -> Optional[np.ndarray]:
+        loc = self._rows.get(key)
+        if loc is not None:
+            return np.asarray(self._arrays[loc[0]][loc[1]], dtype="float32")
+        row = self._pending_rows.get(key)
+        if row is not None:
+            return self._pending_vectors[row].astype("float32")
+        return None
+
+    def lookup(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Cached float32 vector for each text, or None on a miss.
+        """
+        return [self._get(text_key(self.model_name, text)) for text in texts]
+
+    def add(self, texts: List[str], vectors: np.ndarray):
+        for text, vec in zip(texts, vectors):
+            self._add_key(text_key(self.model_name, text), vec)
+
+    def _add_key(self, key: str, vec: np.ndarray):
+        if key in self._rows or key in self._pending_rows:
+            return
+        self._pending_rows[key] = len(self._pending_keys)
+        self._pending_keys.append(key)
+        self._pending_vectors.append(np.asarray(vec, dtype=self.dtype))
+
+        if len(self._pending_keys) >= self.shard_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Write pending vectors as a new shard and record it in meta.json.
+        """
+        if not self._pending_keys:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        name = f"shard-{self._next_shard:05d}"
+        shard = {"vectors": f"{name}.npy", "keys": f"{name}.keys.json"}
+
+        np.save(self.cache_dir / shard["vectors"], np.stack(self._pending_vectors))
+        with open(self.cache_dir / shard["keys"], "w", encoding="utf-8") as f:
+            json.dump(self._pending_keys, f)
+
+        s = len(self._shards)
+        self._shards.append({**shard, "rows": len(self._pending_keys)})
+        self._arrays.append(np.load(self.cache_dir / shard["vectors"], mmap_mode="r"))
+        for row, key in enumerate(self._pending_keys):
+            self._rows[key] = (s, row)
+
+        self._next_shard += 1
+        self._pending_keys = []
+        self._pending_vectors = []
+        self._pending_rows = {}
+
+        self._write_meta()
+
+    def _write_meta(self):
+        tmp = self.meta_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model_name,
+                "next_shard": self._next_shard,
+                "shards": [
+                    {"vectors": s["vectors"], "keys": s["keys"], "rows": s["rows"]}
+                    for s in self._shards
+                ]
+            }, f, indent=2)
+        tmp.replace(self.meta_path)
+
+    def save(self, keep_texts: Optional[List[str]] = None):
+        """
+        Persist pending vectors. With `keep_texts`, entries for other
+        texts are dropped once they exceed COMPACT_STALE_FRACTION of the
+        cache, so vectors of deleted chunks do not accumulate.
+        """
+        self.flush()
+
+        if keep_texts is None or not self._rows:
+            return
+
+        wanted = {text_key(self.model_name, t) for t in keep_texts}
+        stale = sum(1 for key in self._rows if key not in wanted)
+        if stale <= COMPACT_STALE_FRACTION * len(self._rows):
+            return
+
+        self._compact(wanted)
+
+    def _compact(self, wanted: set):
+        """
+        Rewrite the wanted rows shard by shard into a fresh directory and
+        swap it in; memory stays bounded by one shard.
+        """
+        tmp_dir = self.cache_dir.with_name(self.cache_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        compacted = EmbeddingCache(tmp_dir, self.model_name, self.dtype, self.shard_rows)
+        for s, (shard, vectors) in enumerate(zip(self._shards, self._arrays)):
+            with open(self.cache_dir / shard["keys"], "r", encoding="utf-8") as f:
+                keys = json.load(f)
+            for row, key in enumerate(keys):
+                if key in wanted and self._rows.get(key) == (s, row):
+                    compacted._add_key(key, vectors[row])
+        compacted.flush()
+
+        old_dir = self.cache_dir.with_name(self.cache_dir.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        self.cache_dir.rename(old_dir)
+        tmp_dir.rename(self.cache_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+        print(f"🧹 Embedding cache compacted: {len(self._rows)} → {len(compacted)} rows")
+
+        self._load()
@@ -1,21 +1,225 @@
-from typing import List
+from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from RAG import models
+from RAG.backends import OnnxSentenceEncoder, backend_for, quantize_int8
+from RAG.cache import LRUCache, normalize_query
 
 # Lightweight, fast, free
 MODEL_NAME = "all-MiniLM-L6-v2"
 
-_model = SentenceTransformer(MODEL_NAME)
+# Query-embedding cache (size 0 disables it)
+QUERY_CACHE_SIZE = int(os.environ.get("RAG_EMBED_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL_S = float(os.environ.get("RAG_EMBED_CACHE_TTL_S", "3600"))
+
+# Batches are formed from length-sorted texts so that
+# batch_size x longest sequence stays within this many (padded) tokens
+EMBED_TOKEN_BUDGET = int(os.environ.get("RAG_EMBED_TOKEN_BUDGET", "8192"))
+EMBED_MAX_BATCH = int(os.environ.get("RAG_EMBED_MAX_BATCH", "256"))
+
+# Optional multi-process encoding for large calls (0 = in-process only)
+EMBED_PROCESSES = int(os.environ.get("RAG_EMBED_PROCESSES", "0"))
+EMBED_POOL_MIN_TEXTS = int(os.environ.get("RAG_EMBED_POOL_MIN_TEXTS", "256"))
+
+BACKEND = backend_for("EMBED")
+
+# Vectors from different backends drift slightly; keep their caches apart
+MODEL_ID = MODEL_NAME if BACKEND == "torch" else f"{MODEL_NAME}@{BACKEND}"
+
+
+def _load():
+    if BACKEND == "onnx":
+        return OnnxSentenceEncoder("EMBED")
+
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(MODEL_NAME)
+    if BACKEND == "int8":
+        quantize_int8(model)
+    return model
+
+
+# Loaded on first embed_texts() call or models.warm_up(["embed"])
+models.register("embed", _load)
+
+
+_query_cache = (
+    LRUCache(max_size=QUERY_CACHE_SIZE, ttl_seconds=QUERY_CACHE_TTL_S)
+    if QUERY_CACHE_SIZE > 0 else None
+)
+
 
-def embed_texts(texts: List[str]) -> np.ndarray:
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+
+
+def _token_lengths(model, texts: List[str]) -> List[int]:
     """
-    Returns normalized embeddings (n, 384)
+    Tokens per text after the model's truncation (special tokens included).
     """
-    texts = [t if t.strip() else " " for t in texts]
-    vecs = _model.encode(
+    max_len = getattr(model, "max_seq_length", None) or 512
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return [min(len(t) // 4 + 2, max_len) for t in texts]
+
+    ids = tokenizer(
         texts,
-        batch_size=32,
-        show_progress_bar=False,
-        normalize_embeddings=True
-    )
-    return np.array(vecs, dtype="float32")
+        add_special_tokens=True,
+        truncation=True,
+        max_length=max_len
+    )["input_ids"]
+    return [len(i) for i in ids]
+
+
+def plan_batches(
+    lengths: List[int],
+    token_budget: int = EMBED_TOKEN_BUDGET,
+    max_batch: int = EMBED_MAX_BATCH
+) -> List[List[int]]:
+    """
+    Group text indices into batches of similar length: sort by length,
+    then grow each batch while (size x longest) fits the token budget.
+    A single over-budget text still gets its own batch.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    batches, current = [], []
+    for i in order:
+        # Ascending order: the newest text is the longest in the batch
+        if current and (
+            (len(current) + 1) * lengths[i] > token_budget
+            or len(current) >= max_batch
+        ):
+            batches.append(current)
+            current = []
+        current.append(i)
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _encode_batches(batches: List[List[str]]) -> List[np.ndarray]:
+    model = models.get("embed")
+    return [
+        np.asarray(
+            model.encode(
+                batch,
+                batch_size=len(batch),
+                show_progress_bar=False,
+                normalize_embeddings=True
+            ),
+            dtype="float32"
+        )
+        for batch in batches
+    ]
+
+
+def _pool_init(threads: int):
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    models.get("embed")
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    """
+    Encode workers each hold their own model copy; the pool is kept for
+    the life of the process.
+    """
+    global _pool, _pool_size
+
+    if _pool is None or _pool_size != processes:
+        if _pool is not None:
+            _pool.shutdown()
+        threads = max(1, (os.cpu_count() or 1) // processes)
+        _pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_pool_init,
+            initargs=(threads,)
+        )
+        _pool_size = processes
+    return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_size
+    if _pool is not None:
+        _pool.shutdown()
+    _pool, _pool_size = None, 0
+
+
+def _encode(texts: List[str], processes: Optional[int] = None) -> np.ndarray:
+    texts = [t if t.strip() else " " for t in texts]
+    model = models.get("embed")
+
+    batches = plan_batches(_token_lengths(model, texts))
+    text_batches = [[texts[i] for i in batch] for batch in batches]
+
+    processes = EMBED_PROCESSES if processes is None else processes
+    if processes > 1 and len(texts) >= EMBED_POOL_MIN_TEXTS:
+        # Interleave so every worker gets short and long batches
+        pool = _get_pool(processes)
+        parts = [text_batches[w::processes] for w in range(processes)]
+        encoded = [None] * len(text_batches)
+        for w, vecs in enumerate(pool.map(_encode_batches, parts)):
+            encoded[w::processes] = vecs
+    else:
+        encoded = _encode_batches(text_batches)
+
+    dim = encoded[0].shape[1] if encoded else model.get_sentence_embedding_dimension()
+    out = np.empty((len(texts), dim), dtype="float32")
+    for batch, vecs in zip(batches, encoded):
+        out[batch] = vecs
+    return out
+
+
+def embed_texts(
+    texts: List[str],
+    use_cache: bool = False,
+    processes: Optional[int] = None
+) -> np.ndarray:
+    """
+    Returns normalized embeddings (n, 384), in input order.
+
+    Texts are encoded in length-sorted, token-budgeted batches. With
+    processes > 1 (default RAG_EMBED_PROCESSES), calls of at least
+    EMBED_POOL_MIN_TEXTS texts are spread over a process pool.
+
+    With use_cache=True (query path) texts are looked up in the
+    query-embedding cache first and only misses are encoded.
+    """
+    if not use_cache or _query_cache is None or not texts:
+        return _encode(texts, processes)
+
+    keys = [(MODEL_ID, normalize_query(t)) for t in texts]
+    vecs: List = [_query_cache.get(key) for key in keys]
+
+    missing = [i for i, v in enumerate(vecs) if v is None]
+    if missing:
+        # Encode each distinct miss once, even if repeated in the batch
+        unique_texts = list(dict.fromkeys(keys[i][1] for i in missing))
+        encoded = dict(zip(unique_texts, _encode(unique_texts)))
+
+        for i in missing:
+            vec = encoded[keys[i][1]]
+            vec.flags.writeable = False
+            _query_cache.put(keys[i], vec)
+            vecs[i] = vec
+
+    return np.stack(vecs).astype("float32", copy=True)
+
+
+def embedding_cache_stats() -> dict:
+    """
+    Hit/miss/eviction counters of the query-embedding cache.
+    """
+    if _query_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **_query_cache.stats()}
@@ -0,0 +1,268 @@
+import argparse
+import itertools
+import json
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import faiss
+import numpy as np
+
+from RAG.faiss_hnsw import build_index, set_search_params
+
+
+ARTIFACTS_DIR = Path(__file__).resolve().parent.parent / "artifacts"
+
+
+# ===== METRICS =====
+# All metrics take `found` (nq, k) ids, best first, and `relevant`
+# (nq, r) ids padded with -1, and return one value per query.
+
+def pad_relevant(sets: List[List[int]]) -> np.ndarray:
+    width = max((len(s) for s in sets), default=0) or 1
+    out = np.full((len(sets), width), -1, dtype="int64")
+    for q, ids in enumerate(sets):
+        out[q, :len(ids)] = ids
+    return out
+
+
+def hit_matrix(found: np.ndarray, relevant: np.ndarray) -> np.ndarray:
+    """
+    (nq, k) bool: found[q, j] is one of query q's relevant ids.
+    """
+    hits = (found[:, :, None] == relevant[:, None, :]).any(axis=2)
+    return hits & (found >= 0)
+
+
+def recall_at_k(hits: np.ndarray, relevant: np.ndarray) -> np.ndarray:
+    n_rel = (relevant >= 0).sum(axis=1)
+    k = hits.shape[1]
+    return hits.sum(axis=1) / np.maximum(np.minimum(n_rel, k), 1)
+
+
+def mrr(hits: np.ndarray) -> np.ndarray:
+    first = hits.argmax(axis=1)
+    return np.where(hits.any(axis=1), 1.0 / (first + 1), 0.0)
+
+
+def ndcg_at_k(hits: np.ndarray, relevant: np.ndarray) -> np.ndarray:
+    k = hits.shape[1]
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (hits * discounts).sum(axis=1)
+
+    n_rel = np.minimum((relevant >= 0).sum(axis=1), k)
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)])[n_rel]
+    return np.divide(dcg, ideal, out=np.zeros_like(dcg), where=ideal > 0)
+
+
+def score(found: np.ndarray, relevant: np.ndarray) -> dict:
+    hits = hit_matrix(found, relevant)
+    return {
+        "recall": float(recall_at_k(hits, relevant).mean()),
+        "mrr": float(mrr(hits).mean()),
+        "ndcg": float(ndcg_at_k(hits, relevant).mean())
+    }
+
+
+# ===== DATA =====
+
+def load_artifacts(artifacts: Path, labeled_path: Path, batch_rows: int):
+    """
+    Corpus vectors from the embedding cache (missing rows are encoded and
+    cached), queries embedded in one batch, and label sets as row ids.
+    """
+    from RAG.bench_hybrid import load_labeled_queries
+    from RAG.build_index import embed_batches
+    from RAG.chunk_store import ChunkStore
+    from RAG.embedding_cache import EmbeddingCache
+    from RAG.embeddings_free import MODEL_ID, embed_texts
+
+    store = ChunkStore(artifacts / "chunks.store")
+    texts = [store.text(i) for i in range(len(store))]
+
+    cache = EmbeddingCache(artifacts / "embedding_cache", MODEL_ID)
+    xb = np.concatenate(list(embed_batches(texts, cache, batch_rows)))
+    cache.save()
+
+    labeled = load_labeled_queries(labeled_path)
+    row_of = {store.chunk_id(i): i for i in range(len(store))}
+    labels = [
+        [row_of[c] for c in q["relevant_chunk_ids"] if c in row_of]
+        for q in labeled
+    ]
+
+    xq = embed_texts([q["query"] for q in labeled])
+    return xb, np.ascontiguousarray(xq, dtype="float32"), pad_relevant(labels)
+
+
+def load_synthetic(n: int, dim: int, queries: int):
+    from RAG.synthetic_corpus import iter_synthetic_vectors, synthetic_vectors
+
+    xb = synthetic_vectors(n, dim)
+    xq = next(iter_synthetic_vectors(queries, dim, seed=1000))
+    return xb, xq, None
+
+
+# ===== SWEEP =====
+
+def timed_search(index: faiss.Index, xq: np.ndarray, k: int, repeat: int):
+    """
+    One multi-query search per repeat; returns (ids, best ms per query).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _, found = index.search(xq, k)
+        best = min(best, time.perf_counter() - t0)
+    return found, best / len(xq) * 1000
+
+
+def pareto_front(rows: List[dict], quality: str) -> List[dict]:
+    """
+    Rows not dominated on (quality ↑, ms_per_query ↓, bytes_per_vec ↓).
+    """
+    def dominates(a, b):
+        no_worse = (
+            a[quality] >= b[quality]
+            and a["ms_per_query"] <= b["ms_per_query"]
+            and a["bytes_per_vec"] <= b["bytes_per_vec"]
+        )
+        better = (
+            a[quality] > b[quality]
+            or a["ms_per_query"] < b["ms_per_query"]
+            or a["bytes_per_vec"] < b["bytes_per_vec"]
+        )
+        return no_worse and better
+
+    return [r for r in rows if not any(dominates(o, r) for o in rows)]
+
+
+def sweep(
+    xb: np.ndarray,
+    xq: np.ndarray,
+    labels: Optional[np.ndarray],
+    args
+) -> List[dict]:
+    n = len(xb)
+
+    # Exact flat inner-product ground truth and reference row
+    exact = faiss.IndexFlatIP(xb.shape[1])
+    exact.add(xb)
+    truth, exact_ms = timed_search(exact, xq, args.k, args.repeat)
+
+    def row(config: dict, found: np.ndarray, ms: float, bytes_per_vec: float) -> dict:
+        r = {
+            **config,
+            "ms_per_query": ms,
+            "bytes_per_vec": bytes_per_vec,
+            **{f"ann_{m}": v for m, v in score(found, truth).items()}
+        }
+        if labels is not None:
+            r.update({f"label_{m}": v for m, v in score(found, labels).items()})
+        return r
+
+    rows = [row(
+        {"kind": "flat", "m": None, "ef_construction": None, "ef_search": None, "build_s": 0.0},
+        truth, exact_ms, faiss.serialize_index(exact).nbytes / n
+    )]
+
+    for m, ef_construction in itertools.product(args.m, args.ef_construction):
+        t0 = time.perf_counter()
+        index = build_index(xb, kind=args.index_kind, m=m, ef_construction=ef_construction)
+        build_s = time.perf_counter() - t0
+        bytes_per_vec = faiss.serialize_index(index).nbytes / n
+
+        print(f"🏗️  {args.index_kind} M={m} efConstruction={ef_construction}: {build_s:.1f}s")
+
+        for ef_search in args.ef_search:
+            set_search_params(index, ef_search=ef_search)
+            found, ms = timed_search(index, xq, args.k, args.repeat)
+            rows.append(row(
+                {
+                    "kind": args.index_kind,
+                    "m": m,
+                    "ef_construction": ef_construction,
+                    "ef_search": ef_search,
+                    "build_s": build_s
+                },
+                found, ms, bytes_per_vec
+            ))
+
+    return rows
+
+
+def _print_rows(rows: List[dict], quality: str, front: List[dict], has_labels: bool):
+    header = (
+        f"{'':1} {'kind':<9} {'M':>4} {'efC':>5} {'efS':>5} {'ann R@k':>8} {'ann nDCG':>9}"
+    )
+    if has_labels:
+        header += f" {'R@k':>6} {'MRR':>6} {'nDCG':>6}"
+    header += f" {'ms/query':>9} {'bytes/vec':>10} {'build s':>8}"
+    print(header)
+
+    for r in sorted(rows, key=lambda r: (r["ms_per_query"], -r[quality])):
+        line = (
+            f"{'*' if r in front else '':1} {r['kind']:<9} {r['m'] or '-':>4} "
+            f"{r['ef_construction'] or '-':>5} {r['ef_search'] or '-':>5} "
+            f"{r['ann_recall']:>8.3f} {r['ann_ndcg']:>9.3f}"
+        )
+        if has_labels:
+            line += f" {r['label_recall']:>6.3f} {r['label_mrr']:>6.3f} {r['label_ndcg']:>6.3f}"
+        line += f" {r['ms_per_query']:>9.4f} {r['bytes_per_vec']:>10.1f} {r['build_s']:>8.1f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch retrieval evaluation and HNSW parameter sweep")
+    parser.add_argument("queries", type=Path, nargs="?", help="labeled queries JSONL")
+    parser.add_argument("--artifacts", type=Path, default=ARTIFACTS_DIR)
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="evaluate on N synthetic vectors instead of the artifacts")
+    parser.add_argument("--synthetic-queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-kind", default="hnsw", choices=("hnsw", "hnsw_sq8"))
+    parser.add_argument("--m", type=int, nargs="+", default=[16, 32, 48])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[100, 200, 400])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--repeat", type=int, default=3, help="searches per point; the fastest counts")
+    parser.add_argument("--embed-batch-rows", type=int, default=1024)
+    parser.add_argument("--out", type=Path, help="write all rows as JSON")
+    args = parser.parse_args()
+
+    if args.synthetic is None and args.queries is None:
+        parser.error("a labeled queries JSONL is required unless --synthetic is given")
+
+    print("\n===== RETRIEVAL EVALUATION =====\n")
+
+    if args.synthetic is not None:
+        xb, xq, labels = load_synthetic(args.synthetic, args.dim, args.synthetic_queries)
+    else:
+        xb, xq, labels = load_artifacts(args.artifacts, args.queries, args.embed_batch_rows)
+
+    print(f"{len(xb)} vectors, dim {xb.shape[1]}, {len(xq)} queries, k={args.k}\n")
+
+    rows = sweep(xb, xq, labels, args)
+
+    # Labels say what users need; the exact ranking is the ANN ceiling
+    quality = "label_ndcg" if labels is not None else "ann_recall"
+    front = pareto_front(rows, quality)
+
+    print(f"\n* = Pareto-optimal on {quality} / ms per query / bytes per vector\n")
+    _print_rows(rows, quality, front, labels is not None)
+
+    print(
+        "\nann = against exact flat inner-product top-k; R@k / MRR / nDCG = against labels."
+        "\nms/query = one multi-query search() divided by the number of queries."
+    )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"rows": rows, "pareto": front}, f, indent=2)
+        print(f"\n💾 Rows written to {args.out}")
+
+    print("\n===== END EVALUATION =====\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import shutil
+from pathlib import Path
+
+from RAG.backends import ONNX_DIR, require_optimum
+
+
+# model key → (Hugging Face id, optimum ORT class name)
+MODELS = {
+    "embed": ("sentence-transformers/all-MiniLM-L6-v2", "ORTModelForFeatureExtraction"),
+    "rerank": ("cross-encoder/ms-marco-MiniLM-L-6-v2", "ORTModelForSequenceClassification"),
+    "llm": ("google/flan-t5-base", "ORTModelForSeq2SeqLM"),
+}
+
+
+def quantize_dir(model_dir: Path):
+    """
+    Dynamic int8 quantization of every .onnx graph in model_dir
+    (encoder / decoder / decoder-with-past for seq2seq), in place.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    for onnx_path in sorted(model_dir.glob("*.onnx")):
+        tmp_path = onnx_path.with_suffix(".int8.onnx")
+        quantize_dynamic(
+            str(onnx_path),
+            str(tmp_path),
+            weight_type=QuantType.QInt8
+        )
+        tmp_path.replace(onnx_path)
+        print(f"   ↳ quantized {onnx_path.name}")
+
+
+def export_model(key: str, out_dir: Path, quantize: bool = True):
+    from transformers import AutoTokenizer
+
+    ort = require_optimum()
+    model_id, class_name = MODELS[key]
+    model_dir = out_dir / key
+
+    print(f"📤 Exporting {model_id} → {model_dir}")
+
+    tmp_dir = model_dir.with_name(model_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    model = getattr(ort, class_name).from_pretrained(model_id, export=True)
+    model.save_pretrained(tmp_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(tmp_dir)
+
+    if quantize:
+        quantize_dir(tmp_dir)
+
+    shutil.rmtree(model_dir, ignore_errors=True)
+    tmp_dir.rename(model_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export models for the onnx backend")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument("--out", type=Path, default=ONNX_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="keep fp32 graphs")
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    for key in args.models:
+        export_model(key, args.out, quantize=not args.no_quantize)
+
+    print(f"✅ ONNX models written to {args.out}")
+    print("   Select with RAG_BACKEND=onnx (or RAG_EMBED/RERANK/LLM_BACKEND)")
+
+
+if __name__ == "__main__":
+    main()
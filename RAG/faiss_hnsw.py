@@ -1,6 +1,41 @@
 import faiss
+import json
+import math
+import os
+import threading
+import time
+import weakref
 import numpy as np
-from typing import Optional
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple, Union
+
+
+INDEX_KINDS = ("flat", "hnsw", "hnsw_sq8", "ivfpq")
+
+# Below this many vectors an exact scan beats any graph or quantizer
+FLAT_MAX_VECTORS = 20_000
+
+# Rows used to train quantizers / PCA when building from batches
+TRAIN_SAMPLE_ROWS = 100_000
+
+# Memory the index may use inside the pod (4Gi limit, shared with models)
+INDEX_MEMORY_BUDGET_BYTES = int(
+    float(os.environ.get("RAG_INDEX_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024
+)
+
+# efSearch used when the index meta has no tuned value
+DEFAULT_EF_SEARCH = 50
+
+# efSearch values tried by tune_ef_search, ascending
+EF_SEARCH_CANDIDATES = (16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512)
+
+# Ground truth when the raw vectors are not at hand: the index itself
+# searched this exhaustively
+REFERENCE_EF_SEARCH = 1024
+
+# Held-out tuning queries: stored vectors moved this far (L2) off the data
+TUNE_QUERY_NOISE = 0.5
 
 
 def build_and_save_hnsw_index(
@@ -34,16 +69,467 @@ def build_and_save_hnsw_index(
     # Persist index if path is provided
     if index_path is not None:
         faiss.write_index(index, index_path)
+        save_index_meta(index_path, {
+            "kind": "hnsw",
+            "factory": f"HNSW{m}",
+            "dim": dim,
+            "m": m,
+            "ef_construction": ef_construction
+        })
 
     return index
 
 
-def load_hnsw_index(
+def _pq_subquantizers(dim: int) -> int:
+    """
+    Largest PQ sub-quantizer count giving >= 8 dims per sub-vector.
+    """
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _ivf_lists(n: int) -> int:
+    # ~4·sqrt(n) lists, keeping >= 39 training points per centroid
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def estimate_index_bytes(
+    kind: str,
+    n: int,
+    dim: int,
+    m: int = 32,
+    pca_dim: Optional[int] = None,
+    rescore: bool = False
+) -> int:
+    """
+    Rough resident size of an index of `kind` holding n vectors.
+    """
+    d = pca_dim or dim
+    graph = int(m * 2 * 4 * 1.1)  # level-0 links + upper levels
+
+    if kind == "flat":
+        size = n * d * 4
+    elif kind == "hnsw":
+        size = n * (d * 4 + graph)
+    elif kind == "hnsw_sq8":
+        size = n * (d + graph)
+    elif kind == "ivfpq":
+        size = n * (_pq_subquantizers(d) + 8) + _ivf_lists(n) * d * 4 + 256 * d * 4
+    else:
+        raise ValueError(f"Unknown index kind: {kind}")
+
+    if pca_dim:
+        size += dim * pca_dim * 4
+    if rescore:
+        size += n * dim * 4
+
+    return size
+
+
+def choose_index_kind(
+    n: int,
+    dim: int,
+    memory_budget_bytes: int = INDEX_MEMORY_BUDGET_BYTES,
+    m: int = 32,
+    pca_dim: Optional[int] = None,
+    rescore: bool = False
+) -> str:
+    """
+    Exact flat scan for small corpora; otherwise the most accurate
+    index type whose estimated size fits the memory budget.
+    """
+    if n <= FLAT_MAX_VECTORS:
+        return "flat"
+
+    for kind in ("hnsw", "hnsw_sq8", "ivfpq"):
+        if estimate_index_bytes(kind, n, dim, m, pca_dim, rescore) <= memory_budget_bytes:
+            return kind
+
+    return "ivfpq"
+
+
+def index_factory_string(
+    kind: str,
+    n: int,
+    dim: int,
+    m: int = 32,
+    pca_dim: Optional[int] = None,
+    rescore: bool = False
+) -> str:
+    d = pca_dim or dim
+
+    if kind == "flat":
+        body = "Flat"
+    elif kind == "hnsw":
+        body = f"HNSW{m}"
+    elif kind == "hnsw_sq8":
+        body = f"HNSW{m}_SQ8"
+    elif kind == "ivfpq":
+        body = f"IVF{_ivf_lists(n)},PQ{_pq_subquantizers(d)}"
+    else:
+        raise ValueError(f"Unknown index kind: {kind}")
+
+    # Renormalize after PCA so inner product stays a cosine
+    prefix = f"PCA{pca_dim},L2norm," if pca_dim else ""
+    # Exact re-scoring of the top k_factor·k candidates with full vectors
+    suffix = ",RFlat" if rescore else ""
+
+    return prefix + body + suffix
+
+
+def _hnsw_of(index: faiss.Index):
+    """
+    The HNSW structure inside (possibly wrapped) index, or None.
+    """
+    index = faiss.downcast_index(index)
+    while True:
+        if hasattr(index, "hnsw"):
+            return index.hnsw
+        inner = getattr(index, "base_index", None) or getattr(index, "index", None)
+        if inner is None:
+            return None
+        index = faiss.downcast_index(inner)
+
+
+def set_search_params(
+    index: faiss.Index,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    k_factor: Optional[int] = None
+) -> faiss.Index:
+    """
+    Apply search-time knobs that exist on this index; others are ignored,
+    so callers do not need to know which index type was built.
+    """
+    space = faiss.ParameterSpace()
+
+    for name, value in (
+        ("efSearch", ef_search),
+        ("nprobe", nprobe),
+        ("k_factor_rf", k_factor)
+    ):
+        if value is None:
+            continue
+        try:
+            space.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass
+
+    return index
+
+
+def get_ef_search(index: faiss.Index) -> Optional[int]:
+    """
+    Current efSearch, or None if the index has no HNSW graph.
+    """
+    hnsw = _hnsw_of(index)
+    return hnsw.efSearch if hnsw is not None else None
+
+
+def _ef_params(index: faiss.Index, ef_search: int):
+    """
+    Per-call search parameters carrying ef_search down to the HNSW graph
+    of (possibly PCA-wrapped) index, or None if no such chain exists
+    (no graph, or a refine wrapper, which has no parameter class).
+    """
+    index = faiss.downcast_index(index)
+    if hasattr(index, "hnsw"):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = ef_search
+        return params
+    if isinstance(index, faiss.IndexPreTransform):
+        inner = _ef_params(index.index, ef_search)
+        if inner is None:
+            return None
+        params = faiss.SearchParametersPreTransform()
+        params.index_params = inner
+        # The SWIG struct holds a raw pointer: keep the Python object alive
+        params.inner = inner
+        return params
+    return None
+
+
+_per_call_ef = None
+
+
+def per_call_ef_search() -> bool:
+    """
+    Whether this faiss build applies SearchParametersHNSW passed to
+    index.search (some builds accept the argument and ignore it).
+    Probed once on a small random graph.
+    """
+    global _per_call_ef
+    if _per_call_ef is None:
+        rng = np.random.default_rng(0)
+        xb = rng.standard_normal((2000, 16)).astype("float32")
+        xq = rng.standard_normal((20, 16)).astype("float32")
+
+        probe = faiss.IndexHNSWFlat(16, 4)
+        probe.hnsw.efSearch = 10
+        probe.add(xb)
+
+        _, base = probe.search(xq, 10)
+        _, wide = probe.search(xq, 10, params=_ef_params(probe, 512))
+        _per_call_ef = not np.array_equal(base, wide)
+
+    return _per_call_ef
+
+
+class _SharedExclusive:
+    """
+    Many shared holders or one exclusive holder; waiting exclusive
+    holders block new shared ones so they are not starved.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+        self._waiting = 0
+
+    @contextmanager
+    def shared(self):
+        with self._cond:
+            while self._exclusive or self._waiting:
+                self._cond.wait()
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._shared -= 1
+                if not self._shared:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._waiting += 1
+            while self._exclusive or self._shared:
+                self._cond.wait()
+            self._waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
+
+
+# Indexes whose efSearch can only be raised by mutating the index itself
+# (no per-call parameter path): searches and escalations on them are
+# ordered by a shared / exclusive guard
+_ef_guards = weakref.WeakKeyDictionary()
+_ef_guards_lock = threading.Lock()
+
+
+def _ef_guard(index: faiss.Index) -> Optional[_SharedExclusive]:
+    with _ef_guards_lock:
+        if index not in _ef_guards:
+            mutable_only = isinstance(index, faiss.Index) and _hnsw_of(index) is not None and (
+                not per_call_ef_search() or _ef_params(index, 1) is None
+            )
+            _ef_guards[index] = _SharedExclusive() if mutable_only else None
+        return _ef_guards[index]
+
+
+def search_index(index: faiss.Index, xq: np.ndarray, k: int):
+    """
+    index.search for an index that search_with_ef may be searching
+    concurrently. Only indexes that fall back to mutating efSearch
+    take a (shared) lock.
+    """
+    guard = _ef_guard(index)
+    if guard is None:
+        return index.search(xq, k)
+    with guard.shared():
+        return index.search(xq, k)
+
+
+def search_with_ef(index: faiss.Index, xq: np.ndarray, k: int, ef_search: int):
+    """
+    Search at ef_search for this call only; the index's own efSearch,
+    seen by every other search, is unchanged. Uses per-call parameters
+    where the build and index support them, otherwise raises and
+    restores efSearch while no other search_index call is running.
+    """
+    guard = _ef_guard(index)
+    if guard is None:
+        return index.search(xq, k, params=_ef_params(index, ef_search))
+
+    with guard.exclusive():
+        base_ef = get_ef_search(index)
+        set_search_params(index, ef_search=ef_search)
+        try:
+            return index.search(xq, k)
+        finally:
+            set_search_params(index, ef_search=base_ef)
+
+
+def _meta_path(index_path: str) -> Path:
+    return Path(f"{index_path}.meta.json")
+
+
+def load_index_meta(index_path: str) -> dict:
+    path = _meta_path(index_path)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_index_meta(index_path: str, meta: dict):
+    with open(_meta_path(index_path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def build_index(
+    embeddings: np.ndarray,
+    kind: str = "auto",
+    index_path: Optional[str] = None,
+    m: int = 32,
+    ef_construction: int = 200,
+    pca_dim: Optional[int] = None,
+    rescore_k_factor: int = 0,
+    memory_budget_bytes: int = INDEX_MEMORY_BUDGET_BYTES
+) -> faiss.Index:
+    """
+    Build a cosine-similarity index of the requested kind
+    ("auto", "flat", "hnsw", "hnsw_sq8", "ivfpq").
+
+    pca_dim reduces dimensionality before indexing; rescore_k_factor > 0
+    keeps full vectors and re-scores the top k_factor·k candidates exactly.
+    Assumes embeddings are L2-normalized.
+    """
+
+    if embeddings.ndim != 2:
+        raise ValueError("embeddings must be a 2D numpy array")
+
+    n, dim = embeddings.shape
+
+    index, meta = create_index(
+        n, dim, kind, m, ef_construction, pca_dim, rescore_k_factor, memory_budget_bytes
+    )
+
+    if not index.is_trained:
+        index.train(embeddings)
+
+    index.add(embeddings)
+
+    if index_path is not None:
+        faiss.write_index(index, index_path)
+        save_index_meta(index_path, meta)
+
+    return index
+
+
+def build_index_streaming(
+    batches: Callable[[], Iterable[np.ndarray]],
+    n: int,
+    train_sample: Callable[[int], np.ndarray],
+    kind: str = "auto",
+    index_path: Optional[str] = None,
+    m: int = 32,
+    ef_construction: int = 200,
+    pca_dim: Optional[int] = None,
+    rescore_k_factor: int = 0,
+    memory_budget_bytes: int = INDEX_MEMORY_BUDGET_BYTES
+) -> faiss.Index:
+    """
+    Build the same index as build_index without ever holding all n
+    vectors in one matrix.
+
+    batches() must return a fresh iterator over the n vectors in id
+    order each time it is called; train_sample(rows) returns up to
+    `rows` of them. Flat / HNSW indexes are filled in one pass as
+    batches arrive. Kinds that need training are filled in a second
+    pass, after training on the sample (the first pass only has to
+    persist the vectors).
+    """
+
+    it = iter(batches())
+    first = next(it, None)
+    if first is None:
+        raise ValueError("no vectors to index")
+
+    index, meta = create_index(
+        n, first.shape[1], kind, m, ef_construction, pca_dim, rescore_k_factor,
+        memory_budget_bytes
+    )
+
+    if index.is_trained:
+        index.add(first)
+        for batch in it:
+            index.add(batch)
+    else:
+        for _ in it:
+            pass
+        index.train(train_sample(TRAIN_SAMPLE_ROWS))
+        for batch in batches():
+            index.add(batch)
+
+    if index_path is not None:
+        faiss.write_index(index, index_path)
+        save_index_meta(index_path, meta)
+
+    return index
+
+
+def create_index(
+    n: int,
+    dim: int,
+    kind: str = "auto",
+    m: int = 32,
+    ef_construction: int = 200,
+    pca_dim: Optional[int] = None,
+    rescore_k_factor: int = 0,
+    memory_budget_bytes: int = INDEX_MEMORY_BUDGET_BYTES
+) -> Tuple[faiss.Index, dict]:
+    """
+    Empty index sized for n vectors, plus the meta build_index records.
+    Check index.is_trained: quantized / PCA kinds must be trained on a
+    sample before vectors are added, so they cannot be filled in a
+    single streaming pass.
+    """
+
+    rescore = rescore_k_factor > 0
+
+    if kind == "auto":
+        kind = choose_index_kind(n, dim, memory_budget_bytes, m, pca_dim, rescore)
+
+    factory = index_factory_string(kind, n, dim, m, pca_dim, rescore)
+    index = faiss.index_factory(dim, factory, faiss.METRIC_INNER_PRODUCT)
+
+    hnsw = _hnsw_of(index)
+    if hnsw is not None:
+        hnsw.efConstruction = ef_construction
+
+    if rescore:
+        set_search_params(index, k_factor=rescore_k_factor)
+
+    return index, {
+        "kind": kind,
+        "factory": factory,
+        "dim": dim,
+        "m": m,
+        "ef_construction": ef_construction,
+        "pca_dim": pca_dim,
+        "rescore_k_factor": rescore_k_factor
+    }
+
+
+def load_index(
     index_path: str,
-    ef_search: int = 50
-) -> faiss.IndexHNSWFlat:
+    ef_search: Optional[int] = None,
+    nprobe: int = 16
+) -> faiss.Index:
     """
-    Load a FAISS HNSW index from disk and configure search parameters.
+    Load any index written by build_index (or build_and_save_hnsw_index)
+    and configure its search parameters. Without ef_search the tuned
+    value from the index meta is used (DEFAULT_EF_SEARCH if untuned).
     """
 
     if not index_path:
@@ -51,7 +537,194 @@ def load_hnsw_index(
 
     index = faiss.read_index(index_path)
 
+    meta = load_index_meta(index_path)
+
     # Search-time accuracy / latency tradeoff
-    index.hnsw.efSearch = ef_search
+    set_search_params(
+        index,
+        ef_search=ef_search or meta.get("ef_search", DEFAULT_EF_SEARCH),
+        nprobe=nprobe,
+        k_factor=meta.get("rescore_k_factor") or None
+    )
+
+    return index
+
+
+def load_hnsw_index(
+    index_path: str,
+    ef_search: Optional[int] = None
+) -> faiss.IndexHNSWFlat:
+    """
+    Load a FAISS HNSW index from disk and configure search parameters.
+    """
+
+    return load_index(index_path, ef_search=ef_search)
+
+
+def append_to_index(
+    index_path: str,
+    embeddings: Union[np.ndarray, Iterable[np.ndarray]],
+    expected_ntotal: Optional[int] = None
+) -> faiss.Index:
+    """
+    Add vectors (one matrix or an iterable of batches) to a persisted
+    index in place. New vectors get the next sequential ids, so ids of
+    existing vectors are unchanged.
+    """
+
+    index = faiss.read_index(index_path)
+
+    if expected_ntotal is not None and index.ntotal != expected_ntotal:
+        raise ValueError(
+            f"index has {index.ntotal} vectors, expected {expected_ntotal}"
+        )
+
+    batches = [embeddings] if isinstance(embeddings, np.ndarray) else embeddings
+
+    added = 0
+    for batch in batches:
+        if batch.shape[0]:
+            index.add(batch)
+            added += batch.shape[0]
+
+    if added:
+        faiss.write_index(index, index_path)
 
     return index
+
+
+def tuning_queries(
+    vectors: np.ndarray,
+    n: int = 200,
+    noise: float = TUNE_QUERY_NOISE,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Held-out-style queries: random stored vectors pushed off the data by
+    `noise` and re-normalized, so their neighbours are not themselves.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), size=min(n, len(vectors)), replace=False)
+    x = np.asarray(vectors[np.sort(picks)], dtype="float32")
+    x = x + rng.standard_normal(x.shape).astype("float32") * (noise / np.sqrt(x.shape[1]))
+    faiss.normalize_L2(x)
+    return x
+
+
+def sample_stored_vectors(index: faiss.Index, n: int, seed: int = 0) -> Optional[np.ndarray]:
+    """
+    Reconstruct up to n stored vectors (for tuning at load time, when
+    the embeddings are not at hand). None if the index cannot
+    reconstruct, e.g. PCA-reduced kinds.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.sort(rng.choice(index.ntotal, size=min(n, index.ntotal), replace=False))
+    try:
+        return np.stack([index.reconstruct(int(i)) for i in ids])
+    except RuntimeError:
+        return None
+
+
+def tune_ef_search(
+    index: faiss.Index,
+    queries: np.ndarray,
+    k: int = 10,
+    target_recall: Optional[float] = 0.95,
+    target_p95_ms: Optional[float] = None,
+    vectors: Optional[np.ndarray] = None,
+    candidates: Iterable[int] = EF_SEARCH_CANDIDATES
+) -> Optional[dict]:
+    """
+    Pick efSearch for this index from measured recall@k and single-query
+    p95 latency on `queries`, and apply it.
+
+    With a recall target the smallest efSearch reaching it is chosen;
+    with only a latency target, the largest efSearch within it. The
+    latency target is a cap: if both cannot be met, the best recall under
+    the cap wins and "met" is False. Recall is against exact search over
+    `vectors` when given, else against efSearch=REFERENCE_EF_SEARCH.
+    Returns None for indexes without an HNSW graph.
+    """
+    if _hnsw_of(index) is None:
+        return None
+    if target_recall is None and target_p95_ms is None:
+        raise ValueError("need target_recall and/or target_p95_ms")
+
+    queries = np.ascontiguousarray(queries, dtype="float32")
+
+    if vectors is not None:
+        exact = faiss.IndexFlatIP(queries.shape[1])
+        exact.add(np.ascontiguousarray(vectors, dtype="float32"))
+        _, truth = exact.search(queries, k)
+        reference = "exact"
+    else:
+        set_search_params(index, ef_search=REFERENCE_EF_SEARCH)
+        _, truth = index.search(queries, k)
+        reference = f"efSearch={REFERENCE_EF_SEARCH}"
+
+    curve = []
+    for ef in sorted(candidates):
+        set_search_params(index, ef_search=ef)
+        _, found = index.search(queries, k)
+        hits = (found[:, :, None] == truth[:, None, :]).any(axis=2) & (found >= 0)
+
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            index.search(q[None, :], k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        curve.append({
+            "ef_search": ef,
+            "recall": float(hits.sum(axis=1).mean() / k),
+            "p95_ms": float(np.percentile(latencies, 95))
+        })
+
+        point = curve[-1]
+        # Larger efSearch is only slower: stop once the answer is known
+        if target_p95_ms is not None and point["p95_ms"] > target_p95_ms:
+            break
+        if target_p95_ms is None and point["recall"] >= target_recall:
+            break
+
+    within = [c for c in curve if target_p95_ms is None or c["p95_ms"] <= target_p95_ms]
+    meets = [c for c in within if target_recall is None or c["recall"] >= target_recall]
+
+    if meets:
+        chosen = meets[0] if target_recall is not None else meets[-1]
+    elif within:
+        chosen = max(within, key=lambda c: c["recall"])
+    else:
+        chosen = curve[0]
+
+    set_search_params(index, ef_search=chosen["ef_search"])
+
+    return {
+        **chosen,
+        "k": k,
+        "target_recall": target_recall,
+        "target_p95_ms": target_p95_ms,
+        "met": bool(meets),
+        "queries": len(queries),
+        "reference": reference,
+        "curve": curve
+    }
+
+
+def tune_and_record(
+    index: faiss.Index,
+    index_path: str,
+    queries: np.ndarray,
+    **kwargs
+) -> Optional[dict]:
+    """
+    tune_ef_search, then store the result in the index meta so
+    load_index picks it up.
+    """
+    tuning = tune_ef_search(index, queries, **kwargs)
+    if tuning is not None:
+        meta = load_index_meta(index_path)
+        meta["ef_search"] = tuning["ef_search"]
+        meta["ef_search_tuning"] = tuning
+        save_index_meta(index_path, meta)
+    return tuning
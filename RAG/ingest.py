@@ -1,62 +1,209 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import Counter
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image
+import hashlib
 import io
 import json
+import os
 
 
-def extract_text_from_pdf(pdf_path: Path) -> dict:
+# Pages per extraction task in parallel mode. Large PDFs are split into
+# several tasks of this size so one big manual does not pin one core.
+PAGES_PER_TASK = 16
+
+# OCR skip heuristics (set to 0 to OCR everything)
+OCR_MIN_IMAGE_SIDE = int(os.environ.get("RAG_OCR_MIN_IMAGE_SIDE", "32"))
+OCR_MIN_ENTROPY = float(os.environ.get("RAG_OCR_MIN_ENTROPY", "1.0"))
+OCR_SKIP_PAGE_TEXT_CHARS = int(os.environ.get("RAG_OCR_SKIP_PAGE_TEXT_CHARS", "2000"))
+
+# Threads issuing OCR calls (pytesseract runs tesseract as a subprocess)
+OCR_WORKERS = int(os.environ.get("RAG_OCR_WORKERS", str(os.cpu_count() or 1)))
+
+OCR_STAT_KEYS = (
+    "images",
+    "skipped_small",
+    "skipped_low_entropy",
+    "skipped_page_text",
+    "deduplicated",
+    "cache_hits",
+    "ocr_calls"
+)
+
+
+def _ocr_settings(**overrides) -> dict:
+    settings = {
+        "min_image_side": OCR_MIN_IMAGE_SIDE,
+        "min_entropy": OCR_MIN_ENTROPY,
+        "skip_page_text_chars": OCR_SKIP_PAGE_TEXT_CHARS
+    }
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    return settings
+
+
+def _extract_page_range(
+    pdf_path,
+    start: int = 0,
+    end: int | None = None,
+    ocr_settings: dict | None = None
+) -> tuple[list[tuple], dict, Counter]:
+    """
+    Extract pages [start, end) of a PDF as ordered (page, type, payload)
+    pieces. For text pieces the payload is the block text; for image
+    pieces it is the image hash, resolved to OCR text after the whole
+    corpus is scanned. Also returns {hash: image bytes} for the images
+    that passed the skip heuristics, and skip counters.
+    """
+    settings = ocr_settings or _ocr_settings()
+
     doc = fitz.open(pdf_path)
+    if end is None:
+        end = doc.page_count
 
-    full_text = []
-    blocks = []
-    cursor = 0  # character offset
+    pieces = []
+    images_to_ocr = {}
+    stats = Counter()
+    seen_xrefs = {}  # xref → image hash, or None if skipped
 
-    for page_idx, page in enumerate(doc):
+    for page_idx in range(start, end):
+        page = doc[page_idx]
         page_num = page_idx + 1
 
         # -------- native text --------
         page_text = page.get_text().replace("\x00", " ").strip()
         if page_text:
-            block_text = f"\n\n[PAGE {page_num}]\n{page_text}"
-            start = cursor
-            full_text.append(block_text)
-            cursor += len(block_text)
-
-            blocks.append({
-                "start": start,
-                "end": cursor,
-                "page": page_num,
-                "type": "text"
-            })
-
-        # -------- images (OCR ALL) --------
+            pieces.append((page_num, "text", f"\n\n[PAGE {page_num}]\n{page_text}"))
+
+        # -------- images (OCR) --------
         images = page.get_images(full=True)
-        for img_idx, img in enumerate(images):
+        stats["images"] += len(images)
+
+        skip_chars = settings["skip_page_text_chars"]
+        if skip_chars and len(page_text) >= skip_chars:
+            stats["skipped_page_text"] += len(images)
+            continue
+
+        for img in images:
             xref = img[0]
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
 
-            image = Image.open(io.BytesIO(image_bytes))
-            ocr_text = pytesseract.image_to_string(image).strip()
+            if xref not in seen_xrefs:
+                seen_xrefs[xref] = _screen_image(doc, xref, settings, images_to_ocr, stats)
 
-            if not ocr_text:
+            image_hash = seen_xrefs[xref]
+            if image_hash is not None:
+                pieces.append((page_num, "image", image_hash))
+
+    doc.close()
+
+    return pieces, images_to_ocr, stats
+
+
+def _screen_image(doc, xref, settings, images_to_ocr, stats):
+    """
+    Apply size/entropy skip heuristics; returns the image hash or None.
+    """
+    base_image = doc.extract_image(xref)
+
+    min_side = settings["min_image_side"]
+    if min_side and min(base_image["width"], base_image["height"]) < min_side:
+        stats["skipped_small"] += 1
+        return None
+
+    image_bytes = base_image["image"]
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+
+    if image_hash in images_to_ocr:
+        return image_hash
+
+    min_entropy = settings["min_entropy"]
+    if min_entropy:
+        image = Image.open(io.BytesIO(image_bytes))
+        if image.convert("L").entropy() < min_entropy:
+            stats["skipped_low_entropy"] += 1
+            return None
+
+    images_to_ocr[image_hash] = image_bytes
+    return image_hash
+
+
+def _ocr_image(image_bytes: bytes) -> str:
+    image = Image.open(io.BytesIO(image_bytes))
+    return pytesseract.image_to_string(image).strip()
+
+
+def _ocr_cache_path(cache_dir: Path, image_hash: str) -> Path:
+    return cache_dir / image_hash[:2] / f"{image_hash}.txt"
+
+
+def run_ocr(
+    images: dict,
+    cache_dir: Path | None = None,
+    workers: int = OCR_WORKERS,
+    stats: Counter | None = None
+) -> dict:
+    """
+    OCR each unique image once. Results are looked up in / written to a
+    content-addressed on-disk cache (one file per image hash), and the
+    remaining images are OCR'd on a thread pool.
+    """
+    stats = stats if stats is not None else Counter()
+    results = {}
+    todo = []
+
+    for image_hash in images:
+        if cache_dir is not None:
+            cached = _ocr_cache_path(cache_dir, image_hash)
+            if cached.exists():
+                results[image_hash] = cached.read_text(encoding="utf-8")
+                stats["cache_hits"] += 1
                 continue
+        todo.append(image_hash)
 
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            texts = list(pool.map(_ocr_image, (images[h] for h in todo)))
+
+        stats["ocr_calls"] += len(todo)
+
+        for image_hash, text in zip(todo, texts):
+            results[image_hash] = text
+
+            if cache_dir is not None:
+                path = _ocr_cache_path(cache_dir, image_hash)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(text, encoding="utf-8")
+                tmp.replace(path)
+
+    return results
+
+
+def _assemble(pieces: list[tuple], ocr_results: dict) -> dict:
+    full_text = []
+    blocks = []
+    cursor = 0  # character offset
+
+    for page_num, block_type, payload in pieces:
+        if block_type == "image":
+            ocr_text = ocr_results.get(payload, "")
+            if not ocr_text:
+                continue
             block_text = f"\n\n[IMAGE | PAGE {page_num}]\n{ocr_text}"
-            start = cursor
-            full_text.append(block_text)
-            cursor += len(block_text)
+        else:
+            block_text = payload
 
-            blocks.append({
-                "start": start,
-                "end": cursor,
-                "page": page_num,
-                "type": "image"
-            })
+        start = cursor
+        full_text.append(block_text)
+        cursor += len(block_text)
 
-    doc.close()
+        blocks.append({
+            "start": start,
+            "end": cursor,
+            "page": page_num,
+            "type": block_type
+        })
 
     return {
         "text": "".join(full_text),
@@ -64,13 +211,115 @@ def extract_text_from_pdf(pdf_path: Path) -> dict:
     }
 
 
-def load_all_pdfs(pdf_dir: Path, metadata_dir: Path) -> list[dict]:
+def _count_duplicates(pieces_per_doc: list[list[tuple]], unique_images: int) -> int:
+    image_refs = sum(
+        1
+        for pieces in pieces_per_doc
+        for _, block_type, _ in pieces
+        if block_type == "image"
+    )
+    return image_refs - unique_images
+
+
+def extract_text_from_pdf(
+    pdf_path: Path,
+    ocr_cache_dir: Path | None = None
+) -> dict:
+    return extract_pdfs([pdf_path], ocr_cache_dir=ocr_cache_dir)[0]
+
+
+def _page_count(pdf_path: Path) -> int:
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def extract_pdfs(
+    pdf_paths: list[Path],
+    workers: int = 1,
+    pages_per_task: int = PAGES_PER_TASK,
+    ocr_cache_dir: Path | None = None,
+    ocr_workers: int = OCR_WORKERS,
+    ocr_settings: dict | None = None,
+    stats: Counter | None = None
+) -> list[dict]:
+    """
+    Extract several PDFs, optionally on a process pool.
+
+    With workers > 1 every PDF is split into page ranges of
+    `pages_per_task` pages and the ranges are spread across processes.
+    Results are stitched back in (document, page) order, so text, block
+    offsets and page numbers are identical to the serial path.
+
+    OCR runs after all pages are scanned, once per unique image in the
+    whole batch. Pass a Counter as `stats` to receive skip/dedup/cache
+    counters (see OCR_STAT_KEYS).
+    """
+    settings = ocr_settings or _ocr_settings()
+    stats = stats if stats is not None else Counter()
+
+    pieces_per_doc = [[] for _ in pdf_paths]
+    images = {}
+
+    def collect(doc_idx, result):
+        pieces, doc_images, doc_stats = result
+        pieces_per_doc[doc_idx].extend(pieces)
+        images.update(doc_images)
+        stats.update(doc_stats)
+
+    if workers <= 1:
+        for doc_idx, pdf_path in enumerate(pdf_paths):
+            collect(doc_idx, _extract_page_range(pdf_path, ocr_settings=settings))
+    else:
+        tasks = []
+        for doc_idx, pdf_path in enumerate(pdf_paths):
+            n_pages = _page_count(pdf_path)
+            for start in range(0, n_pages, pages_per_task):
+                tasks.append((doc_idx, start, min(start + pages_per_task, n_pages)))
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _extract_page_range,
+                    str(pdf_paths[doc_idx]),
+                    start,
+                    end,
+                    settings
+                )
+                for doc_idx, start, end in tasks
+            ]
+            # Consume in submission order → deterministic output
+            for (doc_idx, _, _), future in zip(tasks, futures):
+                collect(doc_idx, future.result())
+
+    stats["deduplicated"] += _count_duplicates(pieces_per_doc, len(images))
+
+    ocr_results = run_ocr(
+        images,
+        cache_dir=ocr_cache_dir,
+        workers=ocr_workers,
+        stats=stats
+    )
+
+    return [_assemble(pieces, ocr_results) for pieces in pieces_per_doc]
+
+
+def format_ocr_stats(stats: Counter) -> str:
+    return ", ".join(f"{key}={stats.get(key, 0)}" for key in OCR_STAT_KEYS)
+
+
+def load_all_pdfs(
+    pdf_dir: Path,
+    metadata_dir: Path,
+    workers: int = 1,
+    ocr_cache_dir: Path | None = None
+) -> list[dict]:
     metadata_dir.mkdir(parents=True, exist_ok=True)
     docs = []
 
-    for pdf in sorted(pdf_dir.glob("*.pdf")):
-        extracted = extract_text_from_pdf(pdf)
+    pdfs = sorted(pdf_dir.glob("*.pdf"))
+    extracted_all = extract_pdfs(pdfs, workers=workers, ocr_cache_dir=ocr_cache_dir)
 
+    for pdf, extracted in zip(pdfs, extracted_all):
         doc = {
             "doc_id": pdf.stem,
             "source_path": str(pdf),
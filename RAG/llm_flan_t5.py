@@ -1,25 +1,47 @@
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
+from typing import Iterator, Optional
+import logging
+import threading
+
+import numpy as np
+
+from RAG import models
+from RAG.backends import backend_for, load_onnx_seq2seq, quantize_int8
+from RAG.context_packer import pack_prompt
+from RAG.metrics import OUTPUT_TOKENS, PROMPT_TOKENS
 
 MODEL_NAME = "google/flan-t5-base"
 
-_tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-_model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+# flan-t5 encoder input limit; prompts are packed to fit it
+MAX_INPUT_TOKENS = 512
 
+BACKEND = backend_for("LLM")
 
-def generate_answer(
-    query: str,
-    contexts: list[str],
-    max_new_tokens: int = 200
-) -> str:
+logger = logging.getLogger(__name__)
+
+
+def _load():
     """
-    Generate an answer using retrieved context chunks.
-    
+    (tokenizer, model). torch/transformers are imported here, so importing
+    this module stays cheap until the first generation.
     """
+    if BACKEND == "onnx":
+        return load_onnx_seq2seq("LLM")
+
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+    if BACKEND == "int8":
+        quantize_int8(model)
+    return tokenizer, model
+
+
+# Loaded on first generation or models.warm_up(["llm"])
+models.register("llm", _load)
 
-    context_text = "\n\n".join(contexts)
 
-    prompt = f"""
+def _build_prompt(query: str, context_text: str) -> str:
+    return f"""
 Answer the question using ONLY the context below.
 
 
@@ -31,8 +53,104 @@ Question:
 
 Answer:
 """
-    print(context_text)
-    inputs = _tokenizer(
+
+
+def count_tokens(texts: list[str]) -> list[int]:
+    """
+    flan-t5 token count of each text, including the end-of-sequence token.
+    """
+    tokenizer, _ = models.get("llm")
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=True)["input_ids"]]
+
+
+_pack_lock = threading.Lock()
+_pack_totals = {
+    "requests": 0,
+    "prompt_tokens": 0,
+    "tokens_saved": 0,
+    "naive_truncated": 0,
+    "overlap_chars_removed": 0
+}
+
+
+def _packed_prompt(
+    query: str,
+    contexts: list[str],
+    q_vec: Optional[np.ndarray] = None
+) -> tuple[str, str]:
+    """
+    (prompt, context_text) packed to MAX_INPUT_TOKENS; see RAG.context_packer.
+    """
+    from RAG.embeddings_free import embed_texts
+
+    query, context_text, stats = pack_prompt(
+        query,
+        q_vec,
+        contexts,
+        build_prompt=_build_prompt,
+        count_tokens=count_tokens,
+        embed=embed_texts,
+        max_tokens=MAX_INPUT_TOKENS
+    )
+
+    with _pack_lock:
+        _pack_totals["requests"] += 1
+        _pack_totals["prompt_tokens"] += stats["prompt_tokens"]
+        _pack_totals["tokens_saved"] += stats["tokens_saved"]
+        _pack_totals["naive_truncated"] += stats["naive_truncated"]
+        _pack_totals["overlap_chars_removed"] += stats["overlap_chars_removed"]
+
+    PROMPT_TOKENS.observe(stats["prompt_tokens"])
+    logger.debug(
+        "Prompt %d tokens (naive %d, saved %d, kept %d/%d sentences)",
+        stats["prompt_tokens"], stats["naive_prompt_tokens"], stats["tokens_saved"],
+        stats["sentences_kept"], stats["sentences_total"]
+    )
+
+    return _build_prompt(query, context_text), context_text
+
+
+def _observe_output(tokenizer, outputs):
+    """
+    Record decoded tokens per answer; the decoder start token is the
+    pad token in T5, so non-pad ids are exactly the generated ones.
+    """
+    for row in outputs:
+        OUTPUT_TOKENS.observe(int((row != tokenizer.pad_token_id).sum()))
+
+
+def packing_stats() -> dict:
+    """
+    Prompt-packing totals since start-up.
+    """
+    with _pack_lock:
+        totals = dict(_pack_totals)
+    n = max(totals["requests"], 1)
+    return {
+        **totals,
+        "avg_prompt_tokens": totals["prompt_tokens"] / n,
+        "avg_tokens_saved": totals["tokens_saved"] / n
+    }
+
+
+def generate_answer(
+    query: str,
+    contexts: list[str],
+    max_new_tokens: int = 200,
+    q_vec: Optional[np.ndarray] = None
+) -> str:
+    """
+    Generate an answer using retrieved context chunks.
+    
+    """
+
+    import torch
+
+    tokenizer, model = models.get("llm")
+
+    prompt, context_text = _packed_prompt(query, contexts, q_vec)
+    logger.debug("Context:\n%s", context_text)
+    inputs = tokenizer(
         prompt,
         return_tensors="pt",
         truncation=True,
@@ -40,11 +158,175 @@ Answer:
     )
 
     with torch.no_grad():
-        outputs = _model.generate(
+        outputs = model.generate(
             **inputs,
             max_new_tokens=max_new_tokens,
             temperature=0.0
         )
 
-    answer = _tokenizer.decode(outputs[0], skip_special_tokens=True)
+    _observe_output(tokenizer, outputs)
+    answer = tokenizer.decode(outputs[0], skip_special_tokens=True)
     return answer.strip()
+
+
+def generate_answers(
+    requests: list[tuple],
+    max_new_tokens: int = 200
+) -> list[str]:
+    """
+    Generate answers for several (query, contexts[, q_vec]) requests with
+    one padded generate() call. Returns answers in request order.
+    """
+
+    if not requests:
+        return []
+
+    prompts = [
+        _packed_prompt(r[0], r[1], r[2] if len(r) > 2 else None)[0]
+        for r in requests
+    ]
+    return _generate_prompts(prompts, max_new_tokens)
+
+
+def generate_answers_grouped(
+    requests: list[tuple],
+    batch_size: int = 16,
+    max_new_tokens: int = 200
+) -> list[str]:
+    """
+    generate_answers for many requests: prompts are packed, sorted by
+    token length and generated batch_size at a time, so each padded
+    batch holds prompts of similar length. Returns answers in request order.
+    """
+
+    if not requests:
+        return []
+
+    prompts = [
+        _packed_prompt(r[0], r[1], r[2] if len(r) > 2 else None)[0]
+        for r in requests
+    ]
+    lengths = count_tokens(prompts)
+    order = sorted(range(len(prompts)), key=lambda i: lengths[i])
+
+    answers: list[Optional[str]] = [None] * len(prompts)
+    for start in range(0, len(order), batch_size):
+        group = order[start:start + batch_size]
+        for i, answer in zip(group, _generate_prompts([prompts[i] for i in group], max_new_tokens)):
+            answers[i] = answer
+    return answers
+
+
+def _generate_prompts(prompts: list[str], max_new_tokens: int) -> list[str]:
+    """
+    One padded generate() call over already packed prompts.
+    """
+
+    import torch
+
+    tokenizer, model = models.get("llm")
+
+    inputs = tokenizer(
+        prompts,
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
+        max_length=512
+    )
+
+    with torch.no_grad():
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            temperature=0.0
+        )
+
+    _observe_output(tokenizer, outputs)
+    answers = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+    return [a.strip() for a in answers]
+
+
+class _StopOnEvent:
+    """
+    Stopping criterion: ends generate() at the next decoding step once
+    the event is set.
+    """
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        return torch.full(
+            (input_ids.shape[0],),
+            self.event.is_set(),
+            dtype=torch.bool,
+            device=input_ids.device
+        )
+
+
+def stream_answer(
+    query: str,
+    contexts: list[str],
+    max_new_tokens: int = 200,
+    stop_event: Optional[threading.Event] = None,
+    q_vec: Optional[np.ndarray] = None
+) -> Iterator[str]:
+    """
+    Generate an answer and yield text pieces as they are decoded.
+
+    Decoding runs on a background thread. Setting stop_event, or closing
+    the generator early, stops decoding at the next token so an
+    abandoned request does not keep burning CPU.
+    """
+
+    import torch
+    from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+    tokenizer, model = models.get("llm")
+    stop_event = stop_event or threading.Event()
+
+    prompt, _ = _packed_prompt(query, contexts, q_vec)
+    inputs = tokenizer(
+        prompt,
+        return_tensors="pt",
+        truncation=True,
+        max_length=512
+    )
+
+    # skip_prompt drops the decoder start token of the seq2seq output
+    streamer = TextIteratorStreamer(
+        tokenizer,
+        skip_prompt=True,
+        skip_special_tokens=True
+    )
+    errors = []
+
+    def _generate():
+        try:
+            with torch.no_grad():
+                outputs = model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    temperature=0.0,
+                    streamer=streamer,
+                    stopping_criteria=StoppingCriteriaList([_StopOnEvent(stop_event)])
+                )
+            _observe_output(tokenizer, outputs)
+        except Exception as e:
+            errors.append(e)
+            # Unblock the consumer; generate() did not reach streamer.end()
+            streamer.end()
+
+    worker = threading.Thread(target=_generate, name="generate-stream", daemon=True)
+    worker.start()
+
+    try:
+        for piece in streamer:
+            if piece:
+                yield piece
+        if errors:
+            raise errors[0]
+    finally:
+        stop_event.set()
@@ -0,0 +1,425 @@
+import atexit
+import bisect
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS_S = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 384, 512, 768, 1024)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{n}="{_escape(str(v))}"'
+        for n, v in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> dict:
+        """
+        {label values tuple: value} snapshot; the value is a number, or
+        [per-bucket counts, sum, count] for histograms.
+        """
+        raise NotImplementedError
+
+    def render_samples(self, samples: dict, labelnames: Optional[Sequence[str]] = None) -> List[str]:
+        names = self.labelnames if labelnames is None else tuple(labelnames)
+        return self._header() + [
+            f"{self.name}{_format_labels(names, k)} {_format_value(v)}"
+            for k, v in samples.items()
+        ]
+
+    def render(self) -> List[str]:
+        return self.render_samples(self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS_S
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values → [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """
+        Observe the seconds spent in the with-block (also across awaits).
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self) -> dict:
+        with self._lock:
+            return {k: [list(c), s, n] for k, (c, s, n) in self._series.items()}
+
+    def render_samples(self, samples: dict, labelnames: Optional[Sequence[str]] = None) -> List[str]:
+        lines = self._header()
+        names = self.labelnames + ("le",)
+        for key, (counts, total, n) in samples.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Gauge or counter whose samples are read from existing state at scrape
+    time, so nothing is paid on the request path. `collect` returns
+    {label values tuple: value}.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Dict[Tuple[str, ...], float]],
+        kind: str = "gauge"
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> dict:
+        return dict(self.collect())
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Add a metric; registering a name again replaces the old one
+        (module reloads, tests).
+        """
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self, names: Optional[Iterable[str]] = None) -> str:
+        lines = []
+        for name, metric in self._metrics.items():
+            if names is None or name in names:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, list]:
+        """
+        Every metric's samples as JSON-able [[label values], value] pairs.
+        """
+        return {
+            name: [[list(k), v] for k, v in metric.samples().items()]
+            for name, metric in self._metrics.items()
+        }
+
+    def render_merged(self, snapshots: Dict[str, Dict[str, list]], live: Iterable[str]) -> str:
+        """
+        Render several processes' snapshots ({pid: snapshot}) as one.
+        Counters and histograms are summed over every snapshot, so totals
+        stay monotonic when a worker exits; gauges describe a process
+        and are reported for the live pids only, with a pid label.
+        """
+        live = set(live)
+        lines = []
+        for name, metric in self._metrics.items():
+            gauge = metric.kind == "gauge"
+            merged = {}
+            for pid, snapshot in snapshots.items():
+                if gauge and pid not in live:
+                    continue
+                for key, value in snapshot.get(name, []):
+                    key = tuple(key) + ((pid,) if gauge else ())
+                    if gauge or key not in merged:
+                        merged[key] = value
+                    elif metric.kind == "histogram":
+                        counts, total, n = merged[key]
+                        merged[key] = [[a + b for a, b in zip(counts, value[0])], total + value[1], n + value[2]]
+                    else:
+                        merged[key] += value
+            labelnames = metric.labelnames + ("pid",) if gauge else None
+            lines.extend(metric.render_samples(merged, labelnames))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labelnames))
+
+
+def histogram(
+    name: str,
+    help_text: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = LATENCY_BUCKETS_S
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+
+def gauge_callback(
+    name: str,
+    help_text: str,
+    labelnames: Sequence[str],
+    collect: Callable[[], Dict[Tuple[str, ...], float]]
+) -> CallbackMetric:
+    return REGISTRY.register(CallbackMetric(name, help_text, labelnames, collect))
+
+
+def counter_callback(
+    name: str,
+    help_text: str,
+    labelnames: Sequence[str],
+    collect: Callable[[], Dict[Tuple[str, ...], float]]
+) -> CallbackMetric:
+    return REGISTRY.register(CallbackMetric(name, help_text, labelnames, collect, kind="counter"))
+
+
+# ===== PIPELINE METRICS =====
+# Shared by the app and the model modules
+
+STAGE_SECONDS = histogram(
+    "rag_stage_seconds",
+    "Time spent in each pipeline stage, including batching queue wait.",
+    ["stage"]
+)
+REQUEST_SECONDS = histogram(
+    "rag_request_seconds",
+    "End-to-end request latency.",
+    ["endpoint"]
+)
+REQUESTS = counter(
+    "rag_requests_total",
+    "Questions received.",
+    ["endpoint"]
+)
+EMPTY_RETRIEVALS = counter(
+    "rag_empty_retrievals_total",
+    "Questions for which retrieval returned no candidates."
+)
+ADAPTIVE_EF_RAISED = counter(
+    "rag_adaptive_ef_raised_total",
+    "Adaptive-mode searches that raised efSearch for an ambiguous top-k."
+)
+PROMPT_TOKENS = histogram(
+    "rag_prompt_tokens",
+    "Encoder input tokens per generation prompt, after packing.",
+    buckets=TOKEN_BUCKETS
+)
+OUTPUT_TOKENS = histogram(
+    "rag_output_tokens",
+    "Tokens decoded per generated answer.",
+    buckets=TOKEN_BUCKETS
+)
+
+
+# ===== MULTI-PROCESS =====
+# Pre-forked workers (RAG/serve.py) share one socket but each has its own
+# registry, so a scrape reaches one worker at random. With METRICS_DIR
+# set, every worker writes its snapshot to <METRICS_DIR>/<pid>.json and
+# /metrics merges all of them (render_metrics).
+
+METRICS_DIR = os.environ.get("RAG_METRICS_DIR")
+
+# Seconds between snapshot writes: how stale other workers' samples can be
+METRICS_FLUSH_S = float(os.environ.get("RAG_METRICS_FLUSH_S", "1"))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_snapshot(directory: str = None):
+    """
+    Atomically replace this process's snapshot file.
+    """
+    path = Path(directory or METRICS_DIR) / f"{os.getpid()}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(REGISTRY.snapshot()), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def start_snapshot_writer(directory: str = None, interval: float = None) -> Optional[threading.Thread]:
+    """
+    Write this process's snapshot every `interval` seconds and at exit
+    (nothing without a metrics directory). A file left by an earlier
+    process with the same pid is kept under another name so its counts
+    still add up.
+    """
+    directory = directory or METRICS_DIR
+    if not directory:
+        return None
+    interval = interval or METRICS_FLUSH_S
+    own = Path(directory) / f"{os.getpid()}.json"
+    if own.exists():
+        os.replace(own, own.with_name(f"{os.getpid()}-{time.time_ns()}.json"))
+
+    def run():
+        while True:
+            try:
+                write_snapshot(directory)
+            except OSError as e:
+                print(f"⚠️  Metrics snapshot failed: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="metrics-snapshot", daemon=True)
+    thread.start()
+    atexit.register(write_snapshot, directory)
+    return thread
+
+
+def render_metrics(directory: str = None) -> str:
+    """
+    /metrics body: this process's registry alone, or merged with every
+    snapshot in the metrics directory. This process's own samples are
+    read live, not from its file.
+    """
+    directory = directory or METRICS_DIR
+    if not directory:
+        return REGISTRY.render()
+
+    snapshots = {}
+    for path in Path(directory).glob("*.json"):
+        pid = int(path.stem.split("-")[0])
+        try:
+            snapshots[path.stem] = (pid, json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue  # removed or half-written between glob and read
+
+    me = os.getpid()
+    snapshots[str(me)] = (me, REGISTRY.snapshot())
+
+    # Files renamed away from a reused pid ("<pid>-<ns>") are never live
+    return REGISTRY.render_merged(
+        {stem: snapshot for stem, (_, snapshot) in snapshots.items()},
+        {stem for stem, (pid, _) in snapshots.items() if stem == str(pid) and _pid_alive(pid)}
+    )
+
+
+# ===== PROCESS MEMORY =====
+
+def process_memory(pid="self") -> Dict[str, int]:
+    """
+    Bytes of rss, pss (shared pages split between the processes mapping
+    them), uss (pages only this process maps: what stopping it frees)
+    and shared, from /proc/<pid>/smaps_rollup (summed smaps on older
+    kernels). Empty where /proc is unavailable.
+    """
+    fields = {
+        "Rss": "rss", "Pss": "pss",
+        "Private_Clean": "uss", "Private_Dirty": "uss",
+        "Shared_Clean": "shared", "Shared_Dirty": "shared"
+    }
+    out = dict.fromkeys(("rss", "pss", "uss", "shared"), 0)
+
+    for name in ("smaps_rollup", "smaps"):
+        try:
+            with open(f"/proc/{pid}/{name}", "r") as f:
+                for line in f:
+                    key, _, rest = line.partition(":")
+                    if key in fields:
+                        out[fields[key]] += int(rest.split()[0]) * 1024
+            return out
+        except (FileNotFoundError, PermissionError):
+            continue
+    return {}
+
+
+gauge_callback(
+    "rag_process_memory_bytes",
+    "Memory of this worker process by kind (rss, pss, uss, shared); per pid when workers are merged.",
+    ["kind"],
+    lambda: {(kind,): value for kind, value in process_memory().items()}
+)
@@ -0,0 +1,61 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+
+# name → zero-argument loader returning the model object
+_loaders: Dict[str, Callable] = {}
+_models: Dict[str, object] = {}
+_load_times: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def register(name: str, loader: Callable):
+    """
+    Register a model loader. Nothing is loaded until get() or warm_up().
+    """
+    _loaders[name] = loader
+
+
+def get(name: str):
+    """
+    Return the model, loading it on first use. Concurrent first calls
+    load it once; the others wait.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            if name not in _loaders:
+                raise KeyError(f"No model registered as {name!r}")
+
+            t0 = time.perf_counter()
+            model = _loaders[name]()
+            _load_times[name] = time.perf_counter() - t0
+            _models[name] = model
+
+            print(f"🧠 Loaded {name} in {_load_times[name]:.2f}s")
+
+    return model
+
+
+def is_loaded(name: str) -> bool:
+    return name in _models
+
+
+def warm_up(names: Optional[Iterable[str]] = None):
+    """
+    Load the given models (default: every registered one) up front.
+    """
+    for name in (names if names is not None else list(_loaders)):
+        get(name)
+
+
+def load_times() -> Dict[str, float]:
+    """
+    Seconds spent in each loader, for models loaded so far.
+    """
+    return dict(_load_times)
@@ -1,22 +1,113 @@
-from typing import List
-from sentence_transformers import CrossEncoder
+from typing import List, Optional, Sequence, Tuple
+import os
+
+from RAG import models
+from RAG.backends import OnnxCrossEncoder, backend_for, quantize_int8
+from RAG.cache import LRUCache, normalize_query
 
 # Free, open-source reranker
 MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 
-_reranker = CrossEncoder(MODEL_NAME)
+# (query, chunk_id) score cache (size 0 disables it)
+SCORE_CACHE_SIZE = int(os.environ.get("RAG_RERANK_CACHE_SIZE", "50000"))
+
+BACKEND = backend_for("RERANK")
+
+
+def _load():
+    if BACKEND == "onnx":
+        return OnnxCrossEncoder("RERANK")
+
+    from sentence_transformers import CrossEncoder
+
+    reranker = CrossEncoder(MODEL_NAME)
+    if BACKEND == "int8":
+        quantize_int8(reranker.model)
+    return reranker
+
+
+# Loaded on first rerank call or models.warm_up(["rerank"])
+models.register("rerank", _load)
+
+
+_score_cache = (
+    LRUCache(max_size=SCORE_CACHE_SIZE)
+    if SCORE_CACHE_SIZE > 0 else None
+)
 
 
 def rerank(
     query: str,
-    candidate_texts: List[str]
+    candidate_texts: List[str],
+    chunk_ids: Optional[Sequence[str]] = None
 ) -> List[float]:
     """
     Returns relevance scores for (query, text) pairs.
     Higher score = more relevant.
+
+    When chunk_ids are given, scores are cached per (query, chunk_id)
+    and only uncached pairs go through the cross-encoder.
+    """
+
+    return rerank_batch([(query, candidate_texts, chunk_ids)])[0]
+
+
+def rerank_batch(
+    requests: List[Tuple]
+) -> List[List[float]]:
+    """
+    Score several (query, candidate_texts[, chunk_ids]) requests in one
+    forward pass. Returns one score list per request, in request order.
+    """
+
+    results: List[List[Optional[float]]] = []
+    pairs = []
+    slots = []
+
+    for r, request in enumerate(requests):
+        query, candidate_texts = request[0], request[1]
+        chunk_ids = request[2] if len(request) > 2 else None
+
+        scores: List[Optional[float]] = [None] * len(candidate_texts)
+        results.append(scores)
+
+        for c, text in enumerate(candidate_texts):
+            key = _cache_key(query, chunk_ids[c]) if chunk_ids is not None else None
+            cached = _score_cache.get(key) if key is not None else None
+
+            if cached is not None:
+                scores[c] = cached
+            else:
+                pairs.append((query, text))
+                slots.append((r, c, key))
+
+    if pairs:
+        predicted = models.get("rerank").predict(pairs).tolist()
+
+        for (r, c, key), score in zip(slots, predicted):
+            results[r][c] = score
+            if key is not None:
+                _score_cache.put(key, score)
+
+    return results
+
+
+def _cache_key(query: str, chunk_id: str):
+    if _score_cache is None:
+        return None
+    return (MODEL_NAME, BACKEND, normalize_query(query), chunk_id)
+
+
+def invalidate_score_cache():
+    """
+    Drop all cached scores. Call when loading a different artifact
+    version, since a chunk_id may then refer to different text.
     """
+    if _score_cache is not None:
+        _score_cache.clear()
 
-    pairs = [(query, text) for text in candidate_texts]
-    scores = _reranker.predict(pairs)
 
-    return scores.tolist()
+def score_cache_stats() -> dict:
+    if _score_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **_score_cache.stats()}
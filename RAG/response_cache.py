@@ -0,0 +1,375 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import numpy as np
+
+
+class _Ring:
+    """
+    Fixed-size ring buffer of vectors and payloads; the oldest entry is
+    overwritten once full.
+    """
+
+    def __init__(self, max_entries: int, dim: int):
+        self.vecs = np.zeros((max_entries, dim), dtype="float32")
+        self.payloads: list = []
+        self.next = 0
+        self.count = 0
+
+    def add(self, q_vec: np.ndarray, payload: dict):
+        slot = self.next
+        self.vecs[slot] = q_vec
+        if slot < len(self.payloads):
+            self.payloads[slot] = payload
+        else:
+            self.payloads.append(payload)
+
+        self.next = (slot + 1) % len(self.vecs)
+        self.count = min(self.count + 1, len(self.vecs))
+
+
+class InProcessBackend:
+    """
+    Per-worker backend. Each namespace's entries live in a fixed-size
+    ring buffer so a lookup is one matrix-vector product over at most
+    `max_entries` rows.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._rings: dict = {}
+
+    def search(self, namespace: str, q_vec: np.ndarray):
+        with self._lock:
+            ring = self._rings.get(namespace)
+            if ring is None or ring.count == 0:
+                return None
+
+            scores = ring.vecs[: ring.count] @ q_vec
+            best = int(np.argmax(scores))
+            return float(scores[best]), ring.payloads[best]
+
+    def add(self, namespace: str, q_vec: np.ndarray, payload: dict):
+        with self._lock:
+            ring = self._rings.get(namespace)
+            if ring is None:
+                ring = self._rings[namespace] = _Ring(self.max_entries, q_vec.shape[0])
+            ring.add(q_vec, payload)
+
+    def clear(self):
+        with self._lock:
+            self._rings = {}
+
+
+class _VectorMirror:
+    """
+    Local copy of one namespace's cached vectors: a dense matrix plus the
+    Redis field of each row. Removal moves the last row into the gap.
+    """
+
+    def __init__(self):
+        self.last_id = None
+        self.fields: list = []
+        self.rows: dict = {}
+        self.vecs = None
+
+    def put(self, field: bytes, vec: np.ndarray):
+        row = self.rows.get(field)
+        if row is None:
+            row = len(self.fields)
+            if self.vecs is None:
+                self.vecs = np.empty((16, vec.shape[0]), dtype="float32")
+            elif row == len(self.vecs):
+                self.vecs = np.concatenate([self.vecs, np.empty_like(self.vecs)])
+            self.fields.append(field)
+            self.rows[field] = row
+        self.vecs[row] = vec
+
+    def drop(self, field: bytes):
+        row = self.rows.pop(field, None)
+        if row is None:
+            return
+        last = self.fields.pop()
+        if last != field:
+            self.fields[row] = last
+            self.rows[last] = row
+            self.vecs[row] = self.vecs[len(self.fields)]
+
+
+class RedisBackend:
+    """
+    Shared backend so all replicas reuse each other's answers.
+
+    Each artifact version has four keys: raw float32 vectors and JSON
+    payloads in two hashes (same field per entry), a sorted set of
+    insertion times that evicts the oldest entries beyond `max_entries`,
+    and a stream logging every add and eviction. A new version starts
+    from empty keys and the old ones expire by TTL.
+
+    Every process keeps a local mirror of the vectors: a search reads only
+    the log entries since its last search, fetches just the vectors they
+    added, scores the mirror locally and then HGETs the one winning
+    payload. The full vector hash is only read to (re)build the mirror,
+    e.g. when the log was trimmed past the mirror's position.
+
+    Calls block on the network, so async callers should run search/add
+    in an executor (`blocking` tells them to). `client` only needs
+    hset/hget/hmget/hgetall/hdel/zadd/zcard/zpopmin/xadd/xrange/
+    xrevrange/expire from the redis-py API, which lets a dict-backed
+    stand-in replace it in tests.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        client,
+        prefix: str = "rag:answers",
+        max_entries: int = 1024,
+        ttl_seconds: int = 86400,
+        log_length: Optional[int] = None
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+
+        self.client = client
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Log entries kept: a mirror further behind than this rebuilds
+        self.log_length = log_length or 4 * max_entries
+
+        # Searches of one process share the mirrors and catch them up in turn
+        self._lock = threading.Lock()
+        self._mirrors: dict = {}
+
+    def _keys(self, namespace: str):
+        base = f"{self.prefix}:{namespace}"
+        return f"{base}:vecs", f"{base}:payloads", f"{base}:order", f"{base}:log"
+
+    def _resync(self, namespace: str) -> _VectorMirror:
+        vecs_key, _, _, log_key = self._keys(namespace)
+        mirror = _VectorMirror()
+
+        # Log position first: adds racing with hgetall are replayed later
+        latest = self.client.xrevrange(log_key, "+", "-", count=1)
+        mirror.last_id = latest[0][0] if latest else None
+
+        for field, raw in self.client.hgetall(vecs_key).items():
+            mirror.put(field, np.frombuffer(raw, dtype="float32"))
+        return mirror
+
+    def _refresh(self, namespace: str) -> _VectorMirror:
+        mirror = self._mirrors.get(namespace)
+        if mirror is None or mirror.last_id is None:
+            mirror = self._mirrors[namespace] = self._resync(namespace)
+            return mirror
+
+        vecs_key, _, _, log_key = self._keys(namespace)
+        entries = self.client.xrange(log_key, mirror.last_id, "+")
+
+        # The last applied entry must still be there, or the mirror missed
+        # trimmed entries (or the keys expired)
+        if not entries or entries[0][0] != mirror.last_id:
+            mirror = self._mirrors[namespace] = self._resync(namespace)
+            return mirror
+
+        events = [event for _, event in entries[1:]]
+        added = list({event[b"add"]: None for event in events if b"add" in event})
+        fetched = dict(zip(added, self.client.hmget(vecs_key, added))) if added else {}
+
+        # Replayed in order: an entry can be evicted and stored again
+        for event in events:
+            raw = fetched.get(event.get(b"add"))
+            # None: evicted again since, by an entry later in the log
+            if raw is not None:
+                mirror.put(event[b"add"], np.frombuffer(raw, dtype="float32"))
+            for field in event.get(b"del", b"").split(b","):
+                if field:
+                    mirror.drop(field)
+
+        mirror.last_id = entries[-1][0]
+        return mirror
+
+    def search(self, namespace: str, q_vec: np.ndarray):
+        with self._lock:
+            mirror = self._refresh(namespace)
+            if not mirror.fields:
+                return None
+
+            scores = mirror.vecs[: len(mirror.fields)] @ q_vec
+            best = int(np.argmax(scores))
+            field = mirror.fields[best]
+
+        # Another replica may have evicted it since the refresh
+        payload = self.client.hget(self._keys(namespace)[1], field)
+        if payload is None:
+            return None
+        return float(scores[best]), json.loads(payload)
+
+    def add(self, namespace: str, q_vec: np.ndarray, payload: dict):
+        vecs_key, payloads_key, order_key, log_key = self._keys(namespace)
+
+        vec = np.ascontiguousarray(q_vec, dtype="float32")
+        field = hashlib.sha1(vec.tobytes()).hexdigest()
+
+        self.client.hset(payloads_key, field, json.dumps(payload))
+        self.client.hset(vecs_key, field, vec.tobytes())
+        self.client.zadd(order_key, {field: time.time()})
+
+        # Evict the oldest entries beyond the cap
+        old = []
+        overflow = self.client.zcard(order_key) - self.max_entries
+        if overflow > 0:
+            old = [
+                f.decode() if isinstance(f, bytes) else f
+                for f, _ in self.client.zpopmin(order_key, overflow)
+            ]
+            self.client.hdel(vecs_key, *old)
+            self.client.hdel(payloads_key, *old)
+
+        # Logged after the writes, so a reader that sees the entry finds the vector
+        event = {"add": field}
+        if old:
+            event["del"] = ",".join(old)
+        self.client.xadd(log_key, event, maxlen=self.log_length, approximate=True)
+
+        for key in (vecs_key, payloads_key, order_key, log_key):
+            self.client.expire(key, self.ttl_seconds)
+
+    def clear(self):
+        # Versioned keys are never reused; only the local mirrors go
+        with self._lock:
+            self._mirrors = {}
+
+
+class SemanticResponseCache:
+    """
+    Returns a stored /ask payload when a new query embedding has cosine
+    similarity >= `threshold` with a cached one. Embeddings must be
+    L2-normalized. Entries are scoped to the artifact `version`, so
+    switching to a rebuilt index invalidates everything, and to a `scope`
+    naming any per-request setting that changes the answer (e.g. the
+    search mode): entries of one scope never answer another.
+    """
+
+    def __init__(
+        self,
+        backend,
+        threshold: float = 0.95,
+        version: str = ""
+    ):
+        self.backend = backend
+        self.threshold = threshold
+        self.version = version
+
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def blocking(self) -> bool:
+        """
+        True when lookup/store do network I/O and belong off the event loop.
+        """
+        return getattr(self.backend, "blocking", False)
+
+    def set_version(self, version: str):
+        if version != self.version:
+            self.backend.clear()
+            self.version = version
+
+    def _namespace(self, scope: str) -> str:
+        return f"{self.version}:{scope}" if scope else self.version
+
+    def lookup(self, q_vec: np.ndarray, scope: str = "") -> Optional[dict]:
+        found = self.backend.search(self._namespace(scope), q_vec)
+
+        hit = found is not None and found[0] >= self.threshold
+
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found[1] if hit else None
+
+    def store(self, q_vec: np.ndarray, payload: dict, scope: str = ""):
+        self.backend.add(self._namespace(scope), q_vec, payload)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "version": self.version,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts
+    the coroutine as its own task and every caller, the first included,
+    awaits that task. A cancelled caller only stops waiting; the others
+    still get the result. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self.merged = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.merged += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Every caller may have gone away; don't log the error as unretrieved
+        if not task.cancelled():
+            task.exception()
+
+
+def backend_from_env(kind: str, max_entries: int, redis_url: str = ""):
+    """
+    Build a response-cache backend by name ("memory" or "redis").
+    """
+    if kind == "memory":
+        return InProcessBackend(max_entries=max_entries)
+
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(
+                "RAG_RESPONSE_CACHE=redis requires the 'redis' package"
+            ) from exc
+        return RedisBackend(
+            redis.Redis.from_url(redis_url),
+            max_entries=max_entries
+        )
+
+    raise ValueError(f"Unknown response cache backend: {kind}")
@@ -1,26 +1,156 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
 from RAG.embeddings_free import embed_texts
+from RAG.faiss_hnsw import get_ef_search, search_index, search_with_ef
+
+# Standard RRF damping constant
+RRF_K = 60
+
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid")
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]],
+    k: int = RRF_K
+) -> List[Tuple[int, float]]:
+    """
+    Fuse several ranked id lists: score(id) = Σ 1 / (k + rank).
+    Returns (id, score) pairs, best first; ties keep first-seen order.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking, start=1):
+            scores[idx] = scores.get(idx, 0.0) + 1.0 / (k + rank)
+
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def dense_search(index, q_vec, k: int) -> List[int]:
+    _, indices = search_index(index, q_vec, k)
+    return [int(i) for i in indices[0] if i != -1]
+
+
+def is_ambiguous(scores: Sequence[float], k: int, min_gap: float) -> bool:
+    """
+    The top-k is ambiguous when the k-th and (k+1)-th candidates score
+    within min_gap of each other: a more exhaustive search is likely to
+    change which chunks make the cut. scores are the valid results of a
+    k+1 search, best first.
+    """
+    if len(scores) <= k:
+        return False
+    return scores[k - 1] - scores[k] < min_gap
+
+
+def adaptive_dense_search(
+    index,
+    q_vec,
+    k: int,
+    max_ef_search: int,
+    min_gap: float
+) -> Tuple[List[int], Optional[int]]:
+    """
+    Dense search that raises efSearch (doubling up to max_ef_search) for
+    this query only, and only while its top-k boundary is ambiguous.
+    Returns (ids, efSearch it was raised to, or None if it was not).
+    Indexes without an HNSW graph are searched once, unchanged.
+    """
+    ef = get_ef_search(index)
+    raised_to = None
+    scores, indices = search_index(index, q_vec, k + 1)
+
+    # The raised efSearch applies to this query's searches only; the
+    # shared index keeps its tuned value for concurrent requests
+    while ef is not None and ef < max_ef_search and is_ambiguous(scores[0][indices[0] != -1], k, min_gap):
+        ef = raised_to = min(ef * 2, max_ef_search)
+        scores, indices = search_with_ef(index, q_vec, k + 1, ef)
+
+    return [int(i) for i in indices[0][:k] if i != -1], raised_to
+
+
+def lexical_search(bm25, query: str, k: int) -> List[int]:
+    _, ids = bm25.search(query, k)
+    return [int(i) for i in ids]
+
+
+def lexical_search_batch(bm25, queries: List[str], k: int) -> List[List[int]]:
+    return [[int(i) for i in ids] for _, ids in bm25.search_batch(queries, k)]
+
+
+def hybrid_search_batch(
+    queries: List[str],
+    q_vecs,
+    index,
+    bm25,
+    k: int = 10
+) -> List[List[int]]:
+    """
+    Dense and lexical retrieval for many queries: BM25 scores the whole
+    batch on the hybrid pool while FAISS runs one multi-query search.
+    Returns every fused id per query, best first (RRF).
+    """
+    lexical = _pool.submit(lexical_search_batch, bm25, queries, k)
+    _, indices = search_index(index, q_vecs, k)
+    dense = [[int(i) for i in row if i != -1] for row in indices]
+
+    return [
+        [idx for idx, _ in reciprocal_rank_fusion([d, lex])]
+        for d, lex in zip(dense, lexical.result())
+    ]
+
+
+def hybrid_search(
+    query: str,
+    q_vec,
+    index,
+    bm25,
+    k: int = 10,
+    dense_k: Optional[int] = None,
+    lexical_k: Optional[int] = None
+) -> List[int]:
+    """
+    Run dense (FAISS) and lexical (BM25) search concurrently and fuse the
+    rankings with RRF. Returns up to k FAISS ids, best first.
+    """
+    dense_k = dense_k or k
+    lexical_k = lexical_k or k
+
+    lexical = _pool.submit(lexical_search, bm25, query, lexical_k)
+    dense = dense_search(index, q_vec, dense_k)
+
+    fused = reciprocal_rank_fusion([dense, lexical.result()])
+    return [idx for idx, _ in fused[:k]]
 
 
 def retrieve(
     query: str,
     index,
     chunks: List[Dict],
-    k: int = 5
+    k: int = 5,
+    bm25=None
 ) -> List[Dict]:
     """
     Retrieve top-k relevant chunks from FAISS index for a query.
+    With a BM25 index, dense and lexical results are fused (RRF).
     """
 
     # 1) Embed query (same model as documents)
     q_vec = embed_texts([query])
 
-    # 2) FAISS ANN search
-    scores, indices = index.search(q_vec, k)
+    # 2) FAISS ANN search (+ BM25, fused; score is then the RRF score)
+    if bm25 is not None:
+        lexical = _pool.submit(lexical_search, bm25, query, k)
+        dense = dense_search(index, q_vec, k)
+        fused = reciprocal_rank_fusion([dense, lexical.result()])[:k]
+        hits = [(score, idx) for idx, score in fused]
+    else:
+        scores, indices = search_index(index, q_vec, k)
+        hits = [(float(s), int(i)) for s, i in zip(scores[0], indices[0]) if i != -1]
 
     # 3) Map FAISS ids → chunk metadata
     results = []
-    for score, idx in zip(scores[0], indices[0]):
+    for score, idx in hits:
         chunk = chunks[int(idx)]
         results.append({
             "score": float(score),
@@ -7,6 +7,7 @@ from RAG.embeddings_free import embed_texts
 from RAG.faiss_hnsw import build_and_save_hnsw_index, load_hnsw_index
 from RAG.reranker_cross_encoder import rerank
 from RAG.llm_flan_t5 import generate_answer
+from RAG.batch_answer import answer_batch
 
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data_pdfs"
@@ -87,6 +88,14 @@ def answer_query(query: str, index, chunks):
     return answer
 
 
+def answer_queries(queries: list[str], index, chunks) -> list[str]:
+    """
+    Many queries at once: one embedding call, one index.search, one
+    rerank pass and length-grouped generation (RAG.batch_answer).
+    """
+    return [r["answer"] for r in answer_batch(queries, index, chunks)]
+
+
 # -------------------------------
 # MAIN
 # -------------------------------
@@ -0,0 +1,217 @@
+import argparse
+import contextlib
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from RAG import metrics
+from RAG.metrics import process_memory
+from RAG.sharded_index import ShardedIndex
+
+
+# ===== CONFIG =====
+WORKERS = int(os.environ.get("RAG_WORKERS", "1"))
+HOST = os.environ.get("RAG_HOST", "0.0.0.0")
+PORT = int(os.environ.get("RAG_PORT", "8000"))
+
+# Seconds between per-worker memory reports (0 = only on SIGUSR1)
+MEMORY_REPORT_S = float(os.environ.get("RAG_MEMORY_REPORT_S", "0"))
+
+MB = 1024 * 1024
+
+
+def prepare_metrics_dir(workers: int) -> Optional[str]:
+    """
+    With several workers, point every worker's /metrics at a shared
+    snapshot directory so a scrape sees all of them, whichever worker
+    accepts it. RAG_METRICS_DIR is cleared of the last run's files; a
+    temporary directory is used otherwise. Returns a directory to
+    remove on exit, if one was created.
+    """
+    if workers <= 1:
+        return None
+
+    if metrics.METRICS_DIR:
+        Path(metrics.METRICS_DIR).mkdir(parents=True, exist_ok=True)
+        for stale in Path(metrics.METRICS_DIR).glob("*.json"):
+            stale.unlink(missing_ok=True)
+        created = None
+    else:
+        metrics.METRICS_DIR = created = tempfile.mkdtemp(prefix="rag-metrics-")
+
+    print(f"📈 Metrics of {workers} workers merged at scrape time via {metrics.METRICS_DIR}")
+    return created
+
+
+def load_shared_artifacts(workers: int):
+    """
+    Load index, chunk store and BM25 once, in the parent, before forking.
+
+    faiss 1.7.4 copies flat and HNSW indexes into private memory even with
+    IO_FLAG_MMAP, so sharing comes from fork instead: workers inherit the
+    parent's pages copy-on-write, and search only reads them. The chunk
+    store is already mmap'ed (one copy in the page cache for everyone).
+    Process-mode shard replicas are the exception: they start per worker.
+    """
+    import RAG.app as app
+
+    app.load_artifacts()
+
+    if isinstance(app.index, ShardedIndex) and app.index.mode == "process" and workers > 1:
+        copies = workers * app.index.replicas
+        print(
+            f"⚠️  RAG_SHARD_MODE=process: every worker starts its own shard replicas "
+            f"({copies * app.index.n_shards} index processes, {copies} copies of the index). "
+            "Use RAG_SHARD_MODE=thread to share one copy across workers."
+        )
+
+    if isinstance(app.chunks, list):
+        print(
+            "⚠️  Chunks loaded from legacy chunks.json: reference counting "
+            "copies them into every worker. Rebuild to get the mmap chunk store."
+        )
+
+    # Keep the cyclic GC from writing to (and so un-sharing) every
+    # object the parent allocated
+    gc.freeze()
+    return app
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def spawn_worker(app_module, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Child: serve until uvicorn's own SIGTERM / SIGINT handling stops it.
+    # Models load here (lifespan warm-up), one set per worker.
+    import uvicorn
+
+    # Restarted workers inherit the supervisor's handlers; uvicorn
+    # installs its own for SIGTERM / SIGINT
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+        signal.signal(signum, signal.SIG_DFL)
+    config = uvicorn.Config(app_module.app, log_level=log_level.lower())
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    finally:
+        # os._exit skips atexit: publish the final counts here
+        if metrics.METRICS_DIR:
+            with contextlib.suppress(OSError):
+                metrics.write_snapshot()
+        os._exit(0)
+
+
+def memory_report(workers: List[int]) -> Dict[str, dict]:
+    """
+    Per-process memory of the parent and each worker, plus totals.
+    Σ PSS is what the processes cost together; one worker's USS is what
+    adding that worker cost.
+    """
+    rows = {"parent": process_memory()}
+    for pid in workers:
+        rows[str(pid)] = process_memory(pid)
+
+    rows["total"] = {
+        kind: sum(r.get(kind, 0) for r in rows.values())
+        for kind in ("rss", "pss", "uss")
+    }
+    return rows
+
+
+def print_memory_report(workers: List[int]):
+    rows = memory_report(workers)
+    print(f"🧮 Memory (MB)      {'RSS':>9} {'PSS':>9} {'USS':>9}")
+    for name, row in rows.items():
+        if not row:
+            continue
+        print(
+            f"   {name:<14} {row['rss'] / MB:>9.1f} {row['pss'] / MB:>9.1f} {row['uss'] / MB:>9.1f}"
+        )
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-fork server: artifacts loaded once and shared by all workers"
+    )
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--memory-report-s", type=float, default=MEMORY_REPORT_S,
+                        help="print per-worker RSS / PSS / USS every N seconds (0 = on SIGUSR1 only)")
+    args = parser.parse_args()
+
+    metrics_tmp = prepare_metrics_dir(args.workers)
+
+    # 1️⃣ Load shared artifacts in the parent
+    t0 = time.perf_counter()
+    app_module = load_shared_artifacts(args.workers)
+    print(f"📦 Shared artifacts loaded in {time.perf_counter() - t0:.2f}s")
+
+    # 2️⃣ Bind once; every worker accepts on the same socket
+    sock = bind_socket(args.host, args.port)
+
+    # 3️⃣ Fork workers
+    workers = [spawn_worker(app_module, sock, app_module.LOG_LEVEL) for _ in range(args.workers)]
+    print(f"🚀 {len(workers)} workers on {args.host}:{args.port}: {workers}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            # A worker can exit between waitpid() and kill()
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: print_memory_report(workers))
+
+    # 4️⃣ Supervise: restart workers that die, report memory
+    next_report = time.monotonic() + args.memory_report_s if args.memory_report_s > 0 else None
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        if pid:
+            workers.remove(pid)
+            if not stopping:
+                print(f"⚠️  Worker {pid} exited ({status}); restarting")
+                workers.append(spawn_worker(app_module, sock, app_module.LOG_LEVEL))
+            continue
+
+        if next_report is not None and time.monotonic() >= next_report:
+            print_memory_report(workers)
+            next_report += args.memory_report_s
+        time.sleep(0.5)
+
+    sock.close()
+    if metrics_tmp:
+        shutil.rmtree(metrics_tmp, ignore_errors=True)
+    print("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from RAG.faiss_hnsw import build_index, load_index
+
+
+# ===== CONFIG =====
+SHARD_MAP_NAME = "shards.json"
+SHARD_DIR_NAME = "shards"
+SHARD_MAP_VERSION = 1
+
+# Spawned, not forked: the parent may already run OpenMP / torch threads
+_MP = multiprocessing.get_context("spawn")
+
+
+def shard_ranges(n: int, n_shards: int) -> List[Tuple[int, int]]:
+    """
+    Contiguous [lo, hi) row ranges of near-equal size. Contiguous ranges
+    keep the global FAISS id = shard offset + local id.
+    """
+    if n_shards < 1:
+        raise ValueError("n_shards must be >= 1")
+    bounds = np.linspace(0, n, n_shards + 1).astype(int)
+    return [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def _cpus() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+# ===== BUILD =====
+
+def _build_shard(
+    vectors_path: str,
+    lo: int,
+    hi: int,
+    index_path: str,
+    kind: str,
+    m: int,
+    ef_construction: int,
+    omp_threads: int
+) -> dict:
+    import faiss
+
+    # Shards build side by side; split the cores instead of oversubscribing
+    faiss.omp_set_num_threads(omp_threads)
+
+    t0 = time.perf_counter()
+    xb = np.ascontiguousarray(np.load(vectors_path, mmap_mode="r")[lo:hi])
+    index = build_index(xb, kind=kind, index_path=index_path, m=m, ef_construction=ef_construction)
+    return {"ntotal": int(index.ntotal), "build_s": time.perf_counter() - t0}
+
+
+def build_shards(
+    batches: Iterable[np.ndarray],
+    n: int,
+    out_dir: Path,
+    n_shards: int,
+    kind: str = "hnsw",
+    m: int = 32,
+    ef_construction: int = 200,
+    processes: Optional[int] = None
+) -> dict:
+    """
+    Build n_shards indexes over contiguous row ranges in parallel
+    processes and write the shard map (out_dir / SHARD_MAP_NAME).
+
+    batches yields the n vectors in id order; they are spooled to one
+    .npy that every builder maps read-only, so no process holds more
+    than its own shard. Returns the shard map.
+    """
+    out_dir = Path(out_dir)
+    shard_dir = out_dir / SHARD_DIR_NAME
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    for old in shard_dir.glob("shard_*.index*"):
+        old.unlink()
+
+    t0 = time.perf_counter()
+
+    # 1️⃣ Spool vectors to disk
+    vectors_path = shard_dir / "_vectors.npy"
+    spool = None
+    row = 0
+    for batch in batches:
+        if spool is None:
+            spool = np.lib.format.open_memmap(
+                vectors_path, mode="w+", dtype="float32", shape=(n, batch.shape[1])
+            )
+        spool[row:row + len(batch)] = batch
+        row += len(batch)
+    if spool is None or row != n:
+        raise ValueError(f"expected {n} vectors, got {row}")
+    dim = spool.shape[1]
+    spool.flush()
+    del spool
+
+    # 2️⃣ Build shards in parallel
+    ranges = shard_ranges(n, n_shards)
+    processes = min(processes or _cpus(), n_shards)
+    omp_threads = max(1, _cpus() // processes)
+    paths = [shard_dir / f"shard_{s:03d}.index" for s in range(n_shards)]
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=_MP) as pool:
+            built = list(pool.map(
+                _build_shard,
+                [str(vectors_path)] * n_shards,
+                [lo for lo, _ in ranges],
+                [hi for _, hi in ranges],
+                [str(p) for p in paths],
+                [kind] * n_shards,
+                [m] * n_shards,
+                [ef_construction] * n_shards,
+                [omp_threads] * n_shards
+            ))
+    finally:
+        vectors_path.unlink(missing_ok=True)
+
+    # 3️⃣ Shard map last: it marks the shards as a complete build
+    shard_map = {
+        "version": SHARD_MAP_VERSION,
+        "kind": kind,
+        "dim": int(dim),
+        "ntotal": n,
+        "build_s": time.perf_counter() - t0,
+        "build_processes": processes,
+        "shards": [
+            {
+                "path": str(path.relative_to(out_dir)),
+                "offset": lo,
+                "ntotal": info["ntotal"],
+                "build_s": info["build_s"]
+            }
+            for path, (lo, _), info in zip(paths, ranges, built)
+        ]
+    }
+    save_shard_map(out_dir / SHARD_MAP_NAME, shard_map)
+    return shard_map
+
+
+def save_shard_map(path: Path, shard_map: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(shard_map, f, indent=2)
+
+
+def load_shard_map(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        shard_map = json.load(f)
+    if shard_map.get("version") != SHARD_MAP_VERSION:
+        raise ValueError(f"Unsupported shard map version {shard_map.get('version')} in {path}")
+    return shard_map
+
+
+# ===== SEARCH =====
+
+def merge_topk(
+    parts: List[Tuple[np.ndarray, np.ndarray]],
+    offsets: List[int],
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge per-shard (scores, local ids) into the global top-k by score
+    (inner product: higher is better). Missing results stay id -1.
+    """
+    scores = np.concatenate([d for d, _ in parts], axis=1)
+    ids = np.concatenate([
+        np.where(i >= 0, i + offset, -1)
+        for (_, i), offset in zip(parts, offsets)
+    ], axis=1)
+    scores = np.where(ids >= 0, scores, -np.inf)
+
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    out_scores = np.take_along_axis(scores, top, axis=1)
+    out_ids = np.take_along_axis(ids, top, axis=1)
+
+    # Same padding as FAISS when fewer than k results exist
+    out_ids[~np.isfinite(out_scores)] = -1
+    return out_scores.astype("float32"), out_ids.astype("int64")
+
+
+def _replica_main(conn, index_path: str, ef_search: Optional[int], omp_threads: int):
+    """
+    Shard replica process: answer (queries, k) messages with search
+    results until it receives None.
+    """
+    import faiss
+
+    faiss.omp_set_num_threads(omp_threads)
+    index = load_index(index_path, ef_search=ef_search)
+    conn.send(("ready", int(index.ntotal)))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            # Coordinator went away without stopping us
+            break
+        if msg is None:
+            break
+        xq, k = msg
+        try:
+            conn.send(index.search(xq, k))
+        except Exception as e:
+            conn.send(e)
+    conn.close()
+
+
+class ShardedIndex:
+    """
+    Scatter-gather coordinator with the FAISS search() interface: every
+    query goes to all shards concurrently and the per-shard top-k lists
+    are merged by score, returning global ids.
+
+    mode="thread": shards are loaded in this process and searched from a
+    thread pool (FAISS releases the GIL), up to `replicas` concurrent
+    searches per shard on one copy. mode="process": each shard is served
+    by `replicas` local processes; a search takes whichever replica of
+    each shard is idle, so replicas add read throughput. A replica that
+    dies is dropped and restarted in the background while its searches
+    fail over to the shard's other replicas.
+    Processes start on first search in the process that searches, so
+    the coordinator can be created before a pre-fork server forks; each
+    worker then runs its own n_shards × replicas processes, i.e. its own
+    copy of the index. Thread mode loads the shards up front, so forked
+    workers share one copy.
+    """
+
+    def __init__(
+        self,
+        shard_map_path: Path,
+        mode: str = "thread",
+        replicas: int = 1,
+        ef_search: Optional[int] = None
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"mode must be 'thread' or 'process', got {mode!r}")
+        if replicas < 1:
+            raise ValueError("replicas must be >= 1")
+
+        self.shard_map_path = Path(shard_map_path)
+        self.shard_map = load_shard_map(self.shard_map_path)
+        self.mode = mode
+        self.replicas = replicas
+        self.ef_search = ef_search
+
+        shards = self.shard_map["shards"]
+        self.paths = [str(self.shard_map_path.parent / s["path"]) for s in shards]
+        self.offsets = [s["offset"] for s in shards]
+        self.ntotal = int(self.shard_map["ntotal"])
+        self.d = int(self.shard_map["dim"])
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool = None
+        self._indexes = []
+        self._procs = {}
+        self._idle: List[queue.Queue] = []
+        self._live: List[int] = []
+        self._omp_threads = 1
+        self._searches = 0
+        self._restarts = 0
+
+        if mode == "thread":
+            self._indexes = [load_index(p, ef_search=ef_search) for p in self.paths]
+
+    @property
+    def n_shards(self) -> int:
+        return len(self.paths)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            # Forked copies of a started coordinator own nothing: start fresh
+            self._procs, self._idle = {}, []
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.n_shards * self.replicas,
+                thread_name_prefix="shard"
+            )
+
+            if self.mode == "process":
+                self._omp_threads = max(1, _cpus() // (self.n_shards * self.replicas))
+                conns = [
+                    [self._start_replica(s) for _ in range(self.replicas)]
+                    for s in range(self.n_shards)
+                ]
+
+                # Replicas load their shard in parallel; wait for all
+                for shard_conns in conns:
+                    idle = queue.Queue()
+                    for conn in shard_conns:
+                        conn.recv()
+                        idle.put(conn)
+                    self._idle.append(idle)
+                self._live = [self.replicas] * self.n_shards
+
+            self._pid = os.getpid()
+
+    def _start_replica(self, s: int):
+        parent, child = _MP.Pipe()
+        proc = _MP.Process(
+            target=_replica_main,
+            args=(child, self.paths[s], self.ef_search, self._omp_threads),
+            daemon=True
+        )
+        proc.start()
+        child.close()
+        # conn → process, so a failed conn can be traced to its replica
+        self._procs[parent] = proc
+        return parent
+
+    def _replace_replica(self, s: int, dead):
+        """
+        Runs on its own thread: reap a dead replica and start another,
+        which joins the idle pool once it has loaded the shard.
+        """
+        dead.close()
+        with self._lock:
+            proc = self._procs.pop(dead)
+            self._restarts += 1
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.kill()
+
+        with self._lock:
+            conn = self._start_replica(s)
+        try:
+            conn.recv()
+        except (EOFError, OSError):
+            conn.close()
+            with self._lock:
+                proc = self._procs.pop(conn)
+                self._live[s] -= 1
+            proc.join(timeout=5)
+            print(f"⚠️  Shard {s} replica failed to restart ({self._live[s]} live)")
+            return
+        self._idle[s].put(conn)
+
+    def _take_replica(self, s: int):
+        while True:
+            try:
+                return self._idle[s].get(timeout=0.5)
+            except queue.Empty:
+                if self._live[s] == 0:
+                    raise RuntimeError(f"No live replica for shard {s}")
+
+    def _search_shard(self, s: int, xq: np.ndarray, k: int):
+        if self.mode == "thread":
+            return self._indexes[s].search(xq, k)
+
+        # Fail over at most once per replica, then give up
+        for _ in range(self.replicas + 1):
+            conn = self._take_replica(s)
+            try:
+                conn.send((xq, k))
+                result = conn.recv()
+            except (EOFError, OSError):
+                # Dead replica: its pipe never goes back to the pool
+                print(f"⚠️  Shard {s} replica died; restarting it")
+                threading.Thread(
+                    target=self._replace_replica, args=(s, conn), daemon=True
+                ).start()
+                continue
+
+            self._idle[s].put(conn)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        raise RuntimeError(f"Shard {s}: every replica tried failed")
+
+    def search(self, xq: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        self._ensure_started()
+        xq = np.ascontiguousarray(xq, dtype="float32")
+
+        futures = [
+            self._pool.submit(self._search_shard, s, xq, k)
+            for s in range(self.n_shards)
+        ]
+        parts = [f.result() for f in futures]
+
+        with self._lock:
+            self._searches += 1
+
+        return merge_topk(parts, self.offsets, k)
+
+    def stats(self) -> dict:
+        with self._lock:
+            searches = self._searches
+        return {
+            "mode": self.mode,
+            "replicas": self.replicas,
+            "searches": searches,
+            "replica_restarts": self._restarts,
+            "shards": [
+                {"path": s["path"], "offset": s["offset"], "ntotal": s["ntotal"]}
+                for s in self.shard_map["shards"]
+            ]
+        }
+
+    def close(self):
+        """
+        Stop replica processes (process mode) and the scatter pool.
+        """
+        if self._pid != os.getpid():
+            return
+        stopping = []
+        for idle in self._idle:
+            while not idle.empty():
+                conn = idle.get()
+                try:
+                    conn.send(None)
+                    stopping.append(self._procs[conn])
+                except (BrokenPipeError, OSError):
+                    pass
+        for proc in list(self._procs.values()):
+            if proc in stopping:
+                proc.join(timeout=5)
+            # Busy, or a replacement still loading its shard
+            if proc.is_alive():
+                proc.terminate()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self._pid = None
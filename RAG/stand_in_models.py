@@ -0,0 +1,173 @@
+import re
+import zlib
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+from RAG import models
+
+
+# ===== CONFIG =====
+DIM = 384                   # same as all-MiniLM-L6-v2, so index sizes match
+VOCAB = 1 << 15
+MAX_SEQ_LENGTH = 256
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _token_ids(text: str, limit: int = MAX_SEQ_LENGTH) -> List[int]:
+    # crc32, not hash(): ids must not change with PYTHONHASHSEED
+    return [
+        2 + zlib.crc32(w.encode("utf-8")) % (VOCAB - 2)
+        for w in _WORD_RE.findall(text.lower())[:limit]
+    ]
+
+
+class HashEncoder:
+    """
+    SentenceTransformer stand-in: mean of random word vectors. Cost grows
+    with tokens like a real encoder, and similar texts get similar
+    vectors, but there is nothing to download.
+    """
+
+    max_seq_length = MAX_SEQ_LENGTH
+    tokenizer = None        # embeddings_free estimates lengths from characters
+
+    def __init__(self, dim: int = DIM, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.table = (rng.standard_normal((VOCAB, dim)) / np.sqrt(dim)).astype("float32")
+
+    def encode(
+        self,
+        texts: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+
+        out = np.zeros((len(texts), self.table.shape[1]), dtype="float32")
+        for i, text in enumerate(texts):
+            ids = _token_ids(text, self.max_seq_length)
+            if ids:
+                out[i] = self.table[ids].mean(axis=0)
+
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out[0] if single else out
+
+
+class HashCrossEncoder:
+    """
+    CrossEncoder stand-in: cosine of the HashEncoder vectors of query and
+    passage, encoded together per pair like a real cross-encoder.
+    """
+
+    def __init__(self, seed: int = 1):
+        self.encoder = HashEncoder(seed=seed)
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if not pairs:
+            return np.zeros(0, dtype="float32")
+        queries = self.encoder.encode([q for q, _ in pairs], normalize_embeddings=True)
+        passages = self.encoder.encode([p for _, p in pairs], normalize_embeddings=True)
+        return (queries * passages).sum(axis=1)
+
+
+class HashTokenizer:
+    """
+    Just enough of a Hugging Face tokenizer for llm_flan_t5 and
+    TextIteratorStreamer: word-level ids, padding, truncation, decode.
+    """
+
+    pad_token_id = 0
+    eos_token_id = 1
+
+    def _encode(self, text: str, add_special_tokens: bool, max_length) -> List[int]:
+        ids = _token_ids(text, limit=1 << 30)
+        if add_special_tokens:
+            ids.append(self.eos_token_id)
+        if max_length is not None:
+            ids = ids[:max_length]
+        return ids
+
+    def __call__(
+        self,
+        text,
+        return_tensors=None,
+        padding=False,
+        truncation=False,
+        max_length=None,
+        add_special_tokens=True,
+        **kwargs
+    ) -> dict:
+        single = isinstance(text, str)
+        ids = [
+            self._encode(t, add_special_tokens, max_length if truncation else None)
+            for t in ([text] if single else text)
+        ]
+
+        if return_tensors != "pt":
+            return {"input_ids": ids[0] if single else ids}
+
+        import torch
+
+        width = max(len(i) for i in ids)
+        return {
+            "input_ids": torch.tensor([i + [self.pad_token_id] * (width - len(i)) for i in ids]),
+            "attention_mask": torch.tensor([[1] * len(i) + [0] * (width - len(i)) for i in ids])
+        }
+
+    def decode(self, ids, skip_special_tokens: bool = False, **kwargs) -> str:
+        ids = [int(i) for i in ids]
+        if skip_special_tokens:
+            ids = [i for i in ids if i > self.eos_token_id]
+        return " ".join(f"w{i}" for i in ids)
+
+    def batch_decode(self, sequences, **kwargs) -> List[str]:
+        return [self.decode(s, **kwargs) for s in sequences]
+
+
+def tiny_t5():
+    """
+    (tokenizer, model): a randomly initialised 2-layer T5. Needs torch and
+    transformers but no download. EOS is disabled so every call decodes
+    exactly max_new_tokens tokens and timings are comparable.
+    """
+    import torch
+    from transformers import T5Config, T5ForConditionalGeneration
+
+    torch.manual_seed(0)
+    config = T5Config(
+        vocab_size=VOCAB,
+        d_model=64,
+        d_kv=16,
+        d_ff=128,
+        num_layers=2,
+        num_decoder_layers=2,
+        num_heads=4,
+        pad_token_id=HashTokenizer.pad_token_id,
+        eos_token_id=HashTokenizer.eos_token_id,
+        decoder_start_token_id=HashTokenizer.pad_token_id
+    )
+    model = T5ForConditionalGeneration(config).eval()
+    model.generation_config.eos_token_id = None
+    return HashTokenizer(), model
+
+
+def use_stand_ins():
+    """
+    Replace the embed / rerank / llm loaders with the stand-ins. Call
+    before any model is loaded. Process-pool embedding workers still load
+    the real encoder, so keep RAG_EMBED_PROCESSES=0 with stand-ins.
+    """
+    # Import first: each module registers its real loader at import time
+    import RAG.embeddings_free  # noqa: F401
+    import RAG.reranker_cross_encoder  # noqa: F401
+    import RAG.llm_flan_t5  # noqa: F401
+
+    models.register("embed", HashEncoder)
+    models.register("rerank", HashCrossEncoder)
+    models.register("llm", tiny_t5)
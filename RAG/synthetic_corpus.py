@@ -0,0 +1,215 @@
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+
+# ===== CONFIG =====
+VOCAB_SIZE = 20_000
+N_TOPICS = 64
+TOPIC_WORDS = 200           # topic-specific slice of the vocabulary
+TOPIC_SHARE = 0.4           # fraction of a chunk's words drawn from its topic
+ZIPF_EXPONENT = 1.1
+
+N_CLUSTERS = 256
+CLUSTER_SPREAD = 0.6        # noise norm relative to the (unit) centre
+VECTOR_BLOCK_ROWS = 4096
+
+
+def _vocabulary(size: int = VOCAB_SIZE) -> np.ndarray:
+    """
+    Pronounceable pseudo-words, so tokenizers split them like real text.
+    """
+    syllables = [c + v for c in "bcdfghklmnprstvz" for v in "aeiou"]
+    words = []
+    for i in range(size):
+        parts, x = [], i
+        while True:
+            parts.append(syllables[x % len(syllables)])
+            x //= len(syllables)
+            if not x:
+                break
+        words.append("".join(parts))
+    return np.array(words)
+
+
+_VOCAB = _vocabulary()
+
+# Zipf weights over the shared vocabulary
+_WEIGHTS = 1.0 / np.arange(1, VOCAB_SIZE + 1) ** ZIPF_EXPONENT
+_WEIGHTS /= _WEIGHTS.sum()
+
+
+def _topic_slice(topic: int) -> np.ndarray:
+    start = (topic * TOPIC_WORDS) % (VOCAB_SIZE - TOPIC_WORDS)
+    return _VOCAB[start:start + TOPIC_WORDS]
+
+
+def _sentence_text(rng: np.random.Generator, topic: int, n_words: int) -> str:
+    topical = rng.random(n_words) < TOPIC_SHARE
+    words = np.where(
+        topical,
+        rng.choice(_topic_slice(topic), n_words),
+        _VOCAB[rng.choice(VOCAB_SIZE, n_words, p=_WEIGHTS)]
+    )
+
+    out, i = [], 0
+    while i < n_words:
+        length = int(rng.integers(6, 18))
+        sentence = " ".join(words[i:i + length])
+        out.append(sentence[:1].upper() + sentence[1:] + ".")
+        i += length
+    return " ".join(out)
+
+
+def synthetic_texts(
+    n: int,
+    seed: int = 0,
+    mean_words: float = 90.0
+) -> List[str]:
+    """
+    n chunk-like texts with log-normal lengths (short headings to long
+    paragraphs). Each text is about one of N_TOPICS topics, so queries
+    from synthetic_queries() have real matches.
+    """
+    return list(iter_synthetic_texts(n, seed, mean_words))
+
+
+def iter_synthetic_texts(
+    n: int,
+    seed: int = 0,
+    mean_words: float = 90.0
+) -> Iterator[str]:
+    rng = np.random.default_rng(seed)
+    sigma = 0.8
+    mu = np.log(mean_words) - sigma ** 2 / 2
+
+    for _ in range(n):
+        n_words = int(min(rng.lognormal(mu, sigma), 600)) + 3
+        yield _sentence_text(rng, int(rng.integers(N_TOPICS)), n_words)
+
+
+def synthetic_queries(n: int, seed: int = 1) -> List[str]:
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(n):
+        words = rng.choice(_topic_slice(int(rng.integers(N_TOPICS))), int(rng.integers(3, 9)))
+        queries.append("What is " + " ".join(words) + "?")
+    return queries
+
+
+def synthetic_documents(
+    n_docs: int,
+    chars_per_doc: int,
+    seed: int = 0
+) -> List[dict]:
+    """
+    Documents in the shape ingest produces: text plus page blocks with
+    character offsets (~600 chars per block, ~5 blocks per page).
+    """
+    rng = np.random.default_rng(seed)
+    docs = []
+
+    for d in range(n_docs):
+        parts, blocks = [], []
+        cursor = 0
+        while cursor < chars_per_doc:
+            text = _sentence_text(rng, int(rng.integers(N_TOPICS)), int(rng.integers(40, 140)))
+            text += ["\n", "\n\n"][int(rng.integers(2))]
+            parts.append(text)
+            blocks.append({
+                "start": cursor,
+                "end": cursor + len(text),
+                "page": len(blocks) // 5 + 1,
+                "type": "text"
+            })
+            cursor += len(text)
+
+        docs.append({
+            "doc_id": f"synthetic_{d}",
+            "source_path": f"synthetic_{d}.pdf",
+            "text": "".join(parts),
+            "blocks": blocks
+        })
+
+    return docs
+
+
+def write_synthetic_pdfs(
+    out_dir: Path,
+    n_docs: int,
+    pages_per_doc: int,
+    seed: int = 0
+) -> List[Path]:
+    """
+    Text-only PDFs (no images, so no OCR) for extraction benchmarks.
+    """
+    import fitz  # PyMuPDF
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+
+    for d in range(n_docs):
+        pdf = fitz.open()
+        for _ in range(pages_per_doc):
+            page = pdf.new_page()
+            text = _sentence_text(rng, int(rng.integers(N_TOPICS)), 450)
+            page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontsize=9)
+
+        path = out_dir / f"synthetic_{d}.pdf"
+        pdf.save(path)
+        pdf.close()
+        paths.append(path)
+
+    return paths
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def cluster_centres(dim: int, n_clusters: int = N_CLUSTERS, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return _normalize(rng.standard_normal((n_clusters, dim))).astype("float32")
+
+
+def iter_synthetic_vectors(
+    n: int,
+    dim: int = 384,
+    seed: int = 0,
+    batch_rows: int = 65536,
+    centres: Optional[np.ndarray] = None
+) -> Iterator[np.ndarray]:
+    """
+    L2-normalized vectors around shared cluster centres, in batches, so
+    1M x 384 float32 never has to sit in memory twice. Clustered data
+    makes HNSW recall behave like real embeddings (uniform random
+    vectors are unrealistically hard).
+    """
+    centres = cluster_centres(dim) if centres is None else centres
+
+    def block(b: int) -> np.ndarray:
+        # Seeded per block: row i is the same whatever batch_rows is
+        rng = np.random.default_rng([seed, b])
+        rows = min(VECTOR_BLOCK_ROWS, n - b * VECTOR_BLOCK_ROWS)
+        assign = rng.integers(len(centres), size=rows)
+        noise = rng.standard_normal((rows, dim)).astype("float32")
+        noise *= CLUSTER_SPREAD / np.sqrt(dim)
+        return _normalize(centres[assign] + noise).astype("float32")
+
+    pending, pending_rows = [], 0
+    for b in range(-(-n // VECTOR_BLOCK_ROWS)):
+        pending.append(block(b))
+        pending_rows += len(pending[-1])
+        while pending_rows >= batch_rows:
+            merged = np.concatenate(pending)
+            yield merged[:batch_rows]
+            pending = [merged[batch_rows:]]
+            pending_rows -= batch_rows
+    if pending_rows:
+        yield np.concatenate(pending)
+
+
+def synthetic_vectors(n: int, dim: int = 384, seed: int = 0) -> np.ndarray:
+    return np.concatenate(list(iter_synthetic_vectors(n, dim, seed)) or [np.zeros((0, dim), "float32")])
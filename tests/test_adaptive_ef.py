@@ -0,0 +1,98 @@
+import threading
+
+import faiss
+import numpy as np
+import pytest
+
+import RAG.faiss_hnsw as faiss_hnsw
+from RAG.faiss_hnsw import get_ef_search, search_index, search_with_ef, set_search_params
+from RAG.retriever import adaptive_dense_search
+
+
+DIM = 16
+
+
+@pytest.fixture(params=["detected", "fallback"])
+def per_call(request, monkeypatch):
+    # "fallback" forces the raise-and-restore path even on builds that
+    # honor per-call parameters
+    if request.param == "fallback":
+        monkeypatch.setattr(faiss_hnsw, "_per_call_ef", False)
+    return request.param
+
+
+def graph(n: int = 3000, ef: int = 10, factory: str = "HNSW4"):
+    xb = np.random.default_rng(0).standard_normal((n, DIM)).astype("float32")
+    index = faiss.index_factory(DIM, factory, faiss.METRIC_INNER_PRODUCT)
+    index.train(xb)
+    index.add(xb)
+    set_search_params(index, ef_search=ef)
+    return index
+
+
+def at_ef(index, xq, k, ef):
+    reference = faiss.clone_index(index)
+    set_search_params(reference, ef_search=ef)
+    return reference.search(xq, k)
+
+
+@pytest.mark.parametrize("factory", ["HNSW4", "PCA8,HNSW4", "HNSW4,RFlat"])
+def test_search_with_ef_leaves_the_index_unchanged(per_call, factory):
+    index = graph(factory=factory)
+    xq = np.random.default_rng(1).standard_normal((20, DIM)).astype("float32")
+
+    scores, ids = search_with_ef(index, xq, 10, 256)
+
+    ref_scores, ref_ids = at_ef(index, xq, 10, 256)
+    np.testing.assert_array_equal(ids, ref_ids)
+    np.testing.assert_allclose(scores, ref_scores, rtol=1e-6)
+    assert get_ef_search(index) == 10
+
+
+def test_escalation_does_not_leak_into_concurrent_searches(per_call):
+    index = graph()
+    rng = np.random.default_rng(2)
+    xq = rng.standard_normal((8, DIM)).astype("float32")
+    baseline = [search_index(index, xq[i:i + 1], 5)[1] for i in range(len(xq))]
+
+    stop = threading.Event()
+
+    def escalate():
+        while not stop.is_set():
+            adaptive_dense_search(index, xq[:1], 5, max_ef_search=512, min_gap=10.0)
+
+    threads = [threading.Thread(target=escalate) for _ in range(2)]
+    for t in threads:
+        t.start()
+    try:
+        for _ in range(50):
+            for i in range(len(xq)):
+                np.testing.assert_array_equal(search_index(index, xq[i:i + 1], 5)[1], baseline[i])
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    assert get_ef_search(index) == 10
+
+
+def test_adaptive_search_stops_at_the_cap():
+    index = graph()
+    q = np.random.default_rng(3).standard_normal((1, DIM)).astype("float32")
+
+    # A gap no boundary can clear: doubles 10 → 20 → … → capped at 64
+    ids, raised_to = adaptive_dense_search(index, q, 5, max_ef_search=64, min_gap=10.0)
+
+    assert raised_to == 64
+    assert ids == [int(i) for i in at_ef(index, q, 6, 64)[1][0][:5]]
+    assert get_ef_search(index) == 10
+
+
+def test_flat_index_is_searched_once():
+    index = graph(factory="Flat")
+    q = np.random.default_rng(4).standard_normal((1, DIM)).astype("float32")
+
+    ids, raised_to = adaptive_dense_search(index, q, 5, max_ef_search=512, min_gap=10.0)
+
+    assert raised_to is None
+    assert ids == [int(i) for i in index.search(q, 5)[1][0]]
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+from RAG.batching import MicroBatcher
+
+
+def test_results_keep_submission_order():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=50)
+    try:
+        futures = [batcher.submit(i) for i in range(10)]
+        assert [f.result(timeout=5) for f in futures] == [i * 2 for i in range(10)]
+        assert all(len(b) <= 4 for b in batches)
+        assert sum(len(b) for b in batches) == 10
+    finally:
+        batcher.stop()
+
+
+def test_batch_fn_error_reaches_every_caller():
+    def fail(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(fail, max_batch_size=4, max_wait_ms=20)
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        for f in futures:
+            assert isinstance(f.exception(timeout=5), ValueError)
+    finally:
+        batcher.stop()
+
+
+def test_cancelled_caller_does_not_kill_the_worker():
+    gate = threading.Event()
+
+    def gated(items):
+        gate.wait(5)
+        return list(items)
+
+    batcher = MicroBatcher(gated, max_batch_size=1, max_wait_ms=0)
+
+    async def scenario():
+        # The worker is busy with the first item; the second waits in the queue
+        busy = asyncio.ensure_future(batcher.run("busy"))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(batcher.run("gone"))
+        await asyncio.sleep(0.05)
+
+        # Client disconnect: the request task is cancelled
+        queued.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+
+        assert await busy == "busy"
+        return await asyncio.wait_for(batcher.run("after"), timeout=5)
+
+    try:
+        assert asyncio.run(scenario()) == "after"
+        assert all(t.is_alive() for t in batcher._threads)
+    finally:
+        batcher.stop()
+
+
+def test_cancel_while_running_still_completes_others():
+    started = threading.Event()
+    gate = threading.Event()
+
+    def gated(items):
+        started.set()
+        gate.wait(5)
+        return list(items)
+
+    batcher = MicroBatcher(gated, max_batch_size=2, max_wait_ms=200)
+
+    async def scenario():
+        a = asyncio.ensure_future(batcher.run("a"))
+        b = asyncio.ensure_future(batcher.run("b"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        a.cancel()
+        gate.set()
+        assert await b == "b"
+        return await asyncio.wait_for(batcher.run("c"), timeout=5)
+
+    try:
+        t0 = time.monotonic()
+        assert asyncio.run(scenario()) == "c"
+        assert time.monotonic() - t0 < 5
+    finally:
+        batcher.stop()
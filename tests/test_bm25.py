@@ -0,0 +1,117 @@
+import random
+
+import faiss
+import numpy as np
+import pytest
+
+from RAG.bm25 import BM25Index, tokenize
+from RAG.retriever import hybrid_search, hybrid_search_batch, reciprocal_rank_fusion
+
+
+VOCAB = [f"w{i}" for i in range(200)]
+
+
+def corpus(n_docs: int = 300, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(VOCAB, k=rng.randint(5, 40))) for _ in range(n_docs)]
+
+
+def queries(n: int = 40, seed: int = 1):
+    rng = random.Random(seed)
+    qs = [" ".join(rng.choices(VOCAB, k=rng.randint(1, 4))) for _ in range(n)]
+    return qs + ["", "the of and", "unseen-term"]
+
+
+def test_search_batch_matches_exhaustive_scoring():
+    texts = corpus()
+    bm25 = BM25Index.build(texts)
+    qs = queries()
+
+    batched = bm25.search_batch(qs, k=10)
+
+    assert len(batched) == len(qs)
+    for q, (scores, ids) in zip(qs, batched):
+        # Reference: score every doc densely, ties to the lower id
+        dense = np.zeros(len(texts), dtype="float32")
+        for term in {bm25.vocab[t] for t in tokenize(q) if t in bm25.vocab}:
+            lo, hi = bm25.term_offsets[term], bm25.term_offsets[term + 1]
+            dense[bm25.doc_ids[lo:hi]] += bm25.idf[term] * bm25.weights[lo:hi]
+        ref_ids = np.lexsort((np.arange(len(texts)), -dense))[:10]
+        ref_ids = ref_ids[dense[ref_ids] > 0]
+
+        assert ids.tolist() == ref_ids.tolist()
+        np.testing.assert_allclose(scores, dense[ref_ids])
+        assert ids.dtype == np.int64
+
+    # The shared scratch array is reset between queries
+    assert [r[1].tolist() for r in batched] == [bm25.search(q, 10)[1].tolist() for q in qs]
+
+
+def test_search_batch_k_larger_than_corpus():
+    bm25 = BM25Index.build(["alpha beta", "beta gamma", "delta"])
+    (scores, ids), = bm25.search_batch(["beta"], k=10)
+
+    assert sorted(ids.tolist()) == [0, 1]
+    assert (scores > 0).all()
+
+
+def test_hybrid_search_batch_matches_single_queries():
+    texts = corpus(200)
+    bm25 = BM25Index.build(texts)
+    rng = np.random.default_rng(0)
+    xb = rng.standard_normal((len(texts), 16)).astype("float32")
+    index = faiss.IndexFlatIP(16)
+    index.add(xb)
+
+    qs = queries(10)
+    xq = rng.standard_normal((len(qs), 16)).astype("float32")
+    batched = hybrid_search_batch(qs, xq, index, bm25, k=10)
+
+    for i, q in enumerate(qs):
+        assert batched[i][:10] == hybrid_search(q, xq[i:i + 1], index, bm25, k=10)
+
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("See section 4.2.1 and form HR-101 for the I-9") == [
+        "see", "section", "4.2.1", "4", "2", "1", "form", "hr-101", "hr", "101", "i-9", "i", "9"
+    ]
+
+
+def test_exact_term_outranks_partial_matches():
+    bm25 = BM25Index.build([
+        "general leave policy overview",
+        "form hr-101 covers parental leave requests",
+        "hr contacts and office hours",
+        "leave balances are shown in the portal"
+    ])
+    _, ids = bm25.search("hr-101 leave", k=4)
+
+    assert ids[0] == 1
+    assert set(ids.tolist()) == {0, 1, 2, 3}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    bm25 = BM25Index.build(corpus(50))
+    bm25.save(tmp_path / "bm25.npz")
+    loaded = BM25Index.load(tmp_path / "bm25.npz")
+
+    assert loaded.vocab == bm25.vocab and loaded.n_docs == bm25.n_docs
+    for q in queries(10):
+        np.testing.assert_array_equal(loaded.search(q, 5)[1], bm25.search(q, 5)[1])
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 2, 4]])
+    ids = [idx for idx, _ in fused]
+
+    # 2 and 3 appear in both lists and beat ids from one list only
+    assert ids == [3, 2, 1, 4]
+    assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_rrf_single_ranking_keeps_its_order():
+    fused = reciprocal_rank_fusion([[7, 3, 9], []])
+
+    assert [idx for idx, _ in fused] == [7, 3, 9]
+    assert [s for _, s in fused] == pytest.approx([1 / 61, 1 / 62, 1 / 63])
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import RAG.build_index as build_index
+from RAG.chunk_store import write_chunk_store
+from RAG.embeddings_free import MODEL_ID
+
+
+CHUNKS = [
+    {"chunk_id": f"doc0::chunk_{i}", "doc_id": "doc0", "source_path": None, "text": f"clause {i}", "page": 1}
+    for i in range(3)
+]
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    for name, path in (
+        ("INDEX_PATH", tmp_path / "policy_hnsw.index"),
+        ("SHARD_MAP_PATH", tmp_path / "shards.json"),
+        ("MANIFEST_PATH", tmp_path / "manifest.json"),
+        ("CHUNK_STORE_DIR", tmp_path / "chunks.store"),
+        ("CHUNKS_PATH", tmp_path / "chunks.json")
+    ):
+        monkeypatch.setattr(build_index, name, path)
+
+    write_chunk_store(CHUNKS, tmp_path / "chunks.store")
+    (tmp_path / "manifest.json").write_text(json.dumps({
+        "model": MODEL_ID,
+        "documents": [{"doc_id": "doc0", "sha256": "x", "chunk_count": len(CHUNKS)}]
+    }))
+    return tmp_path
+
+
+@pytest.mark.parametrize("index_file", ["policy_hnsw.index", "shards.json"])
+def test_single_or_sharded_build_is_reusable(artifacts, index_file):
+    (artifacts / index_file).write_text("{}")
+
+    manifest, chunks = build_index.load_previous_build()
+
+    assert manifest["documents"][0]["doc_id"] == "doc0"
+    assert [c["chunk_id"] for c in chunks] == [c["chunk_id"] for c in CHUNKS]
+
+
+def test_manifest_without_an_index_is_not_reusable(artifacts):
+    assert build_index.load_previous_build() == (None, None)
@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+
+import RAG.cache as cache_module
+from RAG.cache import LRUCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1     # "b" is now the oldest
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_put_existing_key_refreshes_recency():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+
+    assert cache.get("a") == 10
+    assert cache.get("b") is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LRUCache(max_size=10, ttl_seconds=5)
+    cache.put("a", 1)
+
+    clock.now += 5
+    assert cache.get("a") == 1      # exactly at the TTL is still fresh
+
+    clock.now += 0.1
+    assert cache.get("a", "gone") == "gone"
+    assert len(cache) == 0
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 1, 1)
+
+
+def test_put_restarts_the_ttl(clock):
+    cache = LRUCache(max_size=10, ttl_seconds=5)
+    cache.put("a", 1)
+    clock.now += 4
+    cache.put("a", 2)
+    clock.now += 4
+
+    assert cache.get("a") == 2
+
+
+@pytest.mark.parametrize("ttl", [0, None])
+def test_zero_or_no_ttl_never_expires(clock, ttl):
+    cache = LRUCache(max_size=10, ttl_seconds=ttl)
+    cache.put("a", 1)
+    clock.now += 1e9
+
+    assert cache.get("a") == 1
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        LRUCache(max_size=0)
+
+
+def test_concurrent_puts_respect_max_size():
+    cache = LRUCache(max_size=50)
+
+    def writer(offset):
+        for i in range(1000):
+            cache.put((offset, i), i)
+            cache.get((offset, i - 1))
+
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = cache.stats()
+    assert len(cache) == 50
+    assert stats["evictions"] == 4000 - 50
+
+
+def test_normalize_query_folds_case_and_whitespace():
+    assert normalize_query("  What IS\tthe\n\nPTO  policy ") == "what is the pto policy"
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from RAG.Chunking import chunk_document
+from RAG.chunk_store import ChunkStore, convert_json, is_chunk_store, write_chunk_store
+
+
+def make_chunks():
+    text = " ".join(f"Clause {i}: employees accrue 1.5 days — café naïve ✓." for i in range(300))
+    chunks = []
+    for d in range(2):
+        doc = {
+            "doc_id": f"doc{d}",
+            "source_path": f"/docs/doc{d}.pdf",
+            "text": text,
+            "blocks": [{"start": 0, "end": len(text), "page": d + 1, "type": "text"}]
+        }
+        chunks.extend(chunk_document(doc))
+
+    chunks.append({
+        "chunk_id": "loose::chunk_0",
+        "doc_id": "loose",
+        "source_path": None,
+        "text": "",
+        "page": None,
+        "content_type": "table"
+    })
+    return chunks
+
+
+def test_round_trip_preserves_every_chunk(tmp_path):
+    chunks = make_chunks()
+    write_chunk_store(chunks, tmp_path / "store")
+    store = ChunkStore(tmp_path / "store")
+
+    assert is_chunk_store(tmp_path / "store")
+    assert len(store) == len(chunks)
+    assert list(store) == chunks
+    assert store[-1] == chunks[-1]
+    assert store.text(3) == chunks[3]["text"]
+    assert store.chunk_id(0) == chunks[0]["chunk_id"]
+
+
+def test_overlap_bytes_are_shared_within_a_document(tmp_path):
+    chunks = make_chunks()
+    write_chunk_store(chunks, tmp_path / "store")
+
+    text_bytes = (tmp_path / "store" / "text.bin").stat().st_size
+    full_bytes = sum(len(c["text"].encode("utf-8")) for c in chunks)
+    assert text_bytes < full_bytes
+
+
+def test_out_of_range_raises_index_error(tmp_path):
+    write_chunk_store(make_chunks()[:2], tmp_path / "store")
+    store = ChunkStore(tmp_path / "store")
+
+    with pytest.raises(IndexError):
+        store[2]
+    with pytest.raises(IndexError):
+        store[-3]
+
+
+def test_empty_store(tmp_path):
+    write_chunk_store([], tmp_path / "store")
+    store = ChunkStore(tmp_path / "store")
+
+    assert len(store) == 0
+    assert list(store) == []
+
+
+def test_rewrite_replaces_the_previous_store(tmp_path):
+    chunks = make_chunks()
+    write_chunk_store(chunks, tmp_path / "store")
+    write_chunk_store(chunks[:3], tmp_path / "store")
+
+    assert list(ChunkStore(tmp_path / "store")) == chunks[:3]
+    assert not (tmp_path / "store.tmp").exists()
+
+
+def test_convert_json(tmp_path):
+    chunks = make_chunks()
+    json_path = tmp_path / "chunks.json"
+    json_path.write_text(json.dumps(chunks), encoding="utf-8")
+
+    assert convert_json(json_path, tmp_path / "store") == len(chunks)
+    assert list(ChunkStore(tmp_path / "store")) == chunks
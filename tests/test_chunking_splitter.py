@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from RAG.Chunking import SpanSplitter, chunk_document
+
+
+def random_text(seed: int, n_words: int = 3000) -> str:
+    rng = random.Random(seed)
+    words = []
+    for _ in range(n_words):
+        words.append("".join(rng.choice("abcdefghij") for _ in range(rng.randint(1, 12))))
+        r = rng.random()
+        if r < 0.02:
+            words.append("\n\n")
+        elif r < 0.05:
+            words.append(".\n")
+        elif r < 0.1:
+            words.append(". ")
+    return " ".join(words)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_spans_are_stripped_slices_within_the_size_bound(seed):
+    splitter = SpanSplitter(chunk_size=300, chunk_overlap=50)
+    text = random_text(seed)
+    spans = list(splitter.split_spans(text))
+
+    assert spans
+    for start, end in spans:
+        assert 0 <= start < end <= len(text)
+        assert end - start <= splitter.chunk_size + splitter.chunk_overlap
+        assert text[start:end] == text[start:end].strip()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_spans_cover_every_non_space_character(seed):
+    splitter = SpanSplitter(chunk_size=300, chunk_overlap=50)
+    text = random_text(seed)
+    covered = bytearray(len(text))
+    for start, end in splitter.split_spans(text):
+        covered[start:end] = b"\x01" * (end - start)
+
+    assert all(covered[i] or c.isspace() for i, c in enumerate(text))
+
+
+def test_overlap_reaches_into_the_previous_chunk():
+    text = "A" * 1000 + "\n\n" + "B" * 1000
+    spans = list(SpanSplitter(chunk_size=1200, chunk_overlap=200).split_spans(text))
+
+    assert spans[0] == (0, 1000)
+    assert spans[1][1] == len(text)
+    assert text[spans[1][0]:spans[1][1]].startswith("A" * 198 + "\n\n" + "B")
+
+
+def test_wide_whitespace_gap_is_not_pulled_into_the_next_chunk():
+    text = "A" * 1000 + "\n\n" + " " * 5000 + "\n\n" + "B" * 1000
+    spans = list(SpanSplitter(chunk_size=1200, chunk_overlap=200).split_spans(text))
+
+    assert [text[s:e] for s, e in spans] == ["A" * 1000, "B" * 1000]
+
+
+def test_no_overlap_gives_the_base_spans():
+    text = random_text(7)
+    with_overlap = list(SpanSplitter(chunk_size=300, chunk_overlap=50).split_spans(text))
+    without = list(SpanSplitter(chunk_size=300, chunk_overlap=0).split_spans(text))
+
+    assert [e for _, e in with_overlap] == [e for _, e in without]
+    assert all(s1 <= s2 for (s1, _), (s2, _) in zip(with_overlap, without))
+
+
+def test_chunk_document_text_matches_offsets():
+    text = random_text(3)
+    doc = {
+        "doc_id": "d",
+        "source_path": "d.pdf",
+        "text": text,
+        "blocks": [
+            {"start": 0, "end": len(text) // 2, "page": 1, "type": "text"},
+            {"start": len(text) // 2, "end": len(text), "page": 2, "type": "table"}
+        ]
+    }
+    chunks = chunk_document(doc)
+
+    assert [c["chunk_id"] for c in chunks] == [f"d::chunk_{i}" for i in range(len(chunks))]
+    assert chunks[0]["page"] == 1 and chunks[-1]["page"] == 2
+    assert all(c["text"] in text and len(c["text"]) <= 1400 for c in chunks)
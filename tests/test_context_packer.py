@@ -0,0 +1,116 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from RAG.context_packer import fit_question, pack_context, pack_prompt, split_sentences, strip_overlap
+
+
+DIM = 64
+
+
+def count_words(texts):
+    return [len(t.split()) for t in texts]
+
+
+def count_with_seams(texts):
+    # Joining contexts costs more than the sentences alone, like real
+    # tokenizers charging for separators
+    return [len(t.split()) + 5 * t.count("\n\n") + 1 for t in texts]
+
+
+def embed(texts):
+    """
+    Bag of words hashed into DIM buckets, L2-normalized.
+    """
+    out = np.zeros((len(texts), DIM), dtype="float32")
+    for row, text in enumerate(texts):
+        for word in text.lower().replace(".", " ").split():
+            out[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % DIM] += 1
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.maximum(norms, 1e-9)
+
+
+CONTEXTS = [
+    "Employees accrue vacation monthly. Parking is free on weekends. "
+    "Vacation requests need manager approval.",
+    "The cafeteria opens at eight. Unused vacation days carry over to March. "
+    "Badges must be worn at all times."
+]
+
+
+def test_fitting_contexts_are_kept_whole():
+    packed, stats = pack_context("vacation", None, CONTEXTS, 1000, count_words, embed)
+
+    assert packed == "\n\n".join(CONTEXTS)
+    assert stats["sentences_total"] == 0
+
+
+@pytest.mark.parametrize("budget", [0, 3, 8, 12, 20, 30])
+@pytest.mark.parametrize("count_tokens", [count_words, count_with_seams])
+def test_packed_context_never_exceeds_the_budget(budget, count_tokens):
+    packed, stats = pack_context("vacation days", None, CONTEXTS, budget, count_tokens, embed)
+
+    assert not packed or count_tokens([packed])[0] <= budget
+    assert stats["sentences_kept"] <= stats["sentences_total"]
+
+
+def test_relevant_sentences_are_kept_in_document_order():
+    packed, _ = pack_context(
+        "vacation requests and unused vacation days", None, CONTEXTS, 16, count_words, embed
+    )
+
+    assert "Vacation requests need manager approval." in packed
+    assert "Unused vacation days carry over to March." in packed
+    assert "Parking" not in packed and "cafeteria" not in packed
+    assert packed.index("Vacation requests") < packed.index("Unused vacation")
+
+
+def test_q_vec_is_used_instead_of_embedding_the_query():
+    q_vec = embed(["badges worn"])[0]
+    packed, _ = pack_context("ignored", q_vec, CONTEXTS, 7, count_words, embed)
+
+    assert packed == "Badges must be worn at all times."
+
+
+def test_strip_overlap_removes_seams_in_either_order():
+    doc = " ".join(f"sentence number {i} of the policy." for i in range(40))
+    first, second = doc[:700], doc[550:]
+
+    stripped, removed = strip_overlap([first, second])
+    assert removed == 150
+    assert stripped == [first.strip(), doc[700:].strip()]
+
+    stripped, removed = strip_overlap([second, first])
+    assert removed == 150
+    assert stripped == [second.strip(), doc[:550].strip()]
+
+
+def test_short_coincidental_overlap_is_kept():
+    stripped, removed = strip_overlap(["the policy.", "the policy. applies"])
+    assert removed == 0
+    assert stripped == ["the policy.", "the policy. applies"]
+
+
+def test_split_sentences():
+    assert split_sentences("One. Two!  Three?\nFour\n\n") == ["One.", "Two!", "Three?", "Four"]
+
+
+def test_fit_question_keeps_the_end():
+    query = "some long preamble about the company history and then what is the vacation policy"
+
+    assert fit_question(query, 100, count_words) == query
+    assert fit_question(query, 5, count_words) == "what is the vacation policy"
+
+
+def test_pack_prompt_fits_max_tokens():
+    build = lambda q, c: f"question: {q} context: {c}"
+    query = " ".join(["filler"] * 50) + " how long do vacation days carry over"
+
+    fitted, context, stats = pack_prompt(query, None, CONTEXTS * 3, build, count_words, embed, max_tokens=40)
+
+    assert count_words([build(fitted, context)])[0] <= 40
+    assert stats["prompt_tokens"] <= 40
+    assert stats["naive_truncated"]
+    assert fitted.endswith("vacation days carry over")
+    assert "vacation" in context.lower()
@@ -0,0 +1,55 @@
+import json
+import os
+
+from RAG.metrics import (
+    REGISTRY, REQUESTS, CallbackMetric, Counter, Histogram, Registry, render_metrics, write_snapshot
+)
+
+
+def worker_registry(requests: int, latency: float, queue_depth: int) -> Registry:
+    registry = Registry()
+    registry.register(Counter("requests_total", "Requests.", ["endpoint"])).inc(requests, endpoint="/ask")
+    registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))).observe(latency)
+    registry.register(CallbackMetric("queue_depth", "Queued.", [], lambda: {(): queue_depth}))
+    return registry
+
+
+def test_merge_sums_counters_and_histograms_and_labels_gauges_by_pid():
+    a, b = worker_registry(3, 0.05, 7), worker_registry(4, 0.5, 2)
+
+    text = a.render_merged({"101": a.snapshot(), "102": b.snapshot()}, live=["101", "102"])
+
+    assert 'requests_total{endpoint="/ask"} 7' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert "latency_seconds_count 2" in text
+    assert 'queue_depth{pid="101"} 7' in text
+    assert 'queue_depth{pid="102"} 2' in text
+
+
+def test_dead_workers_keep_their_counts_but_not_their_gauges():
+    a, b = worker_registry(3, 0.05, 7), worker_registry(4, 0.5, 2)
+
+    text = a.render_merged({"101": a.snapshot(), "102": b.snapshot()}, live=["101"])
+
+    assert 'requests_total{endpoint="/ask"} 7' in text
+    assert 'queue_depth{pid="102"}' not in text
+
+
+def test_render_metrics_merges_snapshot_files(tmp_path):
+    before = REQUESTS.samples().get(("/ask",), 0)
+    REQUESTS.inc(endpoint="/ask")
+    write_snapshot(str(tmp_path))
+
+    # A worker that has exited (no such pid), and a renamed file of an
+    # earlier process with this pid
+    other = {"rag_requests_total": [[["/ask"], 5]]}
+    (tmp_path / "999999999.json").write_text(json.dumps(other))
+    (tmp_path / f"{os.getpid()}-1.json").write_text(json.dumps(other))
+
+    text = render_metrics(str(tmp_path))
+
+    assert f'rag_requests_total{{endpoint="/ask"}} {before + 1 + 10}' in text
+    assert f'pid="{os.getpid()}"' in text
+    assert 'pid="999999999"' not in text
+    assert REGISTRY.render().count("rag_requests_total{") == text.count("rag_requests_total{")
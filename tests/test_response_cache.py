@@ -0,0 +1,263 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from RAG.response_cache import (
+    InProcessBackend,
+    RedisBackend,
+    SemanticResponseCache,
+    SingleFlight
+)
+
+
+class FakeRedis:
+    """
+    Dict-backed stand-in for the redis-py calls RedisBackend makes.
+    Like redis-py without decode_responses, it hands back bytes.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.zsets = {}
+        self.streams = {}
+        self.ttls = {}
+        self._seq = 0
+
+    @staticmethod
+    def _b(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[self._b(field)] = self._b(value)
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(self._b(field))
+
+    def hmget(self, key, fields):
+        h = self.hashes.get(key, {})
+        return [h.get(self._b(f)) for f in fields]
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key, *fields):
+        h = self.hashes.get(key, {})
+        return sum(h.pop(self._b(f), None) is not None for f in fields)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update({self._b(m): s for m, s in mapping.items()})
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def zpopmin(self, key, count=1):
+        z = self.zsets.get(key, {})
+        popped = sorted(z.items(), key=lambda kv: kv[1])[:count]
+        for member, _ in popped:
+            del z[member]
+        return popped
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self._seq += 1
+        entry_id = f"1-{self._seq}".encode()
+        stream = self.streams.setdefault(key, [])
+        stream.append((entry_id, {self._b(k): self._b(v) for k, v in fields.items()}))
+        if maxlen is not None:
+            del stream[:-maxlen]
+        return entry_id
+
+    @staticmethod
+    def _id(entry_id) -> tuple:
+        return tuple(int(p) for p in FakeRedis._b(entry_id).split(b"-"))
+
+    def xrange(self, key, min="-", max="+", count=None):
+        lo = (0, 0) if min == "-" else self._id(min)
+        hi = (2 ** 64,) if max == "+" else self._id(max)
+        out = [e for e in self.streams.get(key, []) if lo <= self._id(e[0]) <= hi]
+        return out[:count] if count else out
+
+    def xrevrange(self, key, max="+", min="-", count=None):
+        out = self.xrange(key, min, max)[::-1]
+        return out[:count] if count else out
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+
+class Recorder:
+    """
+    Passes commands through to `client`, noting their names.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self.client, name)
+
+
+def unit(*values) -> np.ndarray:
+    v = np.array(values, dtype="float32")
+    return v / np.linalg.norm(v)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return InProcessBackend(max_entries=8)
+    return RedisBackend(FakeRedis(), max_entries=8)
+
+
+def test_threshold_hit_and_miss(backend):
+    cache = SemanticResponseCache(backend, threshold=0.95, version="v1")
+    cache.store(unit(1, 0, 0), {"answer": "a"})
+
+    assert cache.lookup(unit(1, 0.1, 0)) == {"answer": "a"}     # cos ≈ 0.995
+    assert cache.lookup(unit(1, 1, 0)) is None                  # cos ≈ 0.707
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_new_version_does_not_see_old_entries(backend):
+    cache = SemanticResponseCache(backend, threshold=0.9, version="v1")
+    cache.store(unit(0, 1, 0), {"answer": "old"})
+
+    cache.set_version("v2")
+    assert cache.lookup(unit(0, 1, 0)) is None
+
+    cache.store(unit(0, 1, 0), {"answer": "new"})
+    assert cache.lookup(unit(0, 1, 0)) == {"answer": "new"}
+
+
+def test_scopes_are_kept_apart_and_side_by_side(backend):
+    cache = SemanticResponseCache(backend, threshold=0.9, version="v1")
+    cache.store(unit(1, 0, 0), {"answer": "fixed"}, "fixed")
+    assert cache.lookup(unit(1, 0, 0), "adaptive") is None
+
+    cache.store(unit(1, 0, 0), {"answer": "adaptive"}, "adaptive")
+    assert cache.lookup(unit(1, 0, 0), "fixed") == {"answer": "fixed"}
+    assert cache.lookup(unit(1, 0, 0), "adaptive") == {"answer": "adaptive"}
+
+
+def test_redis_keys_are_namespaced_by_version():
+    client = FakeRedis()
+    backend = RedisBackend(client, prefix="t", max_entries=8)
+    backend.add("v1", unit(1, 0), {"answer": "a"})
+    backend.add("v2", unit(1, 0), {"answer": "b"})
+
+    assert backend.search("v1", unit(1, 0))[1] == {"answer": "a"}
+    assert backend.search("v2", unit(1, 0))[1] == {"answer": "b"}
+    assert all(key.startswith(("t:v1:", "t:v2:")) for key in client.ttls)
+
+
+def test_redis_evicts_oldest_entries():
+    client = FakeRedis()
+    backend = RedisBackend(client, prefix="t", max_entries=3)
+    vecs = [unit(*np.eye(5)[i]) for i in range(5)]
+    for i, v in enumerate(vecs):
+        backend.add("v1", v, {"answer": str(i)})
+
+    assert len(client.hashes["t:v1:vecs"]) == 3
+    assert client.zcard("t:v1:order") == 3
+    # The two oldest are gone; the newest are still served
+    assert backend.search("v1", vecs[0])[0] < 0.5
+    assert backend.search("v1", vecs[4]) == pytest.approx((1.0, {"answer": "4"}))
+
+
+def test_redis_search_fetches_only_new_vectors():
+    client = FakeRedis()
+    recorder = Recorder(client)
+    writer = RedisBackend(client, prefix="t", max_entries=3)
+    reader = RedisBackend(recorder, prefix="t", max_entries=3)
+    vecs = [unit(*np.eye(6)[i]) for i in range(6)]
+
+    writer.add("v1", vecs[0], {"answer": "0"})
+    writer.add("v1", vecs[1], {"answer": "1"})
+    assert reader.search("v1", vecs[1]) == pytest.approx((1.0, {"answer": "1"}))
+
+    # Another replica adds (and evicts); the reader catches up from the log
+    for i in range(2, 5):
+        writer.add("v1", vecs[i], {"answer": str(i)})
+    recorder.calls.clear()
+
+    assert reader.search("v1", vecs[4]) == pytest.approx((1.0, {"answer": "4"}))
+    assert recorder.calls == ["xrange", "hmget", "hget"]
+    assert sorted(reader._mirrors["v1"].fields) == sorted(client.hashes["t:v1:vecs"])
+
+    # Evicted entries leave the mirror too
+    assert reader.search("v1", vecs[0])[0] < 0.5
+
+
+def test_redis_mirror_rebuilds_when_the_log_was_trimmed():
+    client = FakeRedis()
+    recorder = Recorder(client)
+    writer = RedisBackend(client, prefix="t", max_entries=8, log_length=2)
+    reader = RedisBackend(recorder, prefix="t", max_entries=8, log_length=2)
+    vecs = [unit(*np.eye(6)[i]) for i in range(6)]
+
+    writer.add("v1", vecs[0], {"answer": "0"})
+    reader.search("v1", vecs[0])
+    for i in range(1, 6):
+        writer.add("v1", vecs[i], {"answer": str(i)})
+    recorder.calls.clear()
+
+    assert reader.search("v1", vecs[3]) == pytest.approx((1.0, {"answer": "3"}))
+    assert "hgetall" in recorder.calls
+    assert len(reader._mirrors["v1"].fields) == 6
+
+
+def test_single_flight_coalesces_identical_calls():
+    flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("q", compute) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["answer"] * 5
+    assert calls == 1
+    assert flight.merged == 4
+    assert flight._inflight == {}
+
+
+def test_single_flight_leader_cancel_keeps_followers():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("q", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("q", compute))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        assert await follower == "answer"
+        return leader.cancelled()
+
+    assert asyncio.run(scenario())
+
+
+def test_single_flight_error_reaches_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(flight.do("q", fail) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(scenario()))
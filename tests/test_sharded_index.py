@@ -0,0 +1,110 @@
+import faiss
+import numpy as np
+import pytest
+
+from RAG.batch_answer import load_search_index
+from RAG.faiss_hnsw import build_index
+from RAG.sharded_index import SHARD_MAP_NAME, ShardedIndex, build_shards, merge_topk, shard_ranges
+
+
+DIM = 16
+
+
+def vectors(n: int, seed: int = 0) -> np.ndarray:
+    x = np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def flat_search(xb: np.ndarray, xq: np.ndarray, k: int):
+    index = faiss.IndexFlatIP(DIM)
+    index.add(xb)
+    return index.search(xq, k)
+
+
+@pytest.mark.parametrize("n_shards", [1, 3, 7])
+def test_merge_topk_matches_flat_index(n_shards):
+    xb, xq, k = vectors(500), vectors(20, seed=1), 10
+    ranges = shard_ranges(len(xb), n_shards)
+
+    parts = [flat_search(xb[lo:hi], xq, k) for lo, hi in ranges]
+    scores, ids = merge_topk(parts, [lo for lo, _ in ranges], k)
+    ref_scores, ref_ids = flat_search(xb, xq, k)
+
+    np.testing.assert_array_equal(ids, ref_ids)
+    np.testing.assert_allclose(scores, ref_scores, rtol=1e-6)
+
+
+def test_merge_topk_pads_missing_results():
+    xb, xq = vectors(6), vectors(2, seed=1)
+    ranges = shard_ranges(len(xb), 3)
+
+    # k larger than any shard (FAISS pads with -1) and than the corpus
+    parts = [flat_search(xb[lo:hi], xq, 10) for lo, hi in ranges]
+    scores, ids = merge_topk(parts, [lo for lo, _ in ranges], 10)
+
+    assert ids.shape == (2, 10) and ids.dtype == np.int64
+    assert (np.sort(ids[:, :6], axis=1) == np.arange(6)).all()
+    assert (ids[:, 6:] == -1).all()
+    assert np.isfinite(scores[:, :6]).all()
+
+
+@pytest.fixture(scope="module")
+def shards(tmp_path_factory):
+    out_dir = tmp_path_factory.mktemp("shards")
+    xb = vectors(400)
+    build_shards([xb[:150], xb[150:]], len(xb), out_dir, n_shards=3, kind="flat", processes=1)
+    return out_dir, xb
+
+
+def test_sharded_index_matches_flat_index(shards):
+    out_dir, xb = shards
+    xq = vectors(25, seed=2)
+    index = ShardedIndex(out_dir / SHARD_MAP_NAME)
+    try:
+        scores, ids = index.search(xq, 10)
+    finally:
+        index.close()
+
+    ref_scores, ref_ids = flat_search(xb, xq, 10)
+    np.testing.assert_array_equal(ids, ref_ids)
+    np.testing.assert_allclose(scores, ref_scores, rtol=1e-6)
+
+
+def test_load_search_index_prefers_the_shard_map(shards):
+    out_dir, xb = shards
+    # A stale single index left next to the shards must not be served
+    build_index(vectors(10, seed=9), kind="flat", index_path=str(out_dir / "policy_hnsw.index"))
+
+    index = load_search_index(out_dir)
+    try:
+        assert isinstance(index, ShardedIndex)
+        assert index.ntotal == len(xb)
+    finally:
+        index.close()
+
+
+@pytest.mark.parametrize("replicas", [1, 2])
+def test_dead_replica_is_replaced_and_searches_fail_over(shards, replicas):
+    out_dir, xb = shards
+    xq = vectors(5, seed=3)
+    ref_scores, ref_ids = flat_search(xb, xq, 10)
+
+    index = ShardedIndex(out_dir / SHARD_MAP_NAME, mode="process", replicas=replicas)
+    try:
+        np.testing.assert_array_equal(index.search(xq, 10)[1], ref_ids)
+
+        # Kill one replica of shard 0
+        conn = index._idle[0].queue[0]
+        victim = index._procs[conn]
+        victim.kill()
+        victim.join()
+
+        for _ in range(3):
+            scores, ids = index.search(xq, 10)
+            np.testing.assert_array_equal(ids, ref_ids)
+            np.testing.assert_allclose(scores, ref_scores, rtol=1e-6)
+
+        assert index.stats()["replica_restarts"] == 1
+        assert victim not in index._procs.values()
+    finally:
+        index.close()